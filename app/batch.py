@@ -0,0 +1,406 @@
+"""Headless batch generation: read a list of careers-page URLs and stream one
+JSON record per URL to an output JSONL file.
+
+Fetching, HTML parsing, job extraction and email writing run as separate stages
+connected by bounded queues, each with its own worker count, so slow pages and
+slow LLM calls overlap instead of adding up. With ``--parse-workers`` the
+CPU-bound parsing runs in a process pool (see parse_pool.py). Records are
+flushed as they finish; rerunning with the same output file skips every URL
+that already has an ``ok`` record.
+
+Pages and extracted jobs are fingerprinted (see dedup.py) before they reach the
+LLM. A near-duplicate of a page or job seen earlier, in this run or a previous
+one, reuses the stored jobs or email and its record names the original under
+``duplicate_of``; ``--no-dedup`` turns this off. Pages from one ATS or company
+template share most of their text, so a page only reuses jobs at the stricter
+``--page-dedup-threshold`` and when it contains their roles, companies and
+descriptions. Emails are only reused for the same company, between runs with
+the same style, link count and research option, and with research on only for
+the same company site.
+
+    python app/batch.py leads.csv -o emails.jsonl --fetch-concurrency 16
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dedup import contains_job, job_text, same_company
+from metrics import get_metrics
+from parse_pool import ParseError, parse_page
+from research_cache import registrable_domain
+
+URL_RE = re.compile(r"https?://\S+")
+_DONE = object()
+
+
+def read_items(path):
+    """Read URLs from a CSV (``url`` column), JSONL or plain-text file"""
+    items = []
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                row = {k.lower(): v for k, v in row.items() if k}
+                url = row.get("url") or next(iter(row.values()), "")
+                if url:
+                    items.append({"id": row.get("id") or url, "url": url.strip()})
+        elif path.endswith(".jsonl"):
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                url = record.get("url")
+                if not url:
+                    # Fall back to the first URL mentioned anywhere in the record
+                    match = URL_RE.search(" ".join(str(v) for v in record.values()))
+                    url = match.group(0).rstrip(".,)`'\"") if match else None
+                if url:
+                    key = record.get("id") or record.get("request_id") or url
+                    items.append({"id": key, "url": url})
+        else:
+            for line in f:
+                if line.strip():
+                    items.append({"id": line.strip(), "url": line.strip()})
+    return items
+
+
+def trim_partial_line(output_path):
+    """Cut off a last line without a newline, which a crash mid-write leaves behind,
+    so appended records start on a line of their own"""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if not end:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+def completed_ids(output_path):
+    """Ids that already have a successful record in ``output_path``"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                # A truncated last line from a crash; trim_partial_line removes it
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def load_page(url):
+    """Fetch a page's HTML with the Streamlit app's shared fetcher"""
+    from fetcher import get_fetcher
+    result = get_fetcher().fetch(url)
+    result.raise_for_status()
+    return result.text
+
+
+class BatchPipeline:
+    def __init__(self, chain, portfolio, fetch_concurrency=8, extract_concurrency=4,
+                 write_concurrency=4, queue_size=64, template_style="formal",
+                 n_links=2, personalization=None, page_loader=load_page, parse_pool=None,
+                 parse_concurrency=2, dedup=None, page_dedup_threshold=0.9):
+        # page_loader returns raw HTML; parsing it happens in the parse stage, in
+        # parse_pool's worker processes when one is given and in threads otherwise
+        self.chain = chain
+        self.portfolio = portfolio
+        self.fetch_concurrency = fetch_concurrency
+        self.extract_concurrency = extract_concurrency
+        self.write_concurrency = write_concurrency
+        self.queue_size = queue_size
+        self.template_style = template_style
+        self.n_links = n_links
+        self.personalization = personalization
+        self.page_loader = page_loader
+        self.parse_pool = parse_pool
+        self.parse_concurrency = parse_concurrency
+        self.dedup = dedup
+        self.page_dedup_threshold = page_dedup_threshold
+        # Emails depend on these options as well as the job, so only jobs written with the same ones match
+        self.research = bool(personalization and personalization.get("include_company_research"))
+        self.job_kind = f"job:{template_style}:{n_links}:{int(self.research)}"
+        if parse_pool is not None:
+            chain.parse_pool = parse_pool
+
+    async def _fetch(self, item):
+        if self.research:
+            # Research needs only the URL; let it run while the page is fetched and extracted
+            item["research"] = self.chain.start_company_research(item["url"])
+        item["page"] = await asyncio.to_thread(self.page_loader, item["url"])
+        return item
+
+    async def _parse(self, items):
+        """Clean a chunk of fetched pages; returns one text or ParseError per item"""
+        pages = [item.pop("page") for item in items]
+        if self.parse_pool is not None:
+            return await self.parse_pool.aparse_many(pages, errors="return")
+
+        def parse(page):
+            try:
+                return parse_page(page)
+            except Exception as e:
+                return ParseError(f"{type(e).__name__}: {e}")
+        return await asyncio.gather(*(asyncio.to_thread(parse, page) for page in pages))
+
+    def _lookup(self, kind, text, threshold=None):
+        """(signature, earlier match or None) for ``text``; runs in a worker thread"""
+        signature = self.dedup.signature(text)
+        match = self.dedup.find(kind, signature, threshold)
+        get_metrics().increment("dedup", kind=kind.split(":")[0], result="hit" if match else "miss")
+        return signature, match
+
+    async def _extract(self, item):
+        text = item.pop("text")
+        if self.dedup is not None:
+            item["page_signature"], match = await asyncio.to_thread(self._lookup, "page", text,
+                                                                    self.page_dedup_threshold)
+            if match and match["result"] and all(contains_job(text, job) for job in match["result"]["jobs"]):
+                item["jobs"] = match["result"]["jobs"]
+                item["duplicate_of"] = match["key"]
+                return item
+        item["jobs"] = await asyncio.to_thread(self.chain.extract_jobs, text)
+        return item
+
+    async def _write(self, item):
+        jobs = item.pop("jobs")
+        if not jobs:
+            raise ValueError("No job information found on this page.")
+        job = jobs[0]
+        if self.dedup is not None:
+            kind = self.job_kind
+            if self.research:
+                # Research is per company site, and the email is written with it
+                kind += ":" + registrable_domain(item["url"])
+            signature, match = await asyncio.to_thread(self._lookup, kind, job_text(job))
+            if match and match["result"] and same_company(job, match["result"]["job"]):
+                item.pop("research", None)
+                item.update(match["result"], duplicate_of=item.get("duplicate_of") or match["key"])
+                return item
+        links = self.portfolio.query_links(job.get("skills", []), n_results=self.n_links)
+        personalization = dict(self.personalization or {}, company_url=item["url"])
+        email = await asyncio.to_thread(
+            self.chain.write_mail, job, links,
+            template_style=self.template_style, personalization=personalization,
+            company_research=item.pop("research", None))
+        if email.startswith("Error generating email:"):
+            raise RuntimeError(email)
+        item.update(job=job, links=links, email=email)
+        if self.dedup is not None:
+            await asyncio.to_thread(self._remember, item, jobs, kind, signature)
+        return item
+
+    def _remember(self, item, jobs, kind, job_signature):
+        if item.get("page_signature") is not None and not item.get("duplicate_of"):
+            self.dedup.add("page", item["url"], item["page_signature"], {"jobs": jobs})
+        self.dedup.add(kind, item["url"], job_signature,
+                       {"job": item["job"], "links": item["links"], "email": item["email"]})
+
+    async def _stage(self, name, handler, inbox, outbox, results, concurrency):
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    # Hand the sentinel on to the next sibling worker
+                    await inbox.put(_DONE)
+                    return
+                try:
+                    item = await handler(item)
+                except Exception as e:
+                    await results.put({"id": item["id"], "url": item["url"], "status": "error",
+                                       "stage": name, "error": f"{type(e).__name__}: {e}",
+                                       "elapsed": round(time.perf_counter() - item["started"], 3)})
+                    continue
+                await outbox.put(item)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        await outbox.put(_DONE)
+
+    async def _parse_stage(self, inbox, outbox, results):
+        """Like ``_stage`` for parsing, but each worker takes whatever pages are waiting,
+        up to the pool's chunk size, so pages travel to the workers in chunks"""
+        chunk_size = self.parse_pool.chunk_size if self.parse_pool is not None else 1
+        finished = False
+
+        async def worker():
+            nonlocal finished
+            while not finished:
+                items = [await inbox.get()]
+                while len(items) < chunk_size and not inbox.empty():
+                    items.append(inbox.get_nowait())
+                if _DONE in items:
+                    items.remove(_DONE)
+                    finished = True
+                    await inbox.put(_DONE)
+                if not items:
+                    return
+                for item, text in zip(items, await self._parse(items)):
+                    if isinstance(text, ParseError):
+                        await results.put({"id": item["id"], "url": item["url"], "status": "error",
+                                           "stage": "parse", "error": str(text),
+                                           "elapsed": round(time.perf_counter() - item["started"], 3)})
+                    else:
+                        item["text"] = text
+                        await outbox.put(item)
+
+        await asyncio.gather(*(worker() for _ in range(self.parse_concurrency)))
+        await outbox.put(_DONE)
+
+    async def _sink(self, results, output_path, stats):
+        with open(output_path, "a") as f:
+            while True:
+                record = await results.get()
+                if record is _DONE:
+                    return
+                if record.get("status") != "error":
+                    duplicate_of = record.get("duplicate_of")
+                    record = {"id": record["id"], "url": record["url"], "status": "ok",
+                              "job": record["job"], "links": record["links"], "email": record["email"],
+                              "elapsed": round(time.perf_counter() - record["started"], 3)}
+                    if duplicate_of:
+                        record["duplicate_of"] = duplicate_of
+                        stats["duplicates"] += 1
+                stats[record["status"]] += 1
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+
+    async def run(self, items, output_path):
+        """Process ``items`` (dicts with ``id`` and ``url``) and append records to ``output_path``"""
+        trim_partial_line(output_path)
+        done = completed_ids(output_path)
+        pending = [item for item in items if item["id"] not in done]
+        stats = {"ok": 0, "error": 0, "skipped": len(items) - len(pending), "duplicates": 0}
+
+        fetch_q = asyncio.Queue(self.queue_size)
+        parse_q = asyncio.Queue(self.queue_size)
+        extract_q = asyncio.Queue(self.queue_size)
+        write_q = asyncio.Queue(self.queue_size)
+        results = asyncio.Queue(self.queue_size)
+
+        async def feed():
+            for item in pending:
+                await fetch_q.put(dict(item, started=time.perf_counter()))
+            await fetch_q.put(_DONE)
+
+        # Stage workers block in threads, so size the pool to the total worker count
+        workers = self.fetch_concurrency + self.extract_concurrency + self.write_concurrency
+        if self.parse_pool is None:
+            workers += self.parse_concurrency
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(workers))
+
+        started = time.perf_counter()
+        sink = asyncio.create_task(self._sink(results, output_path, stats))
+        await asyncio.gather(
+            feed(),
+            self._stage("fetch", self._fetch, fetch_q, parse_q, results, self.fetch_concurrency),
+            self._parse_stage(parse_q, extract_q, results),
+            self._stage("extract", self._extract, extract_q, write_q, results, self.extract_concurrency),
+            self._stage("write", self._write, write_q, results, results, self.write_concurrency),
+        )
+        await sink
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate cold emails for a list of careers-page URLs")
+    parser.add_argument("input", help="CSV with a url column, JSONL with url fields, or one URL per line")
+    parser.add_argument("-o", "--output", default="batch_emails.jsonl")
+    parser.add_argument("--fetch-concurrency", type=int, default=8)
+    parser.add_argument("--extract-concurrency", type=int, default=4)
+    parser.add_argument("--write-concurrency", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Processes for HTML parsing and cleaning (0 parses in threads)")
+    parser.add_argument("--parse-chunk-size", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--host-delay", type=float, default=None,
+                        help="Seconds between requests to one host (default HTTP_HOST_DELAY or 0.5)")
+    parser.add_argument("--template-style", default="formal",
+                        choices=["formal", "conversational", "problem-solution"])
+    parser.add_argument("--links", type=int, default=2, help="Portfolio links per email")
+    parser.add_argument("--company-research", action="store_true")
+    parser.add_argument("--dedup-index", default="near_duplicates.sqlite3",
+                        help="SQLite file of page and job fingerprints kept across runs")
+    parser.add_argument("--dedup-threshold", type=float, default=0.7,
+                        help="Estimated Jaccard similarity at which an extracted job counts as a duplicate")
+    parser.add_argument("--page-dedup-threshold", type=float, default=0.9,
+                        help="Similarity at which a whole page reuses an earlier page's extracted jobs")
+    parser.add_argument("--no-dedup", action="store_true", help="Send every page and job to the LLM")
+    parser.add_argument("--stub-llm", action="store_true", help="Use the offline StubLLM instead of Groq")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from chains import Chain
+    from portfolio import HybridPortfolio
+
+    # GROQ_API_KEY and friends from app/.env, as the UI reads them
+    load_dotenv()
+
+    if args.host_delay is not None:
+        from fetcher import get_fetcher
+        get_fetcher().host_delay = args.host_delay
+
+    chain = None
+    if args.stub_llm:
+        from fake_llm import StubLLM
+        from llm_client import LangChainProvider, LLMDispatcher
+        llm = StubLLM()
+        # The stub has no quota, so only cap concurrency to the LLM-bound workers
+        dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9,
+                                   max_concurrency=args.extract_concurrency + args.write_concurrency)
+        chain = Chain(llm=llm, dispatcher=dispatcher)
+    parse_pool = None
+    if args.parse_workers:
+        from parse_pool import ParsePool
+        parse_pool = ParsePool(args.parse_workers, chunk_size=args.parse_chunk_size)
+    dedup = None
+    if not args.no_dedup:
+        from dedup import NearDuplicateIndex
+        dedup = NearDuplicateIndex(args.dedup_index, threshold=args.dedup_threshold)
+    pipeline = BatchPipeline(
+        chain or Chain(), HybridPortfolio(),
+        fetch_concurrency=args.fetch_concurrency,
+        extract_concurrency=args.extract_concurrency,
+        write_concurrency=args.write_concurrency,
+        queue_size=args.queue_size,
+        template_style=args.template_style,
+        n_links=args.links,
+        personalization={"include_company_research": args.company_research},
+        parse_pool=parse_pool,
+        dedup=dedup,
+        page_dedup_threshold=args.page_dedup_threshold,
+    )
+    try:
+        stats = asyncio.run(pipeline.run(read_items(args.input), args.output))
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
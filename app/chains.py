@@ -1,60 +1,399 @@
 import os
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.exceptions import OutputParserException
-from dotenv import load_dotenv
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import prompts
+from fetcher import get_fetcher, html_to_text
+from llm_cache import ResponseCache
+from llm_client import LangChainProvider, LLMDispatcher, estimate_tokens
+from metrics import get_metrics
+from research_cache import CompanyResearchCache, registrable_domain
+from utils import split_windows
+
+# Page tokens per extraction call; leaves room in the 8k context for the prompt and the JSON answer
+EXTRACT_WINDOW_TOKENS = 4500
+EXTRACT_OVERLAP_TOKENS = 300
+EXTRACT_PARALLELISM = 4
+
+EMPTY_RESEARCH = {"values": [], "initiatives": [], "pain_points": [], "size": "Unknown"}
+
+
+def _job_key(job):
+    role = " ".join(re.findall(r"[a-z0-9]+", str(job.get("role", "")).lower()))
+    skills = job.get("skills", [])
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return role, {str(s).strip().lower() for s in skills if str(s).strip()}
+
+
+def merge_jobs(jobs):
+    """Drop postings extracted twice from overlapping windows.
+
+    Two postings are the same when their normalized roles match and their skill
+    sets overlap by at least half (or either is empty); duplicates are merged
+    into the first one seen, keeping the union of skills and the longer text.
+    """
+    merged = []
+    for job in jobs:
+        if not isinstance(job, dict):
+            continue
+        role, skills = _job_key(job)
+        for kept in merged:
+            kept_role, kept_skills = _job_key(kept)
+            overlap = len(skills & kept_skills) * 2 >= min(len(skills), len(kept_skills))
+            if role != kept_role or not overlap:
+                continue
+            if isinstance(kept.get("skills"), list) and isinstance(job.get("skills"), list):
+                kept["skills"] = kept["skills"] + [s for s in job["skills"]
+                                                   if str(s).strip().lower() not in kept_skills]
+            for field in ("description", "experience", "company_name"):
+                if len(str(job.get(field) or "")) > len(str(kept.get(field) or "")):
+                    kept[field] = job[field]
+            break
+        else:
+            merged.append(dict(job))
+    return merged
+
+
+def parse_json(text, error):
+    """JSON from a completion, tolerating code fences; raises OutputParserException(``error``) otherwise"""
+    from langchain_core.exceptions import OutputParserException
+    from langchain_core.output_parsers import JsonOutputParser
+    try:
+        return JsonOutputParser().parse(text)
+    except OutputParserException:
+        raise OutputParserException(error)
+
+
+def create_llm(backend=None):
+    """The chat model selected by ``LLM_BACKEND``: ``groq`` (default) or ``fake``.
+
+    Chain accepts any backend with ``invoke(prompt)``, ``ainvoke(prompt)`` and
+    ``astream(prompt)`` returning LangChain messages/chunks with ``.content``;
+    ``temperature`` and ``model_name`` attributes, if present, go into the
+    response-cache key. ``fake`` is fake_llm.ReplayLLM configured from the
+    ``FAKE_LLM_*`` variables, for running offline.
+    """
+    backend = (backend or os.getenv("LLM_BACKEND", "groq")).lower()
+    if backend == "fake":
+        from fake_llm import ReplayLLM
+        return ReplayLLM.from_env()
+    if backend != "groq":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        temperature=0,
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        model_name="llama3-8b-8192",
+        # Retries are handled by the dispatcher
+        max_retries=0
+    )
 
-load_dotenv()
 
 class Chain:
-    def __init__(self):
-        self.llm = ChatGroq(temperature=0, groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama-3.1-70b-versatile")
+    def __init__(self, llm=None, dispatcher=None, cache=None, research_cache=None):
+        self.llm = llm or create_llm()
+        # Default style instructions for write_mail. The Chain is shared by every UI session, so
+        # the Settings tab edits a per-session copy and passes it in as ``email_templates``
+        self.email_templates = dict(prompts.STYLE_INSTRUCTIONS)
 
-    def extract_jobs(self, cleaned_text):
-        prompt_extract = PromptTemplate.from_template(
-            """
-            ### SCRAPED TEXT FROM WEBSITE:
-            {page_data}
-            ### INSTRUCTION:
-            The scraped text is from the career's page of a website.
-            Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills` and `description`.
-            Only return the valid JSON.
-            ### VALID JSON (NO PREAMBLE):
-            """
+        if research_cache is None:
+            research_cache = CompanyResearchCache(
+                os.getenv("COMPANY_RESEARCH_CACHE_PATH", "company_research.sqlite3") or None,
+                ttl=float(os.getenv("COMPANY_RESEARCH_TTL", 7 * 24 * 3600)))
+        elif research_cache is False:
+            # Still shared within the process, but nothing is written to disk
+            research_cache = CompanyResearchCache(None)
+        self.research_cache = research_cache
+        # How long write_mail waits for research started with start_company_research
+        self.research_timeout = float(os.getenv("COMPANY_RESEARCH_TIMEOUT", "8"))
+        self._research_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="company-research")
+        # A parse_pool.ParsePool, if set, parses About pages off this process's GIL
+        self.parse_pool = None
+        # Estimated input tokens sent to the provider, per kind of call
+        self.usage = {}
+        self._usage_lock = threading.Lock()
+
+        # All LLM calls go through one dispatcher so rate budgets and retries are shared
+        self.dispatcher = dispatcher or LLMDispatcher(
+            LangChainProvider(self.llm),
+            requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30")),
+            tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000")),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
         )
-        chain_extract = prompt_extract | self.llm
-        res = chain_extract.invoke(input={"page_data": cleaned_text})
-        try:
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-        except OutputParserException:
-            raise OutputParserException("Context too big. Unable to parse jobs.")
+
+        # Responses are cached on disk across reruns; pass cache=False to disable
+        if cache is None:
+            cache_path = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+            cache = ResponseCache(cache_path) if cache_path else False
+        self.cache = cache or None
+
+    def _complete(self, prompt, kind="other", parse=None):
+        """Send a rendered prompt through the dispatcher and return the completion text.
+
+        ``parse``, if given, turns the text into the return value. A response it
+        raises on is not cached, so the next call asks the LLM again instead of
+        replaying the same unparsable text.
+        """
+        temperature = getattr(self.llm, "temperature", None)
+        # Sampled completions are meant to vary, so only deterministic calls are cached
+        metrics = get_metrics()
+        with metrics.span("llm", kind=kind):
+            if self.cache is None or temperature:
+                self._count_tokens(kind, prompt)
+                response = self.dispatcher.complete(prompt)
+                metrics.increment("llm_output_tokens", estimate_tokens(response), kind=kind)
+                return parse(response) if parse else response
+            model = getattr(self.llm, "model_name", type(self.llm).__name__)
+            key = self.cache.make_key(prompt, model, temperature)
+            response = self.cache.get(key)
+            if response is not None and parse:
+                try:
+                    return self._cache_hit(kind, parse(response))
+                except Exception:
+                    # Stored before unparsable responses were kept out of the cache
+                    response = None
+            if response is not None:
+                return self._cache_hit(kind, response)
+            metrics.increment("llm_cache", kind=kind, result="miss")
+            self._count_tokens(kind, prompt)
+            response = self.dispatcher.complete(prompt)
+            metrics.increment("llm_output_tokens", estimate_tokens(response), kind=kind)
+            result = parse(response) if parse else response
+            self.cache.set(key, response)
+            return result
+
+    @staticmethod
+    def _cache_hit(kind, result):
+        get_metrics().increment("llm_cache", kind=kind, result="hit")
+        return result
+
+    def _count_tokens(self, kind, prompt):
+        """Record the estimated input tokens of a prompt sent to the provider"""
+        tokens = estimate_tokens(prompt)
+        with self._usage_lock:
+            usage = self.usage.setdefault(kind, {"calls": 0, "input_tokens": 0})
+            usage["calls"] += 1
+            usage["input_tokens"] += tokens
+        get_metrics().increment("llm_input_tokens", tokens, kind=kind)
+        return tokens
+
+    def extract_jobs(self, cleaned_text):
+        """Extract job postings, splitting pages too big for one call into overlapping windows"""
+        with get_metrics().span("extract_jobs"):
+            return self._extract_jobs(cleaned_text)
+
+    def _extract_jobs(self, cleaned_text):
+        from langchain_core.exceptions import OutputParserException
+        if estimate_tokens(cleaned_text) <= EXTRACT_WINDOW_TOKENS:
+            return self._extract_window(cleaned_text)
+        windows = split_windows(cleaned_text, EXTRACT_WINDOW_TOKENS * 4, EXTRACT_OVERLAP_TOKENS * 4)
+
+        def extract(window):
+            try:
+                return self._extract_window(window)
+            except OutputParserException:
+                # A window that holds no complete posting may not yield valid JSON
+                return None
+
+        with ThreadPoolExecutor(max_workers=EXTRACT_PARALLELISM) as executor:
+            results = list(executor.map(get_metrics().bind(extract), windows))
+        if all(result is None for result in results):
+            raise OutputParserException("Unable to parse jobs from any part of the page.")
+        return merge_jobs([job for result in results if result for job in result])
+
+    def _extract_window(self, cleaned_text):
+        res = self._complete(prompts.extract_jobs_prompt(cleaned_text), kind="extract_jobs",
+                             parse=lambda text: parse_json(text, "Context too big. Unable to parse jobs."))
         return res if isinstance(res, list) else [res]
 
-    def write_mail(self, job, links):
-        prompt_email = PromptTemplate.from_template(
-            """
-            ### JOB DESCRIPTION:
-            {job_description}
-
-            ### INSTRUCTION:
-            You are Mohan, a business development executive at AtliQ. AtliQ is an AI & Software Consulting company dedicated to facilitating
-            the seamless integration of business processes through automated tools. 
-            Over our experience, we have empowered numerous enterprises with tailored solutions, fostering scalability, 
-            process optimization, cost reduction, and heightened overall efficiency. 
-            Your job is to write a cold email to the client regarding the job mentioned above describing the capability of AtliQ 
-            in fulfilling their needs.
-            Also add the most relevant ones from the following links to showcase Atliq's portfolio: {link_list}
-            Remember you are Mohan, BDE at AtliQ. 
-            Do not provide a preamble.
-            ### EMAIL (NO PREAMBLE):
-
-            """
-        )
-        chain_email = prompt_email | self.llm
-        res = chain_email.invoke({"job_description": str(job), "link_list": links})
-        return res.content
+    def extract_company_info(self, url, company_name=None):
+        """Extract company information from the URL's site; one result is shared per registrable domain"""
+        metrics = get_metrics()
+        try:
+            with metrics.span("extract_company_info"):
+                return self.research_cache.get_or_compute(
+                    registrable_domain(url), lambda: self._research_company(url, company_name))
+        except Exception as e:
+            print(f"Error extracting company info: {e}")
+            return dict(EMPTY_RESEARCH)
+
+    def _research_company(self, url, company_name):
+        base_url = '/'.join(url.split('/')[:3])
+        about_url = f"{base_url}/about"
+
+        # Try to find About page
+        response = get_fetcher().fetch(about_url, max_bytes=2 * 1024 * 1024)
+        if response.status == 200:
+            if self.parse_pool is not None:
+                about_text = self.parse_pool.parse(response.text, clean=False)
+            else:
+                about_text = ' '.join(html_to_text(response.text).split())
+            about_text = about_text[:5000]  # Truncate to prevent token overload
+        else:
+            about_text = "No company information found."
+
+        # An unparsable response raises before it reaches the response cache or the research
+        # cache, so the next email for this company asks the LLM again
+        return self._complete(prompts.company_info_prompt(company_name, about_text), kind="company_info",
+                              parse=lambda text: parse_json(text, "Unable to parse company research."))
+
+    def _stream(self, prompt, timing=None, kind="other"):
+        """Like ``_complete`` but yields the completion in chunks as they arrive"""
+        with get_metrics().span("llm", kind=kind):
+            yield from self._stream_response(prompt, timing, kind)
+
+    def _stream_response(self, prompt, timing, kind):
+        temperature = getattr(self.llm, "temperature", None)
+        metrics = get_metrics()
+        if self.cache is None or temperature:
+            tokens = self._count_tokens(kind, prompt)
+            if timing is not None:
+                timing["input_tokens"] = tokens
+            chunks = []
+            for chunk in self.dispatcher.stream(prompt, timing=timing):
+                chunks.append(chunk)
+                yield chunk
+            metrics.increment("llm_output_tokens", estimate_tokens("".join(chunks)), kind=kind)
+            return
+        model = getattr(self.llm, "model_name", type(self.llm).__name__)
+        key = self.cache.make_key(prompt, model, temperature)
+        started = time.perf_counter()
+        response = self.cache.get(key)
+        metrics.increment("llm_cache", kind=kind, result="miss" if response is None else "hit")
+        if response is not None:
+            if timing is not None:
+                timing["ttft"] = timing["total"] = time.perf_counter() - started
+                timing["input_tokens"] = 0
+            yield response
+            return
+        tokens = self._count_tokens(kind, prompt)
+        if timing is not None:
+            timing["input_tokens"] = tokens
+        chunks = []
+        for chunk in self.dispatcher.stream(prompt, timing=timing):
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        metrics.increment("llm_output_tokens", estimate_tokens(response), kind=kind)
+        self.cache.set(key, response)
+
+    def write_mail(self, job, portfolio_links, template_style="formal", personalization=None,
+                   company_research=None, email_templates=None):
+        """
+        Generate an email based on job details using a direct approach without complex template variables.
+
+        ``company_research`` may be a research dict or the future returned by
+        ``start_company_research``; without it, research (if enabled in
+        ``personalization``) runs here. ``email_templates`` overrides
+        ``self.email_templates`` for this call.
+        """
+        try:
+            with get_metrics().span("write_mail", style=template_style):
+                prompt = self._mail_prompt(job, portfolio_links, template_style, personalization, company_research,
+                                           email_templates)
+                return self._complete(prompt, kind="write_mail")
+        except Exception as e:
+            return f"Error generating email: {str(e)}"
+
+    def stream_mail(self, job, portfolio_links, template_style="formal", personalization=None, timing=None,
+                    company_research=None, email_templates=None):
+        """``write_mail`` that yields the email in chunks; ``timing`` gets ttft/total seconds"""
+        try:
+            with get_metrics().span("write_mail", style=template_style):
+                prompt = self._mail_prompt(job, portfolio_links, template_style, personalization, company_research,
+                                           email_templates)
+                yield from self._stream(prompt, timing, kind="write_mail")
+        except Exception as e:
+            yield f"Error generating email: {str(e)}"
 
-if __name__ == "__main__":
-    print(os.getenv("GROQ_API_KEY"))
\ No newline at end of file
+    def stream_mail_variants(self, job, portfolio_links, styles=None, personalization=None, timings=None,
+                             company_research=None, email_templates=None):
+        """Stream one email per template style in parallel, yielding ``(style, chunk)`` as chunks arrive.
+
+        Company research is resolved once up front and shared by every variant.
+        ``timings``, if given, gets one ttft/total dict per style.
+        """
+        styles = list(styles or email_templates or self.email_templates)
+        company_research = self.resolve_company_research(job, personalization, company_research)
+        if timings is not None:
+            for style in styles:
+                timings[style] = {}
+
+        chunks = queue.Queue()
+
+        def pump(style):
+            timing = timings[style] if timings is not None else None
+            try:
+                for chunk in self.stream_mail(job, portfolio_links, style, personalization, timing,
+                                              company_research=company_research, email_templates=email_templates):
+                    chunks.put((style, chunk))
+            finally:
+                chunks.put((style, None))
+
+        with ThreadPoolExecutor(max_workers=len(styles)) as executor:
+            pump = get_metrics().bind(pump)
+            for style in styles:
+                executor.submit(pump, style)
+            remaining = len(styles)
+            while remaining:
+                style, chunk = chunks.get()
+                if chunk is None:
+                    remaining -= 1
+                else:
+                    yield style, chunk
+
+    def start_company_research(self, url, company_name=None):
+        """Begin researching ``url``'s company in the background and return a future for the result.
+
+        Research only needs the URL, so callers start it before the page is
+        loaded and pass the future to ``write_mail`` as ``company_research``.
+        """
+        return self._research_pool.submit(get_metrics().bind(self.extract_company_info), url, company_name)
+
+    def resolve_company_research(self, job, personalization, company_research=None):
+        """The research dict to write with, waiting at most ``research_timeout`` for a pending future"""
+        if isinstance(company_research, Future):
+            try:
+                return company_research.result(timeout=self.research_timeout)
+            except FutureTimeoutError:
+                # Better an email without research now than a complete one much later
+                print(f"Company research not ready after {self.research_timeout}s; writing without it")
+                # Empty rather than None so write_mail doesn't start researching again
+                return {}
+        if company_research is None and personalization and personalization.get('include_company_research', False):
+            return self.extract_company_info(personalization.get('company_url', ''),
+                                             job.get('company_name', 'Unknown'))
+        return company_research
+
+    def _mail_prompt(self, job, portfolio_links, template_style, personalization, company_research=None,
+                     email_templates=None):
+        if email_templates is None:
+            email_templates = self.email_templates
+        company_research = self.resolve_company_research(job, personalization, company_research)
+        personalization = personalization or {}
+        return prompts.mail_prompt(
+            job, portfolio_links, template_style,
+            company_research=company_research,
+            recipient=personalization.get('recipient_name', ''),
+            add_cta=personalization.get('add_call_to_action', False),
+            mention_competitors=personalization.get('mention_competitors', False),
+            style_instruction=email_templates.get(template_style))
+
+    def generate_follow_up(self, original_email, days_passed=7):
+        try:
+            with get_metrics().span("follow_up"):
+                return self._complete(prompts.follow_up_prompt(original_email, days_passed), kind="follow_up")
+        except Exception as e:
+            return f"Error generating follow-up email: {str(e)}"
+
+    def stream_follow_up(self, original_email, days_passed=7, timing=None):
+        """``generate_follow_up`` that yields the email in chunks; ``timing`` gets ttft/total seconds"""
+        try:
+            with get_metrics().span("follow_up"):
+                yield from self._stream(prompts.follow_up_prompt(original_email, days_passed), timing, kind="follow_up")
+        except Exception as e:
+            yield f"Error generating follow-up email: {str(e)}"
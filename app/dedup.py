@@ -0,0 +1,180 @@
+"""Near-duplicate detection for syndicated job postings.
+
+The same posting often shows up under several URLs (ATS mirrors, job boards,
+tracking-parameter variants) with different navigation and footers around it.
+``NearDuplicateIndex`` keeps a MinHash signature of every page and job it has
+seen, banded into an LSH table in SQLite, so a new page can be checked against
+everything from earlier runs in a handful of indexed lookups and reuse the
+stored result instead of going through the LLM again.
+"""
+import json
+import re
+import threading
+import time
+import zlib
+
+from sqlite_util import ThreadLocalConnection, hit_stats
+
+_WORD_RE = re.compile(r"\w+")
+# Mersenne prime for the (a * x + b) mod p permutations; hashes are kept to 32 bits
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text, size=3):
+    """crc32 of every ``size``-word window of ``text``, lowercased"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def contains_job(text, job, size=3, min_share=0.5):
+    """Whether page ``text`` holds ``job``: it names the role and the company and
+    contains at least ``min_share`` of the description's ``size``-word shingles.
+    Pages built on one template, or one posting reused by several companies, can
+    look alike as a whole while carrying different jobs."""
+    words = " ".join(_WORD_RE.findall(text.lower()))
+    for field in ("role", "company_name"):
+        name = " ".join(_WORD_RE.findall(str(job.get(field) or "").lower()))
+        if name and name not in words:
+            return False
+    description = str(job.get("description") or "")
+    if not description.strip():
+        return True
+    wanted = shingles(description, size)
+    return len(wanted & shingles(text, size)) >= min_share * len(wanted)
+
+
+def job_text(job):
+    """The parts of an extracted job that identify the posting"""
+    skills = job.get("skills") or []
+    if isinstance(skills, str):
+        skills = [skills]
+    return " ".join([str(job.get("company_name") or ""), str(job.get("role") or ""), " ".join(map(str, skills)),
+                     str(job.get("experience") or ""), str(job.get("description") or "")])
+
+
+def same_company(job, other):
+    """Whether two extracted jobs name the same company. One boilerplate posting can be
+    advertised by several companies, and an email written to one must not go to another."""
+    def name(j):
+        return " ".join(_WORD_RE.findall(str(j.get("company_name") or "").lower()))
+    return name(job) == name(other)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of page and job fingerprints, persisted in SQLite.
+
+    Signatures have ``num_perm`` values split into ``bands`` bands; two texts
+    become candidates when any band matches exactly, and a candidate counts
+    as a duplicate when the estimated Jaccard similarity of their shingle sets
+    is at least ``threshold``. Entries carry the JSON result stored with them
+    (extracted jobs, the written email) and expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, path="near_duplicates.sqlite3", threshold=0.7, num_perm=64, bands=16,
+                 shingle_size=3, ttl=30 * 24 * 3600, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        import numpy as np
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._conn = ThreadLocalConnection(path)
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS fingerprints (
+                            id INTEGER PRIMARY KEY,
+                            kind TEXT NOT NULL,
+                            key TEXT NOT NULL,
+                            signature BLOB NOT NULL,
+                            result TEXT,
+                            created REAL NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS buckets (
+                            kind TEXT NOT NULL,
+                            band INTEGER NOT NULL,
+                            bucket BLOB NOT NULL,
+                            fingerprint INTEGER NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (kind, band, bucket)")
+        conn.commit()
+        self.evict()
+
+    def signature(self, text):
+        """MinHash signature of ``text`` as a uint32 array of ``num_perm`` values"""
+        import numpy as np
+        hashes = np.fromiter(shingles(text, self.shingle_size), dtype=np.uint64)
+        # uint64 products wrap around; that only reshuffles the permutation
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(_PRIME) & np.uint64(_MAX_HASH)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def similarity(self, first, second):
+        """Estimated Jaccard similarity of two signatures"""
+        return float((first == second).mean())
+
+    def _bands(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def find(self, kind, signature, threshold=None):
+        """The closest earlier entry of ``kind`` at or above ``threshold`` (the
+        index's own if None), as ``{"key", "similarity", "result"}``, or None"""
+        import numpy as np
+        threshold = self.threshold if threshold is None else threshold
+        conn = self._conn()
+        clauses = " OR ".join(["(band = ? AND bucket = ?)"] * self.bands)
+        params = [value for pair in self._bands(signature) for value in pair]
+        rows = conn.execute(f"""SELECT id, key, signature, result FROM fingerprints
+                                WHERE created >= ? AND id IN (
+                                    SELECT fingerprint FROM buckets WHERE kind = ? AND ({clauses}))""",
+                            [time.time() - self.ttl, kind, *params]).fetchall()
+        best = None
+        for _, key, blob, result in rows:
+            score = self.similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= threshold and (best is None or score > best["similarity"]):
+                best = {"key": key, "similarity": round(score, 3),
+                        "result": json.loads(result) if result else None}
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best
+
+    def add(self, kind, key, signature, result=None):
+        """Index ``signature`` under ``kind`` with an optional JSON-serialisable result"""
+        conn = self._conn()
+        cursor = conn.execute("INSERT INTO fingerprints (kind, key, signature, result, created) VALUES (?, ?, ?, ?, ?)",
+                              (kind, key, signature.tobytes(),
+                               json.dumps(result) if result is not None else None, time.time()))
+        conn.executemany("INSERT INTO buckets (kind, band, bucket, fingerprint) VALUES (?, ?, ?, ?)",
+                         [(kind, band, bucket, cursor.lastrowid) for band, bucket in self._bands(signature)])
+        conn.commit()
+
+    def evict(self):
+        """Drop entries older than ``ttl``"""
+        conn = self._conn()
+        cutoff = time.time() - self.ttl
+        conn.execute("""DELETE FROM buckets WHERE fingerprint IN (
+                            SELECT id FROM fingerprints WHERE created < ?)""", (cutoff,))
+        conn.execute("DELETE FROM fingerprints WHERE created < ?", (cutoff,))
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM buckets")
+        conn.execute("DELETE FROM fingerprints")
+        conn.commit()
+
+    def stats(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        return hit_stats(self.hits, self.misses, entries=entries)
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+import prompts
+from llm_client import RateLimitError
+
+
+class StubLLM:
+    """Offline stand-in for ChatGroq that answers Chain prompts deterministically.
+
+    Job extraction returns one posting built from the page text, company
+    research returns an empty profile and every other prompt gets a short
+    canned email. Each call sleeps ``latency`` seconds before the first token
+    and ``token_latency`` per chunk after it, so pipeline throughput and
+    streaming can be measured without a network.
+    """
+
+    def __init__(self, latency=0.0, token_latency=0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.calls = 0
+
+    def _chunks(self, prompt):
+        # Word-sized chunks that join back to exactly the full response
+        return re.findall(r"\S+\s*|\s+", self.respond(str(prompt)))
+
+    def _prefill_delay(self):
+        return self.latency
+
+    def _token_delay(self):
+        return self.token_latency
+
+    def invoke(self, prompt):
+        self.calls += 1
+        chunks = self._chunks(prompt)
+        delay = self._prefill_delay() + sum(self._token_delay() for _ in chunks[1:])
+        if delay:
+            time.sleep(delay)
+        return AIMessage(content="".join(chunks))
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        chunks = self._chunks(prompt)
+        delay = self._prefill_delay() + sum(self._token_delay() for _ in chunks[1:])
+        if delay:
+            await asyncio.sleep(delay)
+        return AIMessage(content="".join(chunks))
+
+    async def astream(self, prompt):
+        self.calls += 1
+        delay = self._prefill_delay()
+        if delay:
+            await asyncio.sleep(delay)
+        for i, chunk in enumerate(self._chunks(prompt)):
+            delay = self._token_delay() if i else 0
+            if delay:
+                await asyncio.sleep(delay)
+            yield AIMessageChunk(content=chunk)
+
+    def respond(self, prompt):
+        if "### SCRAPED TEXT FROM WEBSITE:" in prompt:
+            page = prompt.split("### SCRAPED TEXT FROM WEBSITE:", 1)[1].split("### VALID JSON", 1)[0]
+            words = page.split()
+            role = " ".join(words[:3]) or "Software Engineer"
+            skills = sorted({w for w in words if re.match(r"^[A-Z][A-Za-z0-9]+$", w)})[:5]
+            return json.dumps([{
+                "role": role,
+                "experience": "3+ years",
+                "skills": skills,
+                "description": " ".join(words[:30]),
+                "company_name": "Unknown",
+            }])
+        if "### COMPANY INFO:" in prompt:
+            return json.dumps({"values": [], "initiatives": [], "pain_points": [], "size": "Unknown"})
+        return "Subject: Partnering with AtliQ\n\nHello,\n\nAtliQ can help with this role.\n\nBest regards,\nMohan"
+
+
+def latency_sampler(spec, rng=None):
+    """Callable returning one delay in seconds, from a spec such as ``"0.4"``,
+    ``"uniform:0.2,0.8"``, ``"normal:0.5,0.1"`` or ``"lognormal:0.5,0.4"``
+    (median and sigma of the underlying normal). Negative samples clamp to 0.
+    """
+    rng = rng or random.Random()
+    spec = str(spec or 0)
+    name, _, args = spec.partition(":")
+    if not args:
+        value = float(name)
+        return lambda: value
+    a, b = (float(x) for x in args.split(","))
+    if name == "uniform":
+        return lambda: rng.uniform(a, b)
+    if name == "normal":
+        return lambda: max(0.0, rng.gauss(a, b))
+    if name == "lognormal":
+        return lambda: rng.lognormvariate(math.log(a), b) if a > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+
+
+class ReplayLLM(StubLLM):
+    """Offline LLM backend that replays recorded responses with realistic timing.
+
+    A prompt seen in ``recordings`` (JSONL written by ``RecordingLLM``) gets its
+    recorded response back; otherwise a recorded response of the same kind of
+    call is reused in turn, and prompts of a kind never recorded fall back to
+    StubLLM's templates. ``prefill`` and ``per_token`` are latency specs for
+    ``latency_sampler``; ``seed`` makes the delays repeatable.
+    """
+
+    def __init__(self, recordings=None, prefill="0", per_token="0", seed=None):
+        super().__init__()
+        rng = random.Random(seed)
+        self._prefill = latency_sampler(prefill, rng)
+        self._per_token = latency_sampler(per_token, rng)
+        self._lock = threading.Lock()
+        self.by_prompt = {}
+        self.by_kind = {}
+        self._turn = {}
+        if recordings:
+            with open(recordings) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        if record.get("prompt_sha256"):
+                            self.by_prompt[record["prompt_sha256"]] = record["response"]
+                        self.by_kind.setdefault(record.get("kind", "write_mail"), []).append(record["response"])
+
+    @classmethod
+    def from_env(cls):
+        return cls(recordings=os.getenv("FAKE_LLM_RECORDINGS") or None,
+                   prefill=os.getenv("FAKE_LLM_PREFILL", "0"),
+                   per_token=os.getenv("FAKE_LLM_PER_TOKEN", "0"),
+                   seed=os.getenv("FAKE_LLM_SEED"))
+
+    def _prefill_delay(self):
+        with self._lock:
+            return self._prefill()
+
+    def _token_delay(self):
+        with self._lock:
+            return self._per_token()
+
+    def respond(self, prompt):
+        recorded = self.by_prompt.get(prompt_key(prompt))
+        if recorded is not None:
+            return recorded
+        kind = prompts.prompt_kind(prompt)
+        responses = self.by_kind.get(kind)
+        if not responses:
+            return super().respond(prompt)
+        with self._lock:
+            turn = self._turn.get(kind, 0)
+            self._turn[kind] = turn + 1
+        return responses[turn % len(responses)]
+
+
+class RecordingLLM:
+    """Wraps a real model and appends every prompt and response to a JSONL file for ``ReplayLLM``"""
+
+    def __init__(self, llm, path):
+        self.llm = llm
+        self.path = path
+        self.temperature = getattr(llm, "temperature", None)
+        self.model_name = getattr(llm, "model_name", type(llm).__name__)
+        self._lock = threading.Lock()
+
+    def _record(self, prompt, response):
+        record = {"prompt_sha256": prompt_key(prompt), "kind": prompts.prompt_kind(str(prompt)),
+                  "response": response}
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def invoke(self, prompt):
+        res = self.llm.invoke(prompt)
+        self._record(prompt, res.content)
+        return res
+
+    async def ainvoke(self, prompt):
+        res = await self.llm.ainvoke(prompt)
+        self._record(prompt, res.content)
+        return res
+
+    async def astream(self, prompt):
+        chunks = []
+        async for chunk in self.llm.astream(prompt):
+            chunks.append(chunk.content)
+            yield chunk
+        self._record(prompt, "".join(chunks))
+
+
+class FakeProvider:
+    """Async provider for benchmarking LLMDispatcher without a network.
+
+    Each call sleeps ``latency`` seconds (plus up to ``jitter``), fails with a 429
+    for a ``rate_limit_rate`` fraction of calls, and also answers 429 once
+    ``server_rpm`` calls have been accepted within the last ``window`` seconds,
+    like a real quota.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.0, rate_limit_rate=0.0, server_rpm=None,
+                 retry_after=1.0, seed=None, window=60.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.server_rpm = server_rpm
+        self.retry_after = retry_after
+        self.window = window
+        self.random = random.Random(seed)
+        self.stub = StubLLM()
+        self.calls = 0
+        self.accepted = []
+        self.rejected = 0
+
+    async def complete(self, prompt):
+        now = time.monotonic()
+        self.calls += 1
+        self.accepted = [t for t in self.accepted if t > now - self.window]
+        over_quota = self.server_rpm is not None and len(self.accepted) >= self.server_rpm
+        if over_quota or self.random.random() < self.rate_limit_rate:
+            self.rejected += 1
+            raise RateLimitError("429 Too Many Requests", retry_after=self.retry_after)
+        self.accepted.append(now)
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        return self.stub.respond(prompt)
@@ -0,0 +1,255 @@
+"""Shared HTTP fetching for careers pages and company About pages.
+
+One ``Fetcher`` per process keeps a pooled keep-alive session, caps concurrent
+requests globally and per host, and stores response bodies on disk together
+with their ETag/Last-Modified so repeat fetches become conditional GETs that
+usually come back as 304. Bodies are streamed and cut off at ``max_bytes``.
+Requests to one host are spaced ``host_delay`` seconds apart, and the body
+cache drops entries older than ``cache_ttl`` and the least recently used ones
+beyond ``max_cache_bytes``.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from metrics import get_metrics
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; ColdEmailGenerator/2.0)"
+DEFAULT_HOST_DELAY = 0.5
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    text: str
+    from_cache: bool = False
+    truncated: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300 or self.status == 304
+
+    def raise_for_status(self):
+        if not self.ok:
+            import requests
+            raise requests.HTTPError(f"{self.status} error fetching {self.url}")
+
+
+class Fetcher:
+    def __init__(self, cache_dir=".http_cache", max_connections=32, per_host=4, host_delay=DEFAULT_HOST_DELAY,
+                 timeout=15, max_bytes=10 * 1024 * 1024, user_agent=DEFAULT_USER_AGENT,
+                 cache_ttl=14 * 24 * 3600, max_cache_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.cache_ttl = cache_ttl
+        self.max_cache_bytes = max_cache_bytes
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        # requests is only imported once something is actually fetched
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._request_error = requests.RequestException
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = user_agent
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._hosts = {}
+        self._last_request = {}
+        self._lock = threading.Lock()
+        self._stores = 0
+        self.stats = {"requests": 0, "not_modified": 0, "cached_bodies": 0, "truncated": 0, "errors": 0,
+                      "evicted": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.evict()
+
+    def _host_slot(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _count(self, name, n=1):
+        # fetch runs on many threads at once, and += on a dict item is not atomic
+        with self._lock:
+            self.stats[name] += n
+
+    def _wait_politely(self, host):
+        if not self.host_delay:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._last_request.get(host, 0.0) + self.host_delay)
+            self._last_request[host] = start
+        if start > now:
+            time.sleep(start - now)
+
+    def _cache_paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json"), os.path.join(self.cache_dir, key + ".body")
+
+    def _cached(self, url):
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            # A body file's mtime is when it was stored and its atime when it was last used
+            stored = os.stat(body_path).st_mtime
+            if time.time() - stored > self.cache_ttl:
+                return None
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            os.utime(body_path, (time.time(), stored))
+            return meta, body
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, url, response, body):
+        validators = {k: response.headers.get(k) for k in ("ETag", "Last-Modified") if response.headers.get(k)}
+        if not self.cache_dir or not validators:
+            return False
+        meta_path, body_path = self._cache_paths(url)
+        meta = dict(validators, url=url, status=response.status_code, encoding=response.encoding)
+        # Write to temp files first so a concurrent reader never sees half a body
+        for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+        with self._lock:
+            self._stores += 1
+            # Scanning the directory on every store is wasteful; check the bounds periodically
+            due = self._stores % 100 == 0
+        if due:
+            self.evict()
+        return True
+
+    def evict(self):
+        """Drop cached bodies older than ``cache_ttl``, then the least recently used
+        ones until the cache fits in ``max_cache_bytes``"""
+        if not self.cache_dir:
+            return
+        now = time.time()
+        entries, total, evicted = [], 0, 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".body"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            key = entry.name[:-len(".body")]
+            if now - stat.st_mtime > self.cache_ttl:
+                evicted += self._remove(key)
+            else:
+                entries.append((stat.st_atime, stat.st_size, key))
+                total += stat.st_size
+        for _, size, key in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            evicted += self._remove(key)
+            total -= size
+        self._count("evicted", evicted)
+
+    def _remove(self, key):
+        removed = 0
+        for suffix in (".json", ".body"):
+            try:
+                os.remove(os.path.join(self.cache_dir, key + suffix))
+                removed = 1
+            except OSError:
+                pass
+        return removed
+
+    def fetch(self, url, max_bytes=None, revalidate=True):
+        """GET ``url`` through the pool, revalidating any cached copy"""
+        max_bytes = max_bytes or self.max_bytes
+        host = urlsplit(url).netloc
+        cached = self._cached(url) if revalidate else None
+        headers = {}
+        if cached:
+            if cached[0].get("ETag"):
+                headers["If-None-Match"] = cached[0]["ETag"]
+            if cached[0].get("Last-Modified"):
+                headers["If-Modified-Since"] = cached[0]["Last-Modified"]
+
+        started = time.perf_counter()
+        # Queue and sleep for the host first, holding only its slot, so a slow or rate-limited
+        # host can't sit on global slots that requests to other hosts are waiting for
+        with self._host_slot(host):
+            self._wait_politely(host)
+            with self._slots:
+                self._count("requests")
+                try:
+                    with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                        if response.status_code == 304 and cached:
+                            self._count("not_modified")
+                            meta, body = cached
+                            return FetchResult(url, meta["status"],
+                                               body.decode(meta.get("encoding") or "utf-8", "replace"),
+                                               from_cache=True, elapsed=time.perf_counter() - started)
+                        chunks, size, truncated = [], 0, False
+                        for chunk in response.iter_content(chunk_size=65536):
+                            chunks.append(chunk)
+                            size += len(chunk)
+                            if size >= max_bytes:
+                                truncated = True
+                                break
+                        body = b"".join(chunks)[:max_bytes]
+                except self._request_error:
+                    self._count("errors")
+                    raise
+
+        if truncated:
+            self._count("truncated")
+        elif response.ok and self._store(url, response, body):
+            self._count("cached_bodies")
+        encoding = response.encoding or "utf-8"
+        return FetchResult(url, response.status_code, body.decode(encoding, "replace"), truncated=truncated,
+                           elapsed=time.perf_counter() - started)
+
+    async def afetch(self, url, max_bytes=None, revalidate=True):
+        """``fetch`` for coroutines; the pool limits still apply across both"""
+        return await asyncio.to_thread(self.fetch, url, max_bytes, revalidate)
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher():
+    """The process-wide fetcher shared by page loading and company research"""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher(cache_dir=os.getenv("HTTP_CACHE_DIR", ".http_cache"),
+                                       host_delay=float(os.getenv("HTTP_HOST_DELAY", DEFAULT_HOST_DELAY)))
+        return _default_fetcher
+
+
+def html_to_text(html):
+    """Visible text of an HTML page, as WebBaseLoader extracts it"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def load_page_text(url, fetcher=None):
+    """Fetch a careers page and return its text"""
+    with get_metrics().span("load_page") as span:
+        result = (fetcher or get_fetcher()).fetch(url)
+        if span is not None:
+            span.attributes.update(status=result.status, from_cache=result.from_cache)
+        result.raise_for_status()
+        return html_to_text(result.text)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CAREERS_PAGE = """<html><head><title>Careers {n}</title></head>
+<body>
+<h1>Senior Python Engineer {n}</h1>
+<p>Fixture Company {n} is hiring. Skills: Python Django PostgreSQL Docker AWS.</p>
+<p>Experience: 5+ years building web services. Apply at https://example.com/apply/{n}</p>
+</body></html>
+"""
+
+ABOUT_PAGE = """<html><body><h1>About us</h1>
+<p>We value craftsmanship and customer focus.</p></body></html>
+"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves synthetic careers pages at ``/careers/<n>``, an ``/about`` page,
+    ``/huge/<mb>`` bodies of ``<mb>`` megabytes and, when ``pages_dir`` is set,
+    saved pages from that directory at ``/pages/<file name>``.
+
+    Pages carry an ETag and answer ``If-None-Match`` with 304, and a
+    ``?delay=<seconds>`` query parameter slows a single response down.
+    """
+
+    delay = 0.0
+    pages_dir = None
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = dict(part.partition("=")[::2] for part in query.split("&") if part)
+        delay = float(params.get("delay", self.delay))
+        if delay:
+            time.sleep(delay)
+        if path.startswith("/careers/"):
+            body = CAREERS_PAGE.format(n=path.rsplit("/", 1)[-1])
+        elif path == "/about":
+            body = ABOUT_PAGE
+        elif path.startswith("/pages/") and self.pages_dir:
+            file_path = os.path.join(self.pages_dir, os.path.basename(path))
+            if not os.path.isfile(file_path):
+                self.send_error(404)
+                return
+            with open(file_path, encoding="utf-8") as f:
+                body = f.read()
+        elif path.startswith("/huge/"):
+            self._send_huge(float(path.rsplit("/", 1)[-1]))
+            return
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        etag = '"%s"' % hashlib.md5(payload).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_huge(self, megabytes):
+        block = (b"<p>" + b"filler " * 145 + b"</p>\n")[:1024]
+        blocks = int(megabytes * 1024)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(block) * blocks))
+        self.end_headers()
+        try:
+            for _ in range(blocks):
+                self.wfile.write(block)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading at its size limit
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_fixtures(delay=0.0, port=0, pages_dir=None):
+    """Run the fixture server on a background thread and yield its base URL"""
+    handler = type("DelayedFixtureHandler", (FixtureHandler,), {"delay": delay, "pages_dir": pages_dir})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    with serve_fixtures(port=8765) as base_url:
+        print(f"Serving fixtures at {base_url}/careers/<n> (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import threading
+
+from sqlite_util import ThreadLocalConnection
+
+COLUMNS = ("id", "date", "job_title", "company", "url", "template_style")
+
+
+class EmailHistory:
+    """Saved emails in an append-only SQLite table.
+
+    Saving is one INSERT instead of rewriting a JSON file, WAL mode lets several
+    Streamlit sessions write at the same time, and reads are newest-first pages
+    with optional filters so the History tab never loads more than it shows.
+    The first time a store is opened next to an old ``email_history.json`` its
+    entries are imported once.
+    """
+
+    def __init__(self, path="email_history.sqlite3", legacy_json="email_history.json"):
+        self.path = path
+        self._conn = ThreadLocalConnection(path, row_factory=sqlite3.Row)
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS emails (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            date TEXT NOT NULL,
+                            job_title TEXT NOT NULL,
+                            company TEXT NOT NULL,
+                            url TEXT NOT NULL,
+                            template_style TEXT NOT NULL,
+                            email TEXT NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS emails_date ON emails (date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS emails_company ON emails (company COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS emails_template ON emails (template_style)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS follow_ups (
+                            email_id INTEGER NOT NULL,
+                            days_passed INTEGER NOT NULL,
+                            follow_up TEXT NOT NULL,
+                            PRIMARY KEY (email_id, days_passed))""")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.commit()
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def migrate_json(self, json_path):
+        """Import a legacy JSON history file once; returns the number of entries imported"""
+        conn = self._conn()
+        key = "migrated:" + os.path.abspath(json_path)
+        if not os.path.exists(json_path) or conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        try:
+            with open(json_path) as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading {json_path}: {e}")
+            return 0
+        with conn:
+            # Recheck inside the write transaction in case another session got here first
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+            conn.executemany(
+                "INSERT INTO emails (date, job_title, company, url, template_style, email) VALUES (?, ?, ?, ?, ?, ?)",
+                [(e.get("date", ""), e.get("job_title", "Unknown Role"), e.get("company", "Unknown Company"),
+                  e.get("url", ""), e.get("template_style", ""), e.get("email", "")) for e in entries])
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(len(entries))))
+        return len(entries)
+
+    def add(self, entry):
+        """Append one entry (a dict with the legacy JSON keys) and return its id"""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO emails (date, job_title, company, url, template_style, email) VALUES (?, ?, ?, ?, ?, ?)",
+                (entry["date"], entry["job_title"], entry["company"], entry["url"],
+                 entry["template_style"], entry["email"]))
+        return cursor.lastrowid
+
+    @staticmethod
+    def _where(company=None, role=None, template_style=None, date_from=None, date_to=None, search=None):
+        clauses, params = [], []
+        if company:
+            clauses.append("company LIKE ?")
+            params.append(f"%{company}%")
+        if role:
+            clauses.append("job_title LIKE ?")
+            params.append(f"%{role}%")
+        if template_style:
+            clauses.append("template_style = ?")
+            params.append(template_style)
+        if date_from:
+            clauses.append("date >= ?")
+            params.append(str(date_from))
+        if date_to:
+            # Dates are stored as "YYYY-MM-DD HH:MM:SS", so a bare day includes all of it
+            clauses.append("date <= ?")
+            params.append(f"{date_to} 23:59:59" if len(str(date_to)) == 10 else str(date_to))
+        if search:
+            clauses.append("(job_title LIKE ? OR company LIKE ? OR url LIKE ?)")
+            params.extend([f"%{search}%"] * 3)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def page(self, offset=0, limit=20, include_email=False, **filters):
+        """Newest-first entries matching ``filters``, without bodies unless asked"""
+        where, params = self._where(**filters)
+        columns = ", ".join(COLUMNS + (("email",) if include_email else ()))
+        rows = self._conn().execute(
+            f"SELECT {columns} FROM emails{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        return self._conn().execute(f"SELECT COUNT(*) FROM emails{where}", params).fetchone()[0]
+
+    def get(self, entry_id):
+        """One full entry, including the email body, or None"""
+        row = self._conn().execute("SELECT * FROM emails WHERE id = ?", (entry_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_follow_up(self, entry_id, days_passed=7):
+        row = self._conn().execute("SELECT follow_up FROM follow_ups WHERE email_id = ? AND days_passed = ?",
+                                   (entry_id, days_passed)).fetchone()
+        return row[0] if row else None
+
+    def save_follow_up(self, entry_id, follow_up, days_passed=7):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO follow_ups (email_id, days_passed, follow_up) VALUES (?, ?, ?)",
+                         (entry_id, days_passed, follow_up))
+
+    def template_styles(self):
+        return [row[0] for row in self._conn().execute("SELECT DISTINCT template_style FROM emails ORDER BY 1")]
+
+
+_default_history = None
+_default_lock = threading.Lock()
+
+
+def get_history():
+    """The process-wide history store"""
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = EmailHistory(os.getenv("EMAIL_HISTORY_PATH", "email_history.sqlite3"))
+        return _default_history
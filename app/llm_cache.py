@@ -0,0 +1,82 @@
+import hashlib
+import json
+import time
+
+from sqlite_util import ThreadLocalConnection, hit_stats
+
+
+class ResponseCache:
+    """Disk-backed LLM response cache keyed on prompt, model and temperature.
+
+    Entries live in SQLite so they survive Streamlit reruns and are shared by
+    every process on the machine. Entries older than ``ttl`` seconds are treated
+    as misses, and once the table grows past ``max_entries`` the least recently
+    used rows are evicted.
+    """
+
+    def __init__(self, path="llm_cache.sqlite3", ttl=7 * 24 * 3600, max_entries=20000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = ThreadLocalConnection(path)
+        self._writes = 0
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                            key TEXT PRIMARY KEY,
+                            response TEXT NOT NULL,
+                            created REAL NOT NULL,
+                            accessed REAL NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        conn.commit()
+
+    @staticmethod
+    def make_key(prompt, model, temperature):
+        payload = json.dumps([prompt, model, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+            self.misses += 1
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def set(self, key, response):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                     (key, response, now, now))
+        conn.commit()
+        self._writes += 1
+        # Counting rows on every write is wasteful; check the bound periodically
+        if self._writes % max(1, min(100, self.max_entries // 10)) == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then least recently used rows beyond ``max_entries``"""
+        conn = self._conn()
+        conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("""DELETE FROM responses WHERE key IN (
+                                SELECT key FROM responses ORDER BY accessed LIMIT ?)""", (excess,))
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+
+    def stats(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return hit_stats(self.hits, self.misses, entries=entries)
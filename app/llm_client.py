@@ -0,0 +1,325 @@
+"""Async LLM dispatch with request/token budgets, coalescing and retries.
+
+``LLMDispatcher`` sits between ``Chain`` and the model provider. Every prompt
+waits for room in a sliding one-minute window of requests and estimated tokens,
+identical prompts that are already in flight share one provider call, and rate
+limits or transient failures are retried with jittered exponential backoff until
+the per-job deadline runs out. Synchronous callers (Streamlit, batch worker
+threads) go through ``complete``, which runs on one background event loop so the
+budgets are shared by every thread in the process. ``astream``/``stream`` do the
+same for streamed completions, and every call records its time to first token
+and total latency.
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+
+class RateLimitError(Exception):
+    """The provider answered 429; ``retry_after`` is its hint in seconds, if any"""
+
+    def __init__(self, message="Rate limit exceeded", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TransientLLMError(Exception):
+    """A failure worth retrying (timeouts, connection resets, 5xx)"""
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The job's deadline passed before the provider produced an answer"""
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose
+    return max(1, len(text) // 4)
+
+
+class LangChainProvider:
+    """Adapts a LangChain chat model (or anything with ``invoke``) to the dispatcher"""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    async def complete(self, prompt):
+        try:
+            if hasattr(self.llm, "ainvoke"):
+                res = await self.llm.ainvoke(prompt)
+            else:
+                res = await asyncio.to_thread(self.llm.invoke, prompt)
+        except Exception as e:
+            raise _classify_error(e) from e
+        return res.content
+
+    async def stream(self, prompt):
+        """Yield completion text as it arrives; models without streaming give one chunk"""
+        if not hasattr(self.llm, "astream"):
+            yield await self.complete(prompt)
+            return
+        try:
+            async for chunk in self.llm.astream(prompt):
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            raise _classify_error(e) from e
+
+
+def _classify_error(e):
+    """Map provider SDK errors onto the dispatcher's retryable exceptions"""
+    if isinstance(e, (RateLimitError, TransientLLMError)):
+        return e
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    if status == 429 or type(e).__name__ == "RateLimitError":
+        retry_after = None
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+        return RateLimitError(str(e), retry_after=retry_after)
+    if (status and status >= 500) or type(e).__name__ in ("APIConnectionError", "APITimeoutError",
+                                                         "InternalServerError"):
+        return TransientLLMError(str(e))
+    return e
+
+
+_END = object()
+
+
+class LLMDispatcher:
+    def __init__(self, provider, requests_per_minute=30, tokens_per_minute=30000,
+                 max_concurrency=8, max_retries=6, deadline=120.0, base_backoff=1.0,
+                 max_backoff=30.0, completion_tokens=400, window=60.0):
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.completion_tokens = completion_tokens
+        # Budgets are "per minute" but the window can be shortened for benchmarks
+        self.window = window
+
+        self._window = deque()  # (timestamp, tokens) of calls started within the window
+        self._window_tokens = 0
+        self._pause_until = 0.0
+        self._inflight = {}
+        self._lock = None
+        self._slots = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+        self._waiting = 0
+        self._running = 0
+        self._waits = deque(maxlen=1000)
+        self._ttfts = deque(maxlen=1000)
+        self._latencies = deque(maxlen=1000)
+        self.counters = {"requests": 0, "streams": 0, "provider_calls": 0, "coalesced": 0, "rate_limited": 0,
+                         "retries": 0, "failures": 0, "deadline_exceeded": 0}
+
+    # -- public API -------------------------------------------------------
+
+    async def acomplete(self, prompt, deadline=None):
+        """Return the completion for ``prompt``, sharing any identical in-flight call"""
+        self._ensure_primitives()
+        self.counters["requests"] += 1
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        task = self._inflight.get(prompt)
+        if task is None:
+            task = asyncio.ensure_future(self._run(prompt, deadline_at))
+            self._inflight[prompt] = task
+            task.add_done_callback(lambda _: self._inflight.pop(prompt, None))
+        else:
+            self.counters["coalesced"] += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), max(deadline_at - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self.counters["deadline_exceeded"] += 1
+            raise LLMDeadlineExceeded(f"No LLM response within {deadline or self.deadline:.0f}s") from None
+        # Nothing is shown until the whole completion is back, so the first token is the last
+        elapsed = time.monotonic() - started
+        self._ttfts.append(elapsed)
+        self._latencies.append(elapsed)
+        return result
+
+    def complete(self, prompt, deadline=None):
+        """Blocking wrapper around ``acomplete`` for threads without an event loop"""
+        future = asyncio.run_coroutine_threadsafe(self.acomplete(prompt, deadline), self._background_loop())
+        return future.result()
+
+    async def astream(self, prompt, deadline=None, timing=None):
+        """Yield the completion for ``prompt`` in chunks as the provider produces them.
+
+        Rate limits and transient errors are retried only until the first chunk
+        arrives. ``timing``, if given, gets ``ttft`` and ``total`` in seconds.
+        """
+        self._ensure_primitives()
+        self.counters["requests"] += 1
+        self.counters["streams"] += 1
+        started = time.monotonic()
+        deadline_at = started + (deadline if deadline is not None else self.deadline)
+        tokens = estimate_tokens(prompt) + self.completion_tokens
+        received = False
+        attempt = 0
+        while True:
+            await self._acquire_budget(tokens, deadline_at)
+            async with self._slots:
+                self._running += 1
+                self.counters["provider_calls"] += 1
+                try:
+                    async for chunk in self.provider.stream(prompt):
+                        if not received:
+                            received = True
+                            self._ttfts.append(time.monotonic() - started)
+                            if timing is not None:
+                                timing["ttft"] = self._ttfts[-1]
+                        yield chunk
+                    self._latencies.append(time.monotonic() - started)
+                    if timing is not None:
+                        timing["total"] = self._latencies[-1]
+                    return
+                except (RateLimitError, TransientLLMError) as e:
+                    if received:
+                        # Part of the answer is already on screen; a retry would repeat it
+                        self.counters["failures"] += 1
+                        raise
+                    if isinstance(e, RateLimitError):
+                        self.counters["rate_limited"] += 1
+                    error, hint = e, getattr(e, "retry_after", None)
+                except Exception:
+                    self.counters["failures"] += 1
+                    raise
+                finally:
+                    self._running -= 1
+            attempt += 1
+            await self._backoff(attempt, error, hint, deadline_at)
+
+    def stream(self, prompt, deadline=None, timing=None):
+        """Blocking generator over ``astream`` for threads without an event loop"""
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.astream(prompt, deadline, timing):
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            else:
+                chunks.put(_END)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._background_loop())
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _END:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            # The caller may stop reading early; don't keep the provider call going
+            future.cancel()
+
+    def metrics(self):
+        def pct(samples, p):
+            samples = sorted(samples)
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3) if samples else 0.0
+
+        self._expire(time.monotonic())
+        return dict(self.counters,
+                    queue_depth=self._waiting,
+                    running=self._running,
+                    window_requests=len(self._window),
+                    window_tokens=self._window_tokens,
+                    wait_p50=pct(self._waits, 0.5), wait_p95=pct(self._waits, 0.95),
+                    wait_max=round(max(self._waits), 3) if self._waits else 0.0,
+                    ttft_p50=pct(self._ttfts, 0.5), ttft_p95=pct(self._ttfts, 0.95),
+                    latency_p50=pct(self._latencies, 0.5), latency_p95=pct(self._latencies, 0.95))
+
+    # -- internals --------------------------------------------------------
+
+    def _ensure_primitives(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    def _background_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-dispatcher", daemon=True).start()
+            return self._loop
+
+    def _expire(self, now):
+        while self._window and self._window[0][0] <= now - self.window:
+            self._window_tokens -= self._window.popleft()[1]
+
+    async def _acquire_budget(self, tokens, deadline_at):
+        """Wait (FIFO) until the request and token windows have room for this call"""
+        self._waiting += 1
+        queued_at = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._pause_until:
+                        delay = self._pause_until - now
+                    else:
+                        self._expire(now)
+                        fits_tokens = self._window_tokens + tokens <= self.tokens_per_minute or not self._window
+                        if len(self._window) < self.requests_per_minute and fits_tokens:
+                            self._window.append((now, tokens))
+                            self._window_tokens += tokens
+                            return
+                        # Sleep until the oldest call leaves the window
+                        delay = self._window[0][0] + self.window - now
+                    if now + delay > deadline_at:
+                        raise LLMDeadlineExceeded("Rate budget exhausted until after the deadline")
+                    await asyncio.sleep(max(delay, 0.005))
+        finally:
+            self._waiting -= 1
+            self._waits.append(time.monotonic() - queued_at)
+
+    async def _run(self, prompt, deadline_at):
+        tokens = estimate_tokens(prompt) + self.completion_tokens
+        attempt = 0
+        while True:
+            await self._acquire_budget(tokens, deadline_at)
+            async with self._slots:
+                self._running += 1
+                self.counters["provider_calls"] += 1
+                try:
+                    return await self.provider.complete(prompt)
+                except RateLimitError as e:
+                    self.counters["rate_limited"] += 1
+                    error, hint = e, e.retry_after
+                except TransientLLMError as e:
+                    error, hint = e, None
+                except Exception:
+                    self.counters["failures"] += 1
+                    raise
+                finally:
+                    self._running -= 1
+
+            attempt += 1
+            await self._backoff(attempt, error, hint, deadline_at)
+
+    async def _backoff(self, attempt, error, hint, deadline_at):
+        """Sleep before retry ``attempt``, or re-raise ``error`` once retries or time run out"""
+        backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        if hint:
+            backoff = max(backoff, hint)
+            # A 429 applies to everyone sharing the key, so hold the whole queue
+            self._pause_until = max(self._pause_until, time.monotonic() + hint)
+        if attempt > self.max_retries or time.monotonic() + backoff > deadline_at:
+            self.counters["failures"] += 1
+            raise error
+        self.counters["retries"] += 1
+        await asyncio.sleep(backoff)
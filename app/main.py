@@ -1,25 +1,20 @@
 import os
-import re
-import pandas as pd
 import streamlit as st
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.exceptions import OutputParserException
-from langchain_community.document_loaders import WebBaseLoader
 from dotenv import load_dotenv
 import json
-import requests
-from bs4 import BeautifulSoup
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-# Set page config first - this must come before any other Streamlit command
-st.set_page_config(layout="wide", page_title="Cold Email Generator Pro", page_icon="📧")
+from chains import Chain
+from fetcher import load_page_text
+from history import get_history
+from metrics import get_metrics
+from portfolio import HybridPortfolio
+from utils import clean_text
 
-load_dotenv()
-
-# Custom purple theme styling - now applied after set_page_config
-st.markdown("""
+# Custom purple theme styling, applied right after set_page_config
+THEME_CSS = """
 <style>
     /* Primary purple color and accents */
     .stApp {
@@ -126,356 +121,330 @@ st.markdown("""
         border-top: 4px solid #6a0dad;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def save_email_history(email, job_info, url, template_style):
+    """Save generated email to history and return its id"""
+    return get_history().add({
+        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "job_title": job_info.get("role", "Unknown Role"),
+        "company": job_info.get("company_name", "Unknown Company"),
+        "url": url,
+        "template_style": template_style,
+        "email": email
+    })
+
+# Number of saved emails per History tab page
+HISTORY_PAGE_SIZE = 20
+
+# Upper bound on write_mail calls in flight when fanning out over every job on a page
+MAX_PARALLEL_EMAILS = 4
+
+def render_job_details(job):
+    """Show the extracted fields of a job posting"""
+    job_details = {
+        "Role": job.get("role", "N/A"),
+        "Company": job.get("company_name", "N/A"),
+        "Experience": job.get("experience", "N/A"),
+        "Skills": ", ".join(job.get("skills", [])) if isinstance(job.get("skills", []), list) else job.get("skills", "N/A")
+    }
+    
+    for key, value in job_details.items():
+        st.write(f"**{key}:** {value}")
 
-class Chain:
-    def __init__(self):
-        self.llm = ChatGroq(
-            temperature=0, 
-            groq_api_key=os.getenv("GROQ_API_KEY"), 
-            model_name="llama3-8b-8192"
-        )
-        # Make sure there are no unescaped {employees} variables in templates
-        self.email_templates = {
-            "formal": "You are Mohan, a business development executive at AtliQ. Write a formal and professional cold email to the client regarding the job mentioned above describing AtliQ's capability in fulfilling their needs.",
-            "conversational": "You are Mohan, a business development executive at AtliQ. Write a friendly and conversational cold email to the client that shows personality while highlighting AtliQ's capabilities for the job above.",
-            "problem-solution": "You are Mohan, a business development executive at AtliQ. Write a cold email that identifies specific problems the client might be facing based on the job description, and position AtliQ's solutions as the answer. Mention how our team of experts can help solve their challenges."
+def write_all_job_emails(chain, portfolio, jobs, email_style, personalization, num_portfolio_links, company_research=None,
+                         email_templates=None):
+    """Write one email per extracted job concurrently, rendering each as soon as it is done"""
+    # One matching pass for every job on the page
+    links_per_job = portfolio.query_links_batch([job.get('skills', []) for job in jobs], n_results=num_portfolio_links)
+    
+    # Settle the company research once so the parallel writers all share it
+    company_research = chain.resolve_company_research(jobs[0], personalization, company_research)
+    
+    progress = st.progress(0.0, text=f"Writing {len(jobs)} emails...")
+    slots = []
+    for job in jobs:
+        slot = st.empty()
+        slot.info(f"✍️ Writing email for {job.get('role', 'Unknown Role')}...")
+        slots.append(slot)
+    
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_EMAILS, len(jobs))) as executor:
+        futures = {
+            executor.submit(get_metrics().bind(chain.write_mail), job, links, template_style=email_style, personalization=personalization,
+                            company_research=company_research, email_templates=email_templates): i
+            for i, (job, links) in enumerate(zip(jobs, links_per_job))
         }
-        
-        self.company_research_cache = {}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            with slots[i].container():
+                st.markdown(f'<h3 style="color: #6a0dad;">{i + 1}. {jobs[i].get("role", "Unknown Role")}</h3>', unsafe_allow_html=True)
+                render_job_details(jobs[i])
+                st.code(results[i], language='markdown')
+            progress.progress(done / len(jobs), text=f"Written {done} of {len(jobs)} emails")
+    
+    st.download_button(
+        "Download all emails 📥",
+        data=json.dumps([{"job": job, "email": email} for job, email in zip(jobs, results)], indent=2),
+        file_name="emails.json",
+        mime="application/json"
+    )
 
-    def extract_jobs(self, cleaned_text):
-        prompt_extract = PromptTemplate.from_template(
-            """
-            ### SCRAPED TEXT FROM WEBSITE:
-            {page_data}
-            ### INSTRUCTION:
-            The scraped text is from the career's page of a website.
-            Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills`, `description`, and `company_name` (if available).
-            Only return the valid JSON.
-            ### VALID JSON (NO PREAMBLE):
-            """
-        )
-        chain_extract = prompt_extract | self.llm
-        res = chain_extract.invoke(input={"page_data": cleaned_text})
-        try:
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-        except OutputParserException:
-            raise OutputParserException("Context too big. Unable to parse jobs.")
-        return res if isinstance(res, list) else [res]
+def stream_to_code(chunks):
+    """Render streamed text into a code block as it arrives and return the full text"""
+    slot = st.empty()
+    text = ""
+    last_render = 0.0
+    for chunk in chunks:
+        text += chunk
+        # Re-rendering on every token floods the websocket; a few frames a second reads as live
+        if time.perf_counter() - last_render > 0.05:
+            slot.code(text + "▌", language='markdown')
+            last_render = time.perf_counter()
+    slot.code(text, language='markdown')
+    return text
 
-    def extract_company_info(self, url, company_name=None):
-        """Extract company information from the URL or by searching for the company name"""
-        if url in self.company_research_cache:
-            return self.company_research_cache[url]
-            
-        base_url = '/'.join(url.split('/')[:3])
-        about_url = f"{base_url}/about"
-        
-        try:
-            # Try to find About page
-            response = requests.get(about_url, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                about_text = soup.get_text()
-                about_text = ' '.join(about_text.split())[:5000]  # Truncate to prevent token overload
-            else:
-                about_text = "No company information found."
-            
-            # If company name is available, try to get additional info
-            company_info = f"Company: {company_name if company_name else 'Unknown'}\nAbout: {about_text}"
-            
-            # Extract company info using LLM
-            prompt = PromptTemplate.from_template(
-                """
-                ### COMPANY INFO:
-                {company_info}
-                
-                ### INSTRUCTION:
-                Extract key information about this company that would be useful for a cold email. Focus on:
-                1. Company values
-                2. Recent initiatives or projects 
-                3. Company pain points based on industry
-                4. Company size and scale
-                
-                Format the response as JSON with these keys: values, initiatives, pain_points, size.
-                Only return the valid JSON.
-                """
-            )
-            
-            chain = prompt | self.llm
-            res = chain.invoke({"company_info": company_info})
-            
-            try:
-                json_parser = JsonOutputParser()
-                extracted_info = json_parser.parse(res.content)
-                # Cache the result
-                self.company_research_cache[url] = extracted_info
-                return extracted_info
-            except:
-                return {"values": [], "initiatives": [], "pain_points": [], "size": "Unknown"}
-                
-        except Exception as e:
-            print(f"Error extracting company info: {e}")
-            return {"values": [], "initiatives": [], "pain_points": [], "size": "Unknown"}
+def stream_to_tabs(variants, timings):
+    """Render ``(style, chunk)`` pairs into one tab per style as they arrive; returns the texts"""
+    tabs = st.tabs([style.replace("-", " ").title() for style in timings])
+    slots = {}
+    for style, tab in zip(timings, tabs):
+        with tab:
+            slots[style] = st.empty()
+            slots[style].info("✍️ Writing...")
+    texts = {style: "" for style in timings}
+    last_render = 0.0
+    for style, chunk in variants:
+        texts[style] += chunk
+        if time.perf_counter() - last_render > 0.05:
+            for name, text in texts.items():
+                if text:
+                    slots[name].code(text + "▌", language='markdown')
+            last_render = time.perf_counter()
+    for style, tab in zip(timings, tabs):
+        slots[style].code(texts[style], language='markdown')
+        with tab:
+            render_timing(timings[style])
+    return texts
 
-    def write_mail(self, job, portfolio_links, template_style="formal", personalization=None):
-        """
-        Generate an email based on job details using a direct approach without complex template variables.
-        """
-        try:
-            # Get basic job info as strings
-            job_str = str(job)
-            portfolio_str = str(portfolio_links)
-            
-            # Get info for company research
-            company_research_text = ""
-            if personalization and personalization.get('include_company_research', False):
-                try:
-                    company_url = personalization.get('company_url', '')
-                    company_name = job.get('company_name', 'Unknown')
-                    company_research = self.extract_company_info(company_url, company_name)
-                    
-                    company_values = ", ".join([str(v) for v in company_research.get('values', [])])
-                    company_initiatives = ", ".join([str(i) for i in company_research.get('initiatives', [])])
-                    company_pain_points = ", ".join([str(p) for p in company_research.get('pain_points', [])])
-                    company_size = str(company_research.get('size', 'Unknown'))
-                    
-                    company_research_text = f"""
-                    Company Values: {company_values}
-                    Recent Initiatives: {company_initiatives}
-                    Potential Pain Points: {company_pain_points}
-                    Company Size: {company_size}
-                    """
-                except Exception as e:
-                    company_research_text = f"No company research available. Error: {str(e)}"
-            
-            # Get personalization options
-            recipient = personalization.get('recipient_name', '') if personalization else ''
-            add_cta = personalization.get('add_call_to_action', False) if personalization else False
-            mention_competitors = personalization.get('mention_competitors', False) if personalization else False
-            
-            # Get template style info
-            style_info = ""
-            if template_style == "formal":
-                style_info = "Write a formal and professional cold email."
-            elif template_style == "conversational":
-                style_info = "Write a friendly and conversational cold email that shows personality."
-            elif template_style == "problem-solution":
-                style_info = "Write a cold email that identifies specific problems and positions AtliQ as the solution."
-            
-            # Create one simple prompt instead of using complex templates
-            simple_prompt = f"""
-            You are Mohan, a business development executive at AtliQ.
-            
-            Job details: {job_str}
-            
-            Portfolio links: {portfolio_str}
-            
-            {company_research_text}
-            
-            {style_info}
-            
-            Write a cold email to the client regarding this job. Describe AtliQ's capability in fulfilling their needs.
-            
-            AtliQ is an AI & Software Consulting company dedicated to facilitating the seamless integration of business processes through automated tools.
-            
-            {"Address the email to " + recipient if recipient else ""}
-            
-            {"Include a call to action at the end." if add_cta else ""}
-            
-            {"Mention how AtliQ compares favorably to competitors." if mention_competitors else ""}
-            
-            Format with subject line, greeting, body, and signature.
-            """
-            
-            # Use a direct invocation with a simple text prompt
-            response = self.llm.invoke(simple_prompt)
-            return response.content
-            
-        except Exception as e:
-            return f"Error generating email: {str(e)}"
-    def generate_follow_up(self, original_email, days_passed=7):
-        prompt_followup = PromptTemplate.from_template(
-            """
-            ### ORIGINAL EMAIL:
-            {original_email}
-            
-            ### INSTRUCTION:
-            You are Mohan, a business development executive at AtliQ. The recipient hasn't responded to your email sent {days} days ago.
-            Write a brief follow-up email that:
-            1. References the original email
-            2. Adds a new piece of value or information
-            3. Gently asks for a response
-            4. Maintains a professional but not pushy tone
-            
-            Format the email properly with subject line, greeting, body, and signature.
-            The subject should indicate this is a follow-up.
-            
-            Do not provide a preamble.
-            ### FOLLOW-UP EMAIL (NO PREAMBLE):
-            """
-        )
-        chain_followup = prompt_followup | self.llm
-        try:
-            res = chain_followup.invoke({"original_email": original_email, "days": days_passed})
-            return res.content
-        except Exception as e:
-            return f"Error generating follow-up email: {str(e)}"
+def render_timing(timing):
+    if timing:
+        st.caption(f"First words after {timing.get('ttft', 0):.2f}s · complete after {timing.get('total', 0):.2f}s")
 
-class SimplePortfolio:
-    def __init__(self):
-        # Use the CSV data directly to avoid file path issues
-        self.data = pd.DataFrame({
-            "Techstack": [
-                "React, Node.js, MongoDB",
-                "Angular,.NET, SQL Server",
-                "Vue.js, Ruby on Rails, PostgreSQL",
-                "Python, Django, MySQL",
-                "Java, Spring Boot, Oracle",
-                "Flutter, Firebase, GraphQL",
-                "WordPress, PHP, MySQL",
-                "Magento, PHP, MySQL",
-                "React Native, Node.js, MongoDB",
-                "iOS, Swift, Core Data",
-                "Android, Java, Room Persistence",
-                "Kotlin, Android, Firebase",
-                "Android TV, Kotlin, Android NDK",
-                "iOS, Swift, ARKit",
-                "Cross-platform, Xamarin, Azure",
-                "Backend, Kotlin, Spring Boot",
-                "Frontend, TypeScript, Angular",
-                "Full-stack, JavaScript, Express.js",
-                "Machine Learning, Python, TensorFlow",
-                "DevOps, Jenkins, Docker"
-            ],
-            "Links": [
-                "https://example.com/react-portfolio",
-                "https://example.com/angular-portfolio",
-                "https://example.com/vue-portfolio",
-                "https://example.com/python-portfolio",
-                "https://example.com/java-portfolio",
-                "https://example.com/flutter-portfolio",
-                "https://example.com/wordpress-portfolio",
-                "https://example.com/magento-portfolio",
-                "https://example.com/react-native-portfolio",
-                "https://example.com/ios-portfolio",
-                "https://example.com/android-portfolio",
-                "https://example.com/kotlin-android-portfolio",
-                "https://example.com/android-tv-portfolio",
-                "https://example.com/ios-ar-portfolio",
-                "https://example.com/xamarin-portfolio",
-                "https://example.com/kotlin-backend-portfolio",
-                "https://example.com/typescript-frontend-portfolio",
-                "https://example.com/full-stack-js-portfolio",
-                "https://example.com/ml-python-portfolio",
-                "https://example.com/devops-portfolio"
-            ]
-        })
-        
-        # Save to a file for future use (will create in current directory)
-        self.file_path = "my_portfolio.csv"
-        self.data.to_csv(self.file_path, index=False)
+def render_email_actions(chain, generated, show_email=True):
+    """Save and follow-up buttons for the last generated email.
+
+    The email lives in session state, so it is still there on the rerun a
+    button click triggers; ``show_email`` redraws it when it wasn't just streamed.
+    """
+    if show_email:
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h3 style="color: #6a0dad;">Job Details</h3>', unsafe_allow_html=True)
+        render_job_details(generated['job'])
+        st.markdown('<h3 style="color: #6a0dad; margin-top: 20px;">Generated Email</h3>', unsafe_allow_html=True)
+        st.code(generated['email'], language='markdown')
+        st.markdown('</div>', unsafe_allow_html=True)
     
-    def load_portfolio(self):
-        # No need to do anything here as we already loaded the data in __init__
-        pass
-        
-    def query_links(self, skills, n_results=2):
-        """Simple skill matching without vector database"""
-        relevant_links = []
-        
-        # Convert skills to lowercase for case-insensitive matching
-        if isinstance(skills, list):
-            skills_lower = [s.lower() for s in skills]
+    col_save, col_followup = st.columns(2)
+    with col_save:
+        if st.button("Save to History 💾", key="save_generated"):
+            if generated.get('history_id') is None:
+                generated['history_id'] = save_email_history(generated['email'], generated['job'], generated['url'],
+                                                             generated['template_style'])
+                if generated.get('follow_up'):
+                    get_history().save_follow_up(generated['history_id'], generated['follow_up'])
+            st.markdown('<div class="success-message">Email saved to history!</div>', unsafe_allow_html=True)
+    with col_followup:
+        generate_follow_up = st.button("Generate Follow-up Email 🔄", key="follow_up_generated")
+    
+    if generate_follow_up or generated.get('follow_up'):
+        st.markdown('<h3 style="color: #6a0dad; margin-top: 20px;">Follow-up Email</h3>', unsafe_allow_html=True)
+        if generated.get('history_id') is not None:
+            generated['follow_up'] = follow_up_for(chain, get_history(), {"id": generated['history_id'], "email": generated['email']})
+        elif generated.get('follow_up'):
+            st.code(generated['follow_up'], language='markdown')
         else:
-            skills_lower = [skills.lower()]
-        
-        # Score each portfolio entry based on skills match
-        scores = []
-        for idx, row in self.data.iterrows():
-            tech_stack = row["Techstack"].lower()
-            score = sum(1 for skill in skills_lower if skill in tech_stack)
-            scores.append((idx, score))
-        
-        # Sort by score and get top n results
-        top_indices = [idx for idx, score in sorted(scores, key=lambda x: x[1], reverse=True)[:n_results]]
+            timing = {}
+            follow_up = stream_to_code(chain.stream_follow_up(generated['email'], timing=timing))
+            render_timing(timing)
+            if not follow_up.startswith("Error generating follow-up email:"):
+                generated['follow_up'] = follow_up
+    
+    # Copy to clipboard button with better styling
+    st.markdown(
+        """
+        <button 
+            onclick="navigator.clipboard.writeText(document.querySelector('pre').innerText);alert('Copied to clipboard!')" 
+            class="custom-button">
+            📋 Copy to Clipboard
+        </button>
+        """, 
+        unsafe_allow_html=True
+    )
+
+def follow_up_for(chain, history, entry):
+    """Show the follow-up for a saved email, streaming it the first time and reading it from the history store after"""
+    follow_up = history.get_follow_up(entry['id'])
+    if follow_up is not None:
+        st.code(follow_up, language='markdown')
+        return follow_up
+    timing = {}
+    follow_up = stream_to_code(chain.stream_follow_up(entry['email'], timing=timing))
+    render_timing(timing)
+    if not follow_up.startswith("Error generating follow-up email:"):
+        history.save_follow_up(entry['id'], follow_up)
+    return follow_up
+
+def render_history(chain):
+    """One page of saved emails; only the opened entry's body is loaded"""
+    history = get_history()
+    
+    col1, col2, col3 = st.columns([3, 2, 2])
+    with col1:
+        search = st.text_input("Search role, company or URL", key="history_search")
+    with col2:
+        template_style = st.selectbox("Template", ["All"] + history.template_styles(), key="history_template")
+    with col3:
+        dates = st.date_input("Date range", value=(), key="history_dates")
+    filters = {
+        "search": search.strip() or None,
+        "template_style": None if template_style == "All" else template_style,
+        "date_from": dates[0] if len(dates) > 0 else None,
+        "date_to": dates[1] if len(dates) > 1 else None,
+    }
+    
+    total = history.count(**filters)
+    if not total:
+        st.info("No emails in history yet. Generate and save some emails to see them here.")
+        return
+    pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="history_page")
+    st.caption(f"{total} saved emails")
+    
+    open_id = st.session_state.get("history_open")
+    for entry in history.page(offset=(page - 1) * HISTORY_PAGE_SIZE, limit=HISTORY_PAGE_SIZE, **filters):
+        i = entry['id']
+        label = f"📅 {entry['date']} - {entry['job_title']} at {entry['company']}"
+        if i != open_id:
+            if st.button(label, key=f"history_open_{i}", use_container_width=True):
+                st.session_state["history_open"] = i
+                st.rerun()
+            continue
         
-        # Get the links for top matches
-        for idx in top_indices:
-            relevant_links.append({"links": self.data.iloc[idx]["Links"]})
+        entry = history.get(i)
+        with st.container(border=True):
+            st.markdown(f"**{label}**")
+            st.write(f"**URL:** {entry['url']}")
+            st.write(f"**Template:** {entry['template_style']}")
+            st.code(entry['email'], language='markdown')
             
-        # If no matches, return some default links
-        if not relevant_links:
-            for idx in range(min(n_results, len(self.data))):
-                relevant_links.append({"links": self.data.iloc[idx]["Links"]})
-                
-        return relevant_links
+            col1, col2 = st.columns(2)
+            with col1:
+                generate_follow_up = st.button("Generate Follow-up", key=f"followup_{i}")
+            with col2:
+                if st.button("Close", key=f"history_close_{i}"):
+                    st.session_state["history_open"] = None
+                    st.rerun()
+            if generate_follow_up or history.get_follow_up(i) is not None:
+                st.markdown('<h4 style="color: #6a0dad;">Follow-up Email</h4>', unsafe_allow_html=True)
+                follow_up_for(chain, history, entry)
+
+def render_portfolio(portfolio):
+    """One page of portfolio items, optionally filtered; the store is never loaded whole"""
+    store = portfolio.store
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search = st.text_input("Search tech stack or link", key="portfolio_search").strip()
+    with col2:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], key="portfolio_page_size")
     
-    def add_portfolio_item(self, techstack, link):
-        """Add a new portfolio item"""
-        # Add to dataframe
-        new_row = pd.DataFrame({"Techstack": [techstack], "Links": [link]})
-        self.data = pd.concat([self.data, new_row], ignore_index=True)
-        self.data.to_csv(self.file_path, index=False)
-        return True
+    total = len(store.search(search)) if search else len(store)
+    if not total:
+        st.info("No portfolio items match this search.")
+        return
+    pages = (total + page_size - 1) // page_size
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="portfolio_page")
+    _, rows = store.page((page - 1) * page_size, page_size, query=search)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    st.caption(f"{total} of {len(store)} portfolio items")
 
-def clean_text(text):
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*?>', '', text)
-    # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', ' ', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # Trim leading and trailing whitespace
-    text = text.strip()
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
+METRIC_STAGES = ["load_page", "clean_text", "extract_jobs", "extract_company_info", "query_links", "write_mail", "llm"]
 
-def save_email_history(email, job_info, url, template_style):
-    """Save generated email to history"""
-    history_file = "email_history.json"
+def render_metrics():
+    """Recent per-stage latency breakdowns, counters and exports"""
+    metrics = get_metrics()
+    metrics.enabled = st.checkbox("Collect timings and counters", value=metrics.enabled, key="metrics_enabled")
     
-    # Create entry
-    entry = {
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "job_title": job_info.get("role", "Unknown Role"),
-        "company": job_info.get("company_name", "Unknown Company"),
-        "url": url,
-        "template_style": template_style,
-        "email": email
-    }
+    traces = metrics.recent_traces()
+    if traces:
+        st.markdown("**Recent generations (ms per stage)**")
+        rows = []
+        for trace in traces:
+            row = {"time": datetime.fromtimestamp(trace["started"]).strftime("%H:%M:%S"),
+                   "url": trace["attributes"].get("url", ""),
+                   "total": round(trace["total"] * 1000)}
+            # Stages that run in parallel can add up to more than the total
+            row.update({stage: round(trace["stages"][stage] * 1000) for stage in METRIC_STAGES if stage in trace["stages"]})
+            row["error"] = trace["error"] or ""
+            rows.append(row)
+        st.dataframe(rows, use_container_width=True)
+    else:
+        st.info("Generate an email to see where the time goes.")
+    
+    summary = metrics.stage_summary()
+    if summary:
+        st.markdown("**All calls (ms)**")
+        st.dataframe([{"stage": stage, "count": s["count"], "p50": round(s["p50"] * 1000, 1),
+                       "p95": round(s["p95"] * 1000, 1), "p99": round(s["p99"] * 1000, 1)}
+                      for stage, s in summary.items()], use_container_width=True)
     
-    # Load existing history or create new
-    try:
-        with open(history_file, "r") as f:
-            history = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        history = []
+    counters = metrics.counters()
+    if counters:
+        st.markdown("**Counters**")
+        st.dataframe([{"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels.items()), "value": value}
+                      for name, series in counters.items() for labels, value in series], use_container_width=True)
     
-    # Add new entry and save
-    history.append(entry)
-    with open(history_file, "w") as f:
-        json.dump(history, f, indent=2)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Prometheus text", data=metrics.prometheus_text(), file_name="metrics.prom", mime="text/plain")
+    with col2:
+        st.download_button("OpenTelemetry JSON", data=json.dumps(metrics.otel_json()), file_name="traces.json",
+                           mime="application/json")
+    with col3:
+        if st.button("Reset metrics"):
+            metrics.reset()
+            st.rerun()
 
-def load_email_history():
-    """Load email history"""
-    history_file = "email_history.json"
-    try:
-        with open(history_file, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+def session_templates(chain):
+    """This session's style instructions; the cached Chain is shared by every session, so edits stay here"""
+    if "email_templates" not in st.session_state:
+        st.session_state["email_templates"] = dict(chain.email_templates)
+    return st.session_state["email_templates"]
 
-def create_streamlit_app():
-    # Initialize objects
-    chain = Chain()
-    portfolio = SimplePortfolio()
+@st.cache_resource
+def load_chain():
+    """One LLM client, dispatcher and response cache per process, shared by every session"""
+    return Chain()
+
+@st.cache_resource
+def load_portfolio():
+    """The portfolio and its ranking index, built once per process"""
+    portfolio = HybridPortfolio()
     portfolio.load_portfolio()
+    return portfolio
+
+def create_streamlit_app():
+    # Set page config first - this must come before any other Streamlit command.
+    # Done here rather than at import so importing this module has no side effects
+    st.set_page_config(layout="wide", page_title="Cold Email Generator Pro", page_icon="📧")
+    load_dotenv()
+    st.markdown(THEME_CSS, unsafe_allow_html=True)
+    
+    # Shared objects survive reruns; only the widgets are rebuilt
+    chain = load_chain()
+    portfolio = load_portfolio()
+    email_templates = session_templates(chain)
     
     # Title with logo and description
     st.markdown("""
@@ -523,6 +492,9 @@ def create_streamlit_app():
                 
                 # Number of portfolio links to include
                 num_portfolio_links = st.slider("Number of Portfolio Links to Include", min_value=1, max_value=5, value=2)
+                
+                generate_all_jobs = st.checkbox("Write an email for every job on the page", value=False)
+                compare_styles = st.checkbox("Write every email style side by side", value=False)
         
         with col2:
             submit_button = st.button("Generate Email ✨", type="primary", use_container_width=True)
@@ -530,22 +502,22 @@ def create_streamlit_app():
         st.markdown('</div>', unsafe_allow_html=True)
             
         if submit_button:
+            # A new generation replaces the last one's email and its action buttons
+            st.session_state.pop("generated_email", None)
             with st.spinner("🔍 Analyzing job and generating email..."):
                 try:
-                    # Load and process URL
-                    loader = WebBaseLoader([url_input])
-                    data = clean_text(loader.load().pop().page_content)
+                    with get_metrics().trace("generate", url=url_input):
+                        # Research only needs the URL, so run it while the page loads and jobs are extracted
+                        company_research = chain.start_company_research(url_input) if include_company_research else None
                     
-                    # Extract job details
-                    jobs = chain.extract_jobs(data)
+                        # Load and process URL
+                        page_text = load_page_text(url_input)
+                        with get_metrics().span("clean_text"):
+                            data = clean_text(page_text)
+                    
+                        # Extract job details
+                        jobs = chain.extract_jobs(data)
                     
-                    if jobs:
-                        job = jobs[0]  # Take the first job
-                        
-                        # Get skills and matching portfolio links
-                        skills = job.get('skills', [])
-                        links = portfolio.query_links(skills, n_results=num_portfolio_links)
-                        
                         # Create personalization options
                         personalization = {
                             "recipient_name": recipient_name,
@@ -554,61 +526,53 @@ def create_streamlit_app():
                             "add_call_to_action": add_call_to_action,
                             "mention_competitors": mention_competitors
                         }
+                    
+                        if jobs and generate_all_jobs:
+                            write_all_job_emails(chain, portfolio, jobs, email_style, personalization, num_portfolio_links, company_research,
+                                                 email_templates)
+                        elif jobs:
+                            job = jobs[0]  # Take the first job
                         
-                        # Generate email
-                        email = chain.write_mail(job, links, template_style=email_style, personalization=personalization)
-                        
-                        # Display in a card
-                        st.markdown('<div class="card">', unsafe_allow_html=True)
-                        
-                        # Display job information
-                        st.markdown('<h3 style="color: #6a0dad;">Job Details</h3>', unsafe_allow_html=True)
-                        job_details = {
-                            "Role": job.get("role", "N/A"),
-                            "Company": job.get("company_name", "N/A"),
-                            "Experience": job.get("experience", "N/A"),
-                            "Skills": ", ".join(job.get("skills", [])) if isinstance(job.get("skills", []), list) else job.get("skills", "N/A")
-                        }
-                        
-                        for key, value in job_details.items():
-                            st.write(f"**{key}:** {value}")
-                        
-                        # Display email
-                        st.markdown('<h3 style="color: #6a0dad; margin-top: 20px;">Generated Email</h3>', unsafe_allow_html=True)
-                        st.code(email, language='markdown')
-                        
-                        # Action buttons
-                        col_save, col_followup = st.columns(2)
+                            # Get skills and matching portfolio links
+                            skills = job.get('skills', [])
+                            links = portfolio.query_links(skills, n_results=num_portfolio_links)
                         
-                        with col_save:
-                            if st.button("Save to History 💾"):
-                                save_email_history(email, job, url_input, email_style)
-                                st.markdown('<div class="success-message">Email saved to history!</div>', unsafe_allow_html=True)
+                            # Display in a card
+                            st.markdown('<div class="card">', unsafe_allow_html=True)
                         
-                        with col_followup:
-                            if st.button("Generate Follow-up Email 🔄"):
-                                with st.spinner("Creating follow-up..."):
-                                    follow_up = chain.generate_follow_up(email)
-                                    st.markdown('<h3 style="color: #6a0dad; margin-top: 20px;">Follow-up Email</h3>', unsafe_allow_html=True)
-                                    st.code(follow_up, language='markdown')
+                            # Display job information
+                            st.markdown('<h3 style="color: #6a0dad;">Job Details</h3>', unsafe_allow_html=True)
+                            render_job_details(job)
                         
-                        # Copy to clipboard button with better styling
-                        st.markdown(
-                            """
-                            <button 
-                                onclick="navigator.clipboard.writeText(document.querySelector('pre').innerText);alert('Copied to clipboard!')" 
-                                class="custom-button">
-                                📋 Copy to Clipboard
-                            </button>
-                            """, 
-                            unsafe_allow_html=True
-                        )
+                            if compare_styles:
+                                # All styles at once, sharing the extracted job and company research
+                                st.markdown('<h3 style="color: #6a0dad; margin-top: 20px;">Generated Emails</h3>', unsafe_allow_html=True)
+                                timings = {style: {} for style in email_templates}
+                                stream_to_tabs(chain.stream_mail_variants(job, links, personalization=personalization, timings=timings,
+                                                                          company_research=company_research,
+                                                                          email_templates=email_templates), timings)
+                            else:
+                                # Stream the email in as it is generated
+                                st.markdown('<h3 style="color: #6a0dad; margin-top: 20px;">Generated Email</h3>', unsafe_allow_html=True)
+                                timing = {}
+                                email = stream_to_code(chain.stream_mail(job, links, template_style=email_style, personalization=personalization,
+                                                                         timing=timing, company_research=company_research,
+                                                                         email_templates=email_templates))
+                                render_timing(timing)
+                                if not email.startswith("Error generating email:"):
+                                    # The action buttons below rerun the script, which skips this block
+                                    st.session_state["generated_email"] = {"email": email, "job": job, "url": url_input,
+                                                                           "template_style": email_style}
                         
-                        st.markdown('</div>', unsafe_allow_html=True)
-                    else:
-                        st.markdown('<div class="error-message">No job information found on this page.</div>', unsafe_allow_html=True)
+                            st.markdown('</div>', unsafe_allow_html=True)
+                        else:
+                            st.markdown('<div class="error-message">No job information found on this page.</div>', unsafe_allow_html=True)
                 except Exception as e:
                     st.markdown(f'<div class="error-message">An Error Occurred: {e}</div>', unsafe_allow_html=True)
+        
+        generated = st.session_state.get("generated_email")
+        if generated:
+            render_email_actions(chain, generated, show_email=not submit_button)
     
     # Tab 2: Portfolio Manager
     with tab2:
@@ -617,7 +581,9 @@ def create_streamlit_app():
         # Display current portfolio with card styling
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown('<h3 style="color: #6a0dad;">Current Portfolio Items</h3>', unsafe_allow_html=True)
-        st.dataframe(portfolio.data, use_container_width=True)
+        # Items added by other processes (batch runs, other app instances) since the last rerun
+        portfolio.load_portfolio()
+        render_portfolio(portfolio)
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Add new portfolio item
@@ -637,23 +603,7 @@ def create_streamlit_app():
     with tab3:
         st.markdown('<h2 style="color: #6a0dad;">Email History</h2>', unsafe_allow_html=True)
         
-        history = load_email_history()
-        if history:
-            for i, entry in enumerate(history):
-                with st.expander(f"📅 {entry['date']} - {entry['job_title']} at {entry['company']}"):
-                    st.write(f"**URL:** {entry['url']}")
-                    st.write(f"**Template:** {entry['template_style']}")
-                    st.code(entry['email'], language='markdown')
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        if st.button(f"Generate Follow-up", key=f"followup_{i}"):
-                            with st.spinner("Creating follow-up..."):
-                                follow_up = chain.generate_follow_up(entry['email'])
-                                st.markdown('<h4 style="color: #6a0dad;">Follow-up Email</h4>', unsafe_allow_html=True)
-                                st.code(follow_up, language='markdown')
-        else:
-            st.info("No emails in history yet. Generate and save some emails to see them here.")
+        render_history(chain)
     
     # Tab 4: Settings
     with tab4:
@@ -666,6 +616,9 @@ def create_streamlit_app():
         if st.button("Save API Key"):
             with open(".env", "w") as f:
                 f.write(f"GROQ_API_KEY={api_key}")
+            # The cached client was built with the old key
+            os.environ["GROQ_API_KEY"] = api_key
+            load_chain.clear()
             st.markdown('<div class="success-message">API Key saved!</div>', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -673,14 +626,21 @@ def create_streamlit_app():
         st.markdown('<div class="card" style="margin-top: 20px;">', unsafe_allow_html=True)
         st.markdown('<h3 style="color: #6a0dad;">Edit Email Templates</h3>', unsafe_allow_html=True)
         
-        template_type = st.selectbox("Select Template to Edit:", options=list(chain.email_templates.keys()))
-        template_text = st.text_area("Template Instructions:", value=chain.email_templates.get(template_type, ""), height=200)
+        template_type = st.selectbox("Select Template to Edit:", options=list(email_templates.keys()))
+        template_text = st.text_area("Template Instructions:", value=email_templates.get(template_type, ""), height=200)
         
         if st.button("Save Template"):
-            chain.email_templates[template_type] = template_text
+            # Only this session's copy; the cached Chain's defaults are shared with every other user
+            email_templates[template_type] = template_text
             st.markdown('<div class="success-message">Template updated!</div>', unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
         
+        # Pipeline timings
+        st.markdown('<div class="card" style="margin-top: 20px;">', unsafe_allow_html=True)
+        st.markdown('<h3 style="color: #6a0dad;">Performance</h3>', unsafe_allow_html=True)
+        render_metrics()
+        st.markdown('</div>', unsafe_allow_html=True)
+        
         # About section
         st.markdown('<div class="card" style="margin-top: 20px;">', unsafe_allow_html=True)
         st.markdown('<h3 style="color: #6a0dad;">About</h3>', unsafe_allow_html=True)
@@ -0,0 +1,268 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Handed out by span() and trace() while collection is off, so disabled
+# instrumentation costs one attribute check and no allocation
+_NOOP = nullcontext()
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+    @property
+    def seconds(self):
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+
+class Metrics:
+    """Span timings, counters and recent traces for the generation pipeline.
+
+    ``span(name)`` times a stage and nests under whatever span is open on the
+    current thread; ``trace(name)`` opens a root span whose per-stage breakdown
+    is kept in ``recent_traces()`` once it ends. A span left by an exception
+    counts a ``failures`` counter labelled with the stage and exception type.
+    ``increment`` adds to labelled counters (LLM tokens, cache hits and misses).
+    Everything can be exported as Prometheus text or OTLP-style JSON.
+
+    While ``enabled`` is false, spans and counters are no-ops.
+    """
+
+    def __init__(self, enabled=True, max_spans=2000, max_traces=20, max_samples=1024):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {}    # (name, labels) -> value
+        self._durations = {}   # span name -> [count, sum, recent samples]
+        self._spans = deque(maxlen=max_spans)
+        self._traces = deque(maxlen=max_traces)
+        self._open_traces = {}  # trace id -> finished spans of a trace whose root is still open
+
+    # -- recording ---------------------------------------------------------
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, attributes, root=False)
+
+    def trace(self, name, **attributes):
+        """A root span: a new trace even if a span is already open on this thread"""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, attributes, root=True)
+
+    @contextmanager
+    def _span(self, name, attributes, root):
+        stack = self._stack()
+        parent = None if root or not stack else stack[-1]
+        span = Span(name, parent.trace_id if parent else "%032x" % random.getrandbits(128),
+                    parent.span_id if parent else None, attributes)
+        if root:
+            with self._lock:
+                self._open_traces[span.trace_id] = []
+        stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = type(e).__name__
+            self.failure(name, e)
+            raise
+        finally:
+            stack.pop()
+            span.end = time.time_ns()
+            self._finish(span, root)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span, root):
+        seconds = span.seconds
+        with self._lock:
+            self._spans.append(span)
+            entry = self._durations.get(span.name)
+            if entry is None:
+                entry = self._durations[span.name] = [0, 0.0, deque(maxlen=self.max_samples)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2].append(seconds)
+            members = self._open_traces.pop(span.trace_id, None) if root else self._open_traces.get(span.trace_id)
+            if members is not None and not root:
+                members.append(span)
+        if root:
+            self._traces.append(self._breakdown(span, members or []))
+
+    @staticmethod
+    def _breakdown(root, spans):
+        stages = {}
+        for span in spans:
+            stages[span.name] = stages.get(span.name, 0.0) + span.seconds
+        return {"name": root.name, "started": root.start / 1e9, "total": root.seconds, "error": root.error,
+                "stages": stages, "attributes": dict(root.attributes)}
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def failure(self, stage, error):
+        """Count ``error`` in the ``failures`` counter, as a span does for an exception leaving it"""
+        self.increment("failures", stage=stage, type=type(error).__name__)
+
+    def bind(self, fn):
+        """``fn`` wrapped to run under the span open here, for work handed to another thread"""
+        stack = self._stack() if self.enabled else None
+        if not stack:
+            return fn
+        parent = stack[-1]
+
+        def bound(*args, **kwargs):
+            inner = self._stack()
+            inner.append(parent)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                inner.pop()
+        return bound
+
+    # -- reading -----------------------------------------------------------
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def counters(self):
+        """``{name: [(labels dict, value), ...]}``"""
+        with self._lock:
+            items = list(self._counters.items())
+        result = {}
+        for (name, labels), value in sorted(items):
+            result.setdefault(name, []).append((dict(labels), value))
+        return result
+
+    def stage_summary(self):
+        """Count, mean and p50/p95/p99 seconds per span name over recent samples"""
+        with self._lock:
+            entries = {name: (count, total, sorted(samples)) for name, (count, total, samples) in self._durations.items()}
+        summary = {}
+        for name, (count, total, samples) in sorted(entries.items()):
+            summary[name] = {"count": count, "mean": total / count if count else 0.0,
+                             **{f"p{q}": _quantile(samples, q / 100) for q in (50, 95, 99)}}
+        return summary
+
+    def recent_traces(self):
+        """Per-stage seconds of the last few finished traces, newest first"""
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._durations.clear()
+            self._spans.clear()
+            self._traces.clear()
+
+    # -- export ------------------------------------------------------------
+
+    def prometheus_text(self, prefix="cold_email"):
+        """Counters and span-duration summaries in the Prometheus text exposition format"""
+        lines = []
+        for name, series in self.counters().items():
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in series:
+                lines.append(f"{metric}{_labels(labels)} {value}")
+        summary = self.stage_summary()
+        if summary:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for stage, s in summary.items():
+                for q in (50, 95, 99):
+                    lines.append(f"{metric}{_labels({'stage': stage, 'quantile': q / 100})} {s[f'p{q}']:.6f}")
+                lines.append(f"{metric}_sum{_labels({'stage': stage})} {s['mean'] * s['count']:.6f}")
+                lines.append(f"{metric}_count{_labels({'stage': stage})} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def otel_json(self, service_name="cold-email-generator"):
+        """Recent spans and counters shaped like OTLP/JSON ``resourceSpans`` and ``resourceMetrics``"""
+        resource = {"attributes": [_attribute("service.name", service_name)]}
+        scope = {"name": "cold_email.metrics"}
+        with self._lock:
+            spans = list(self._spans)
+        otel_spans = []
+        for span in spans:
+            item = {"traceId": span.trace_id, "spanId": span.span_id, "name": span.name, "kind": 1,
+                    "startTimeUnixNano": str(span.start), "endTimeUnixNano": str(span.end),
+                    "attributes": [_attribute(k, v) for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1}}
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            otel_spans.append(item)
+        now = str(time.time_ns())
+        otel_metrics = []
+        for name, series in self.counters().items():
+            points = []
+            for labels, value in series:
+                point = {"attributes": [_attribute(k, v) for k, v in labels.items()], "timeUnixNano": now}
+                if isinstance(value, float):
+                    point["asDouble"] = value
+                else:
+                    point["asInt"] = str(value)
+                points.append(point)
+            otel_metrics.append({"name": name, "sum": {"dataPoints": points, "aggregationTemporality": 2,
+                                                       "isMonotonic": True}})
+        return {"resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": scope, "spans": otel_spans}]}],
+                "resourceMetrics": [{"resource": resource, "scopeMetrics": [{"scope": scope, "metrics": otel_metrics}]}]}
+
+
+def _quantile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                    for k, v in labels.items())
+    return "{" + body + "}"
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def get_metrics():
+    """The process-wide metrics registry; ``METRICS_ENABLED=0`` starts it disabled"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics(enabled=os.getenv("METRICS_ENABLED", "1") != "0")
+        return _default_metrics
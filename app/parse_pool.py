@@ -0,0 +1,117 @@
+"""HTML parsing and cleaning in worker processes.
+
+BeautifulSoup's ``get_text`` and ``clean_text`` are pure-Python and hold the
+GIL, so with fetching and LLM calls running concurrently they cap a batch run
+at one core. ``ParsePool`` runs them in a process pool instead. Pages are
+submitted in chunks so one task carries several pages, and bodies above
+``spill_bytes`` are written to a spool file that the worker reads and deletes,
+so multi-MB strings are not pickled through the pool's pipe; only the much
+smaller cleaned text comes back.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+def parse_page(html, clean=True):
+    """Visible text of an HTML page, run through ``clean_text`` unless ``clean`` is false"""
+    from fetcher import html_to_text
+    text = html_to_text(html)
+    if not clean:
+        return " ".join(text.split())
+    from utils import clean_text
+    return clean_text(text)
+
+
+def _parse_chunk(tasks, clean):
+    """Worker side: parse ``(html, spool_path)`` pairs, returning ``(ok, text or error)`` per page"""
+    results = []
+    for html, path in tasks:
+        try:
+            if path:
+                with open(path, encoding="utf-8") as f:
+                    html = f.read()
+            results.append((True, parse_page(html, clean)))
+        except Exception as e:
+            results.append((False, f"{type(e).__name__}: {e}"))
+        finally:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    return results
+
+
+class ParseError(Exception):
+    pass
+
+
+class ParsePool:
+    def __init__(self, workers=None, chunk_size=8, spill_bytes=256 * 1024, spool_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.spill_bytes = spill_bytes
+        self.spool_dir = spool_dir
+        # spawn, not fork: the parent has live threads (fetcher, LLM dispatcher) holding locks
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.stats = {"pages": 0, "chunks": 0, "spilled": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _task(self, html):
+        if len(html) < self.spill_bytes:
+            return html, None
+        fd, path = tempfile.mkstemp(prefix="page-", suffix=".html", dir=self.spool_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(html)
+        with self._lock:
+            self.stats["spilled"] += 1
+        return None, path
+
+    def _submit(self, pages, clean):
+        """One future per chunk of ``pages``"""
+        futures = []
+        for i in range(0, len(pages), self.chunk_size):
+            tasks = [self._task(html) for html in pages[i:i + self.chunk_size]]
+            futures.append(self._executor.submit(_parse_chunk, tasks, clean))
+        with self._lock:
+            self.stats["pages"] += len(pages)
+            self.stats["chunks"] += len(futures)
+        return futures
+
+    def _unpack(self, chunk_results, errors):
+        texts = []
+        for ok, value in (result for chunk in chunk_results for result in chunk):
+            if not ok:
+                with self._lock:
+                    self.stats["errors"] += 1
+                value = ParseError(value)
+                if errors == "raise":
+                    raise value
+            texts.append(value)
+        return texts
+
+    def parse_many(self, pages, clean=True, errors="raise"):
+        """Parsed text for every page, in order. With ``errors="return"`` a failed page
+        yields a ``ParseError`` in its place instead of raising."""
+        return self._unpack([f.result() for f in self._submit(list(pages), clean)], errors)
+
+    async def aparse_many(self, pages, clean=True, errors="raise"):
+        """``parse_many`` that waits on the event loop instead of blocking it"""
+        futures = [asyncio.wrap_future(f) for f in self._submit(list(pages), clean)]
+        return self._unpack(await asyncio.gather(*futures), errors)
+
+    def parse(self, html, clean=True):
+        return self.parse_many([html], clean)[0]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,21 +1,230 @@
-import pandas as pd
-import chromadb
-import uuid
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import get_metrics
 
 
 class Portfolio:
-    def __init__(self, file_path="app/resource/my_portfolio.csv"):
+    """The original Chroma-backed portfolio, kept only as the baseline that
+    ``bench_ranking`` and ``bench_portfolio_sync`` measure against; the app and
+    the batch pipeline use ``HybridPortfolio``.
+    """
+
+    def __init__(self, file_path="app/resource/my_portfolio.csv", persist_dir="vectorstore",
+                 batch_size=256, embedding_function=None, cache_size=1024):
+        import pandas as pd
         self.file_path = file_path
         self.data = pd.read_csv(file_path)
-        self.chroma_client = chromadb.PersistentClient('vectorstore')
-        self.collection = self.chroma_client.get_or_create_collection(name="portfolio")
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._results = OrderedDict()
+        # chromadb is only needed for the vector-backed portfolio
+        import chromadb
+        self.chroma_client = chromadb.PersistentClient(persist_dir)
+        kwargs = {"embedding_function": embedding_function} if embedding_function is not None else {}
+        self.collection = self.chroma_client.get_or_create_collection(name="portfolio", **kwargs)
+
+    @staticmethod
+    def row_id(techstack, link):
+        """Deterministic id for a portfolio row, so unchanged rows are never re-embedded"""
+        return hashlib.sha1(f"{techstack}\x1f{link}".encode("utf-8")).hexdigest()
 
     def load_portfolio(self):
-        if not self.collection.count():
-            for _, row in self.data.iterrows():
-                self.collection.add(documents=row["Techstack"],
-                                    metadatas={"links": row["Links"]},
-                                    ids=[str(uuid.uuid4())])
+        return self.sync()
+
+    def sync(self):
+        """Make the collection match the CSV: embed new or edited rows, drop removed ones"""
+        rows = {}
+        for techstack, link in zip(self.data["Techstack"], self.data["Links"]):
+            rows[self.row_id(techstack, link)] = (techstack, link)
+
+        stored = set(self.collection.get(include=[])["ids"])
+        to_add = [row_id for row_id in rows if row_id not in stored]
+        # Also clears rows written with random uuids by older versions
+        to_delete = [row_id for row_id in stored if row_id not in rows]
+
+        batch_size = min(self.batch_size, getattr(self.chroma_client, "max_batch_size", self.batch_size))
+        for start in range(0, len(to_delete), batch_size):
+            self.collection.delete(ids=to_delete[start:start + batch_size])
+        for start in range(0, len(to_add), batch_size):
+            ids = to_add[start:start + batch_size]
+            self.collection.upsert(ids=ids,
+                                   documents=[rows[row_id][0] for row_id in ids],
+                                   metadatas=[{"links": rows[row_id][1]} for row_id in ids])
+        if to_add or to_delete:
+            self._results.clear()
+        return {"added": len(to_add), "deleted": len(to_delete), "unchanged": len(rows) - len(to_add)}
 
     def query_links(self, skills):
         return self.collection.query(query_texts=skills, n_results=2).get('metadatas', [])
+
+    @staticmethod
+    def _normalize(skills):
+        if isinstance(skills, str):
+            skills = [skills]
+        return tuple(sorted({str(s).strip().lower() for s in skills if str(s).strip()}))
+
+    def query_links_batch(self, skill_sets, n_results=2, aggregate="max", candidates=10):
+        """Rank portfolio items for many jobs with a single vector-store query.
+
+        Skills are normalized and deduplicated across all jobs, each unique skill
+        is embedded and searched once, and the per-skill hits are merged for each
+        job with ``aggregate``: ``"max"`` or ``"mean"`` of similarity, or ``"rrf"``
+        (reciprocal-rank fusion). Returns one list of metadata dicts per job.
+        Results are memoized per normalized skill set until the next sync().
+        """
+        if aggregate not in ("max", "mean", "rrf"):
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+        keys = [(self._normalize(skills), n_results, aggregate) for skills in skill_sets]
+        results = {}
+        for key in keys:
+            if key in self._results:
+                self._results.move_to_end(key)
+                results[key] = self._results[key]
+
+        missing = [key for key in dict.fromkeys(keys) if key not in results]
+        unique_skills = sorted({skill for key in missing for skill in key[0]})
+        hits = {}
+        total = self.collection.count()
+        if unique_skills and total:
+            res = self.collection.query(query_texts=unique_skills, n_results=min(max(candidates, n_results), total),
+                                        include=["metadatas", "distances"])
+            for skill, ids, metadatas, distances in zip(unique_skills, res["ids"], res["metadatas"],
+                                                        res["distances"]):
+                hits[skill] = list(zip(ids, metadatas, distances))
+
+        for key in missing:
+            skills = key[0]
+            scores, metadata_by_id = {}, {}
+            for skill in skills:
+                for rank, (item_id, metadata, distance) in enumerate(hits.get(skill, [])):
+                    metadata_by_id[item_id] = metadata
+                    if aggregate == "rrf":
+                        score = 1.0 / (60 + rank + 1)
+                    else:
+                        score = 1.0 / (1.0 + distance)
+                    if aggregate == "max":
+                        scores[item_id] = max(scores.get(item_id, 0.0), score)
+                    else:
+                        scores[item_id] = scores.get(item_id, 0.0) + score
+            if aggregate == "mean":
+                scores = {item_id: score / len(skills) for item_id, score in scores.items()}
+            ranked = sorted(scores, key=lambda item_id: scores[item_id], reverse=True)[:n_results]
+            results[key] = [metadata_by_id[item_id] for item_id in ranked]
+            self._results[key] = results[key]
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+        return [list(results[key]) for key in keys]
+
+
+class SimplePortfolio:
+    def __init__(self, path="my_portfolio.arrow", seed="my_portfolio.csv", compact_every=1000):
+        # pyarrow, pandas and numpy load with the first portfolio, not with the module
+        from portfolio_store import PortfolioStore
+        # A new store starts from seed (where older versions kept added items) or the bundled sample portfolio
+        self.store = PortfolioStore(path, seed=seed if seed and os.path.exists(seed) else None,
+                                    compact_every=compact_every)
+        self._build_index()
+
+    @property
+    def data(self):
+        """The whole portfolio as a DataFrame; the Portfolio Manager pages through ``store`` instead"""
+        return self.store.to_pandas()
+
+    def _build_index(self):
+        from skill_index import SkillIndex
+        # The index scans the mapped Arrow column in place; only rows still in the WAL are copied
+        self.index = SkillIndex(base=self.store.base_column("Techstack"))
+        # One instance is shared by every Streamlit session, and the index mutates on lookups
+        self._lock = threading.Lock()
+        self._sync_index()
+
+    def load_portfolio(self):
+        """Pick up items other processes added since this portfolio was built"""
+        with self._lock:
+            if self.store.refresh():
+                self._sync_index()
+
+    def _sync_index(self):
+        # The store only ever grows, so the rows past the index are exactly the new ones
+        for techstack, _ in self.store.rows(len(self.index)):
+            self.index.add(techstack)
+
+    def query_links(self, skills, n_results=2):
+        """Simple skill matching without vector database"""
+        return self.query_links_batch([skills], n_results=n_results)[0]
+
+    def query_links_batch(self, skill_lists, n_results=2):
+        """Match many jobs' skill lists in one call; returns one link list per job"""
+        with get_metrics().span("query_links"):
+            return self._match(skill_lists, n_results)
+
+    def _match(self, skill_lists, n_results):
+        results = []
+        for skills in skill_lists:
+            # Convert skills to lowercase for case-insensitive matching
+            if isinstance(skills, list):
+                skills_lower = [str(s).lower() for s in skills]
+            else:
+                skills_lower = [str(skills).lower()]
+
+            with self._lock:
+                top = self.index.top_k(skills_lower, n_results)
+            # If no matches, return some default links
+            if not len(top):
+                top = range(min(n_results, len(self.index)))
+            results.append([{"links": link} for link in self.store.values("Links", top)])
+        return results
+
+    def add_portfolio_item(self, techstack, link):
+        """Add a new portfolio item"""
+        with self._lock:
+            # One WAL line instead of rewriting the whole file
+            self.store.append(techstack, link)
+            # Patches the cached posting lists, so later queries see the new row
+            self._sync_index()
+        return True
+
+
+class HybridPortfolio(SimplePortfolio):
+    """SimplePortfolio ranked by ``HybridRanker``: a BM25 shortlist reranked by
+    embedding similarity, with the fusion weights and shortlist size as options.
+
+    ``embedding_function`` is any callable from a list of texts to vectors
+    (Chroma's embedding functions work); without one an offline hashing
+    embedder is used. Item embeddings are kept in ``embedding_cache``.
+    """
+
+    def __init__(self, path="my_portfolio.arrow", seed="my_portfolio.csv", compact_every=1000,
+                 embedding_function=None, embedding_cache="embeddings.sqlite3", shortlist=50,
+                 lexical_weight=0.5, semantic_weight=0.5):
+        self.ranker_options = {"embedder": embedding_function, "shortlist": shortlist,
+                               "lexical_weight": lexical_weight, "semantic_weight": semantic_weight}
+        self.embedding_cache = embedding_cache
+        super().__init__(path, seed=seed, compact_every=compact_every)
+
+    def _build_index(self):
+        from ranking import EmbeddingCache, HybridRanker
+        options = dict(self.ranker_options, cache=EmbeddingCache(self.embedding_cache))
+        # Postings, lengths and embeddings of the Arrow base go to a file next to it that every
+        # process maps; the first one to need it builds it
+        builder = HybridRanker(**options)
+        path = self.store.derived_path(f"ranker-{builder.model_key}.arrow")
+        if not os.path.exists(path):
+            for chunk in self.store.base_column("Techstack").chunks:
+                for start in range(0, len(chunk), 10000):
+                    builder.add_many(chunk.slice(start, 10000).to_pylist())
+            try:
+                builder.save(path)
+            except OSError:
+                # Another process saved it first and has it mapped (Windows refuses the replace)
+                if not os.path.exists(path):
+                    raise
+            # The mapped file has the base embeddings now, so the cache needn't keep them in memory
+            options["cache"].forget()
+        self.index = HybridRanker.open(path, **options)
+        self._lock = threading.Lock()
+        self._sync_index()
@@ -0,0 +1,322 @@
+"""On-disk portfolio storage: a memory-mapped Arrow file plus a write-ahead log.
+
+The portfolio lives in an Arrow IPC file that is opened with ``mmap``, so
+opening it parses nothing and every process reading it shares the same page
+cache instead of holding its own copy. New items are appended to a JSONL
+write-ahead log next to it, one line per item, and folded into a fresh Arrow
+file by ``compact`` once the log reaches ``compact_every`` items.
+
+Every compaction writes a new generation file rather than replacing the mapped
+one, which Windows would refuse while any process still has it mapped.
+"""
+import csv
+import json
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in one process are still serialised by the thread lock
+    fcntl = None
+
+COLUMNS = ("Techstack", "Links")
+BUNDLED_SEED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resource", "my_portfolio.csv")
+
+
+def read_csv_rows(path):
+    """``(techstack, link)`` pairs from a portfolio CSV"""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["Techstack"], row["Links"]) for row in csv.DictReader(f)]
+
+
+class PortfolioStore:
+    """Append-only portfolio items in Arrow IPC generation files and a JSONL write-ahead log.
+
+    ``path="my_portfolio.arrow"`` keeps generation 3 in ``my_portfolio.3.arrow``
+    and the log that extends it in ``my_portfolio.3.wal``. A compaction writes
+    generation 4 with a new, empty log and only then deletes the old files, so
+    no file is ever rewritten in place and a reader can follow a log by its
+    byte offset. Files derived from one generation (see ``derived_path``) are
+    deleted along with it. Appends and compactions from different processes are
+    serialised with ``flock`` on ``path + ".lock"``, and ``refresh`` picks up
+    whatever other processes have written since.
+
+    A store that does not exist yet is created from ``seed``, a CSV with
+    ``Techstack`` and ``Links`` columns (the bundled sample portfolio if None),
+    or from a store written before generation files (``path`` itself and its
+    ``path.<generation>.wal``).
+    """
+
+    def __init__(self, path="my_portfolio.arrow", seed=None, compact_every=1000, fsync=True):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._root, self._ext = os.path.splitext(path)
+        self._lock = threading.RLock()
+        self._table = None
+        self._generation = 0
+        self._tail = []  # (techstack, link) rows from the WAL
+        self._wal_offset = 0
+        self._search = (None, None)  # ((query, rows, generation), matching row ids) of the last search
+        with self._exclusive():
+            if os.path.exists(path) and not self._generations():
+                self._upgrade()
+            elif not self._generations():
+                rows = read_csv_rows(seed or BUNDLED_SEED)
+                self._write_base([row[0] for row in rows], [row[1] for row in rows], generation=1)
+        self.refresh()
+
+    def _upgrade(self):
+        """Move a store from ``path`` and ``path.<generation>.wal`` into generation 1"""
+        import pyarrow as pa
+        with pa.memory_map(self.path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            rows = list(zip(*(table.column(name).to_pylist() for name in COLUMNS)))
+        wal = f"{self.path}.{table.schema.metadata[b'generation'].decode()}.wal"
+        del table
+        if os.path.exists(wal):
+            with open(wal, "rb") as f:
+                data = f.read()
+            rows.extend((entry["Techstack"], entry["Links"])
+                        for entry in map(json.loads, data[:data.rfind(b"\n") + 1].splitlines()))
+        self._write_base([row[0] for row in rows], [row[1] for row in rows], generation=1)
+        for name in (self.path, wal):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+    def __len__(self):
+        return self._table.num_rows + len(self._tail)
+
+    # -- files -------------------------------------------------------------
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def base_rows(self):
+        """Rows in the mapped Arrow file; the rest come from the WAL"""
+        return self._table.num_rows
+
+    def base_path(self, generation):
+        return f"{self._root}.{generation}{self._ext}"
+
+    @property
+    def wal_path(self):
+        return self.derived_path("wal")
+
+    def derived_path(self, name, generation=None):
+        """Path for a file built from one generation, e.g. an index over it; it is
+        deleted when a later compaction retires that generation"""
+        return f"{self._root}.{self._generation if generation is None else generation}.{name}"
+
+    def _generations(self):
+        """Generation numbers of the Arrow files on disk"""
+        folder, root = os.path.split(self._root)
+        pattern = re.compile(re.escape(root) + r"\.(\d+)" + re.escape(self._ext) + "$")
+        return sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(folder or "."))
+                      if match)
+
+    def _exclusive(self):
+        return _FileLock(self.lock_path, self._lock)
+
+    def _write_base(self, techstacks, links, generation):
+        """Write the given columns (lists or Arrow arrays) as a new generation file"""
+        import pyarrow as pa
+        schema = pa.schema([(name, pa.string()) for name in COLUMNS],
+                           metadata={"generation": str(generation)})
+        table = pa.table([techstacks, links], schema=schema)
+        path = self.base_path(generation)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+        # A fresh name, so no process can have it mapped yet
+        os.replace(tmp, path)
+
+    def _open_base(self, generation):
+        import pyarrow as pa
+        # Zero-copy: the table's buffers point straight into the mapped file
+        self._table = pa.ipc.open_file(pa.memory_map(self.base_path(generation), "r")).read_all()
+        self._generation = generation
+        self._tail = []
+        self._wal_offset = 0
+
+    def _retire(self, generation):
+        """Delete the files of generations before ``generation``"""
+        folder, root = os.path.split(self._root)
+        pattern = re.compile(re.escape(root) + r"\.(\d+)\.")
+        for name in os.listdir(folder or "."):
+            match = pattern.match(name)
+            if match and int(match.group(1)) < generation:
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    # Still mapped by another process on Windows; the next compaction retries
+                    pass
+
+    def refresh(self):
+        """Reload after another process compacted and read new WAL lines; returns
+        True if anything changed"""
+        with self._lock:
+            changed = False
+            while self._generations()[-1] != self._generation:
+                try:
+                    self._open_base(self._generations()[-1])
+                    changed = True
+                except FileNotFoundError:
+                    # Retired by an even newer compaction in the meantime
+                    continue
+            try:
+                size = os.path.getsize(self.wal_path)
+            except OSError:
+                size = 0
+            if size > self._wal_offset:
+                with open(self.wal_path, "rb") as f:
+                    f.seek(self._wal_offset)
+                    data = f.read(size - self._wal_offset)
+                # A writer may be midway through its line; leave the partial line for next time
+                complete = data[:data.rfind(b"\n") + 1]
+                for line in complete.splitlines():
+                    entry = json.loads(line)
+                    self._tail.append((entry["Techstack"], entry["Links"]))
+                    changed = True
+                self._wal_offset += len(complete)
+            return changed
+
+    # -- writing -----------------------------------------------------------
+
+    def append(self, techstack, link):
+        """Add one item; returns its row number"""
+        return self.append_many([(techstack, link)])[0]
+
+    def append_many(self, rows):
+        """Add items with one WAL write; returns their row numbers"""
+        rows = [(str(techstack), str(link)) for techstack, link in rows]
+        with self._exclusive():
+            self.refresh()
+            payload = "".join(json.dumps({"Techstack": techstack, "Links": link}) + "\n"
+                              for techstack, link in rows).encode("utf-8")
+            with open(self.wal_path, "ab") as f:
+                f.write(payload)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            start = len(self)
+            self._tail.extend(rows)
+            self._wal_offset += len(payload)
+            if len(self._tail) >= self.compact_every:
+                self._compact()
+        return list(range(start, start + len(rows)))
+
+    def compact(self):
+        """Fold the WAL into a new Arrow file"""
+        with self._exclusive():
+            self.refresh()
+            self._compact()
+
+    def _compact(self):
+        if not self._tail:
+            return
+        import pyarrow as pa
+        columns = [pa.concat_arrays(self._table.column(name).chunks + [pa.array(list(values), pa.string())])
+                   for name, values in zip(COLUMNS, zip(*self._tail))]
+        generation = self._generation + 1
+        self._write_base(*columns, generation=generation)
+        self._open_base(generation)
+        self._retire(generation)
+
+    # -- reading -----------------------------------------------------------
+
+    def base_column(self, name):
+        """Column ``name`` of the mapped Arrow file, without copying it; rows from
+        ``base_rows`` on are read with ``rows``"""
+        with self._lock:
+            return self._table.column(name)
+
+    def values(self, name, row_ids):
+        """Column ``name`` at ``row_ids``, as strings"""
+        with self._lock:
+            index = COLUMNS.index(name)
+            return [row[index] for row in self._take(list(row_ids))]
+
+    def rows(self, start=0, stop=None):
+        """``(techstack, link)`` pairs for rows ``start`` to ``stop``"""
+        with self._lock:
+            return self._take(range(start, len(self) if stop is None else min(stop, len(self))))
+
+    def _take(self, row_ids):
+        """``(techstack, link)`` pairs for ``row_ids``, in that order"""
+        base_rows = self._table.num_rows
+        base_ids = [i for i in row_ids if i < base_rows]
+        taken = iter(())
+        if base_ids:
+            import pyarrow as pa
+            table = self._table.take(pa.array(base_ids, pa.int64()))
+            taken = zip(*(table.column(name).to_pylist() for name in COLUMNS))
+        return [next(taken) if i < base_rows else self._tail[i - base_rows] for i in row_ids]
+
+    def search(self, query):
+        """Row numbers whose tech stack or link contains ``query`` (case-insensitive)"""
+        with self._lock:
+            key = (query, len(self), self._generation)
+            if self._search[0] == key:
+                return self._search[1]
+            import numpy as np
+            import pyarrow.compute as pc
+            mask = pc.or_(pc.match_substring(self._table.column("Techstack"), query, ignore_case=True),
+                          pc.match_substring(self._table.column("Links"), query, ignore_case=True))
+            matches = np.flatnonzero(mask.to_numpy(zero_copy_only=False)).tolist()
+            needle = query.lower()
+            base_rows = self._table.num_rows
+            matches += [base_rows + i for i, (techstack, link) in enumerate(self._tail)
+                        if needle in techstack.lower() or needle in link.lower()]
+            self._search = (key, matches)
+            return matches
+
+    def page(self, offset, limit, query=""):
+        """``(total, rows)``: ``limit`` rows from ``offset``, of all rows or of those matching ``query``,
+        as dicts with the row number under ``"#"``"""
+        with self._lock:
+            if query:
+                matches = self.search(query)
+                total, row_ids = len(matches), matches[offset:offset + limit]
+            else:
+                total = len(self)
+                row_ids = range(offset, min(offset + limit, total))
+            return total, [{"#": i, COLUMNS[0]: techstack, COLUMNS[1]: link}
+                           for i, (techstack, link) in zip(row_ids, self._take(row_ids))]
+
+    def to_pandas(self):
+        import pandas as pd
+        with self._lock:
+            frame = self._table.to_pandas()
+            if self._tail:
+                frame = pd.concat([frame, pd.DataFrame(self._tail, columns=list(COLUMNS))], ignore_index=True)
+            return frame
+
+
+class _FileLock:
+    """The store's thread lock plus an exclusive ``flock`` for other processes"""
+
+    def __init__(self, path, lock):
+        self.path = path
+        self.lock = lock
+        self._file = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        if fcntl is not None:
+            self._file = open(self.path, "a")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.lock.release()
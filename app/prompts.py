@@ -0,0 +1,141 @@
+"""Prompt assembly for every Chain call.
+
+Each prompt starts with text that never changes between calls (persona,
+instructions, output format) so providers that cache prompt prefixes can reuse
+it, and per-call data comes last. Jobs and company research are sent as compact
+JSON instead of Python reprs, portfolio links as bare URLs, and template
+indentation is not sent at all.
+"""
+import json
+
+PERSONA = "You are Mohan, a business development executive at AtliQ."
+
+EXTRACT_JOBS = """### INSTRUCTION:
+The scraped text is from the career's page of a website.
+Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills`, `description`, and `company_name` (if available).
+Only return the valid JSON.
+### SCRAPED TEXT FROM WEBSITE:
+{page_data}
+### VALID JSON (NO PREAMBLE):"""
+
+COMPANY_INFO = """### INSTRUCTION:
+Extract key information about this company that would be useful for a cold email. Focus on:
+1. Company values
+2. Recent initiatives or projects
+3. Company pain points based on industry
+4. Company size and scale
+Format the response as JSON with these keys: values, initiatives, pain_points, size.
+Only return the valid JSON.
+### COMPANY INFO:
+{company_info}"""
+
+MAIL = PERSONA + """
+AtliQ is an AI & Software Consulting company dedicated to facilitating the seamless integration of business processes through automated tools.
+Write a cold email to the client regarding the job below. Describe AtliQ's capability in fulfilling their needs.
+Format with subject line, greeting, body, and signature.
+### STYLE:
+{instructions}
+### JOB:
+{job}
+### PORTFOLIO LINKS:
+{links}"""
+
+FOLLOW_UP = PERSONA + """
+The recipient hasn't responded to the original email below.
+Write a brief follow-up email that:
+1. References the original email
+2. Adds a new piece of value or information
+3. Gently asks for a response
+4. Maintains a professional but not pushy tone
+Format the email properly with subject line, greeting, body, and signature.
+The subject should indicate this is a follow-up.
+Do not provide a preamble.
+### DAYS SINCE THE ORIGINAL EMAIL: {days}
+### ORIGINAL EMAIL:
+{original_email}
+### FOLLOW-UP EMAIL (NO PREAMBLE):"""
+
+STYLE_INSTRUCTIONS = {
+    "formal": "Write a formal and professional cold email.",
+    "conversational": "Write a friendly and conversational cold email that shows personality.",
+    "problem-solution": "Write a cold email that identifies specific problems and positions AtliQ as the solution.",
+}
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        value = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [v for v in (_prune(v) for v in value) if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def compact(value):
+    """JSON without empty fields, indentation or runs of whitespace"""
+    return json.dumps(_prune(value), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def link_list(portfolio_links):
+    """Plain URLs from SimplePortfolio ``{"links": ...}`` dicts or Chroma metadata lists"""
+    urls = []
+    for item in portfolio_links or []:
+        if isinstance(item, dict):
+            urls.extend(str(v) for v in item.values() if v)
+        elif isinstance(item, (list, tuple)):
+            urls.extend(link_list(item))
+        elif item:
+            urls.append(str(item))
+    return list(dict.fromkeys(urls))
+
+
+def squeeze(text):
+    """Drop indentation and trailing spaces, keeping single blank lines between paragraphs"""
+    lines = [line.strip() for line in str(text).strip().splitlines()]
+    return "\n".join(line for i, line in enumerate(lines) if line or lines[i - 1])
+
+
+def prompt_kind(prompt):
+    """Which Chain call a rendered prompt belongs to"""
+    if "### SCRAPED TEXT FROM WEBSITE:" in prompt:
+        return "extract_jobs"
+    if "### COMPANY INFO:" in prompt:
+        return "company_info"
+    if "### ORIGINAL EMAIL:" in prompt:
+        return "follow_up"
+    return "write_mail"
+
+
+def extract_jobs_prompt(page_data):
+    return EXTRACT_JOBS.format(page_data=page_data.strip())
+
+
+def company_info_prompt(company_name, about_text):
+    return COMPANY_INFO.format(company_info=f"Company: {company_name or 'Unknown'}\nAbout: {about_text}")
+
+
+def mail_prompt(job, portfolio_links, template_style="formal", company_research=None, recipient=None,
+                add_cta=False, mention_competitors=False, style_instruction=None):
+    """``style_instruction`` overrides the default instruction for ``template_style``
+    (``Chain.email_templates`` passes the user's edited text)"""
+    if style_instruction is None:
+        style_instruction = STYLE_INSTRUCTIONS.get(template_style, "")
+    instructions = [" ".join(str(style_instruction).split())]
+    if recipient:
+        instructions.append(f"Address the email to {recipient}.")
+    if add_cta:
+        instructions.append("Include a call to action at the end.")
+    if mention_competitors:
+        instructions.append("Mention how AtliQ compares favorably to competitors.")
+    prompt = MAIL.format(instructions=" ".join(i for i in instructions if i), job=compact(job),
+                         links="\n".join(link_list(portfolio_links)) or "None")
+    research = _prune(company_research or {})
+    if research and research != {"size": "Unknown"}:
+        prompt += "\n### COMPANY RESEARCH:\n" + compact(research)
+    return prompt
+
+
+def follow_up_prompt(original_email, days_passed=7):
+    return FOLLOW_UP.format(days=days_passed, original_email=squeeze(original_email))
@@ -0,0 +1,432 @@
+"""Hybrid lexical + embedding ranking for portfolio matching.
+
+``HybridRanker`` shortlists items with BM25 over tech-stack tokens (an
+inverted index, so a query only touches rows sharing a term with it) and
+reranks just that shortlist by a weighted sum of the normalised BM25 score
+and cosine similarity of embeddings. Item embeddings come from an
+``EmbeddingCache`` so each tech stack is embedded once per model, across
+processes and restarts. A built ranker can be saved to an Arrow file and
+opened memory-mapped by every process (``HybridRanker.save``/``open``).
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from sqlite_util import ThreadLocalConnection, hit_stats
+
+_SPLIT_RE = re.compile(r"[,;/|()\n]+")
+_TOKEN_RE = re.compile(r"[a-z0-9#+.]+")
+ALIASES = {"js": "javascript", "ts": "typescript", "golang": "go", "postgres": "postgresql", "k8s": "kubernetes",
+           "ml": "machine learning", "ai": "artificial intelligence", "dotnet": "net", "csharp": "c#",
+           "tf": "tensorflow", "rn": "react native", "gcp": "google cloud", "mongo": "mongodb"}
+# Bump when tokenize() or the layout written by HybridRanker.save changes, so old files are rebuilt
+SAVE_FORMAT = 1
+_SAVED_DTYPES = {"indptr": np.int64, "rows": np.int32, "tf": np.float32, "lengths": np.float32, "matrix": np.float32}
+
+
+def normalize_token(token):
+    """``React.js``/``reactjs`` -> ``react``, ``Node.js`` -> ``node``; known aliases expanded"""
+    token = token.strip(".")
+    token = ALIASES.get(token, token)
+    if token.endswith(".js"):
+        token = token[:-3]
+    elif token.endswith("js") and len(token) > 4:
+        token = token[:-2]
+    return token
+
+
+def tokenize(text):
+    """Terms of a tech stack or skill list: words, plus word pairs within a comma-separated phrase"""
+    terms = []
+    for phrase in _SPLIT_RE.split(str(text).lower()):
+        words = []
+        for word in _TOKEN_RE.findall(phrase):
+            words.extend(normalize_token(word).split())
+        words = [word for word in words if word]
+        terms.extend(words)
+        terms.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+
+class HashingEmbedder:
+    """Offline embedding: word and character-trigram features hashed into ``dim``
+    signed buckets, L2-normalised. Used when no embedding model is configured;
+    also callable the way Chroma calls an embedding function."""
+
+    def __init__(self, dim=256, word_weight=3.0, trigram_weight=0.5):
+        self.dim = dim
+        self.word_weight = word_weight
+        self.trigram_weight = trigram_weight
+        self.name = f"hashing-v1-{dim}-{word_weight:g}-{trigram_weight:g}"
+        # Tech stacks reuse a small vocabulary, so each term's features are hashed once
+        self._terms = {}
+
+    def _term_vector(self, term):
+        vector = self._terms.get(term)
+        if vector is None:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            padded = f" {term} "
+            features = [(term, self.word_weight)] + [(padded[i:i + 3], self.trigram_weight)
+                                                     for i in range(len(padded) - 2)]
+            for feature, weight in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vector[h % self.dim] += weight if h & 0x80000000 else -weight
+            self._terms[term] = vector
+        return vector
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in tokenize(text):
+                vectors[row] += self._term_vector(term)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def __call__(self, input):
+        return self.embed(list(input)).tolist()
+
+
+class EmbeddingCache:
+    """Item embeddings keyed by model name and text hash, in memory and in SQLite.
+
+    ``path=None`` keeps them in memory only.
+    """
+
+    def __init__(self, path="embeddings.sqlite3"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._conn = ThreadLocalConnection(path)
+        if path:
+            conn = self._conn()
+            conn.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+                                model TEXT NOT NULL,
+                                key TEXT NOT NULL,
+                                vector BLOB NOT NULL,
+                                PRIMARY KEY (model, key))""")
+            conn.commit()
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+    def get_many(self, model, texts, embed):
+        """An ``(len(texts), dim)`` float32 matrix; texts not cached yet are embedded
+        with ``embed`` in one call and stored"""
+        keys = [self.make_key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get((model, key))
+                if vector is not None:
+                    found[key] = vector
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.path:
+            conn = self._conn()
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN "
+                                    f"({','.join('?' * len(chunk))})", [model, *chunk]).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        computed = {}
+        todo = [key for key in missing if key not in found]
+        if todo:
+            text_by_key = dict(zip(keys, texts))
+            vectors = np.asarray(embed([text_by_key[key] for key in todo]), dtype=np.float32)
+            computed = dict(zip(todo, vectors))
+            found.update(computed)
+            if self.path:
+                conn = self._conn()
+                conn.executemany("INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                                 [(model, key, vector.tobytes()) for key, vector in computed.items()])
+                conn.commit()
+        with self._lock:
+            self.hits += len(keys) - len(todo)
+            self.misses += len(todo)
+            for key in missing:
+                self._memory[(model, key)] = found[key]
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def forget(self):
+        """Drop the vectors held in memory; SQLite keeps them for the next lookup"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        return hit_stats(self.hits, self.misses, entries=len(self._memory))
+
+
+class HybridRanker:
+    """BM25 shortlist, embedding rerank.
+
+    ``top_k(skills, k)`` scores rows with BM25 (``k1``, ``b``) over the query's
+    terms, keeps the ``shortlist`` best and orders them by
+    ``lexical_weight * bm25 / max bm25 + semantic_weight * cosine``. When no
+    row shares a term with the query, the shortlist is the rows closest by
+    cosine instead, and ``top_k`` tops up a short shortlist the same way, so a
+    query never comes back short while the portfolio has enough items. Rows are
+    added with ``add`` and get ids in insertion order, like ``SkillIndex``.
+
+    Rows loaded by ``open`` stay in the mapped file as CSR postings, lengths and
+    an embedding matrix; rows added after that are kept in memory and follow them.
+    """
+
+    def __init__(self, texts=(), embedder=None, cache=None, shortlist=50, lexical_weight=0.5,
+                 semantic_weight=0.5, k1=1.2, b=0.75, max_cached_queries=1024):
+        self.embedder = embedder or HashingEmbedder()
+        self.model = getattr(self.embedder, "name", type(self.embedder).__name__)
+        self.cache = cache if cache is not None else EmbeddingCache(path=None)
+        self.shortlist = shortlist
+        self.lexical_weight = lexical_weight
+        self.semantic_weight = semantic_weight
+        self.k1 = k1
+        self.b = b
+        self.max_cached_queries = max_cached_queries
+        self._base = None  # arrays of the rows loaded by open()
+        self._base_rows = 0
+        self._base_length = 0
+        self._postings = {}  # term -> [row ids, term frequencies, cached arrays or None]
+        self._lengths = []
+        self._length_array = None
+        self._total_length = 0
+        self._vectors = []  # embedding matrices, concatenated on the next query
+        self._matrix = None
+        self._queries = OrderedDict()
+        self.add_many(list(texts))
+
+    def __len__(self):
+        return self._base_rows + len(self._lengths)
+
+    @property
+    def model_key(self):
+        """Names saved files: they depend on the embedding model, ``tokenize`` and the file layout"""
+        return hashlib.sha1(f"{SAVE_FORMAT}:{self.model}".encode("utf-8")).hexdigest()[:12]
+
+    def save(self, path):
+        """Write the rows of a ranker built in memory to ``path`` as an Arrow file"""
+        if self._base is not None:
+            raise ValueError("Only a ranker built in memory can be saved")
+        import pyarrow as pa
+        terms = list(self._postings)
+        sizes = [len(self._postings[term][0]) for term in terms]
+        columns = {
+            "terms": pa.array(terms, pa.string()),
+            "indptr": pa.array(np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])),
+            "rows": pa.array(np.fromiter((row for term in terms for row in self._postings[term][0]),
+                                         dtype=np.int32, count=sum(sizes))),
+            "tf": pa.array(np.fromiter((tf for term in terms for tf in self._postings[term][1]),
+                                       dtype=np.float32, count=sum(sizes))),
+            "lengths": pa.array(np.asarray(self._lengths, dtype=np.float32)),
+            "matrix": pa.array(self._matrix_now().ravel() if self._lengths else np.zeros(0, np.float32)),
+        }
+        # One row of lists, so arrays of different lengths share a file and map back without copying
+        table = pa.table({name: pa.LargeListArray.from_arrays(pa.array([0, len(values)], pa.int64()), values)
+                          for name, values in columns.items()})
+        table = table.replace_schema_metadata({"model": self.model, "rows": str(len(self)),
+                                               "length": str(self._total_length)})
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def open(cls, path, **options):
+        """A ranker over the rows saved at ``path``, read from a memory map; ``options``
+        are the constructor's, and the embedder must be the one the file was built with"""
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        ranker = cls(**options)
+        metadata = table.schema.metadata
+        if metadata[b"model"].decode() != ranker.model:
+            raise ValueError(f"{path} was built with {metadata[b'model'].decode()}, not {ranker.model}")
+        arrays = {name: table.column(name).chunk(0).values for name in table.column_names}
+        # Views of the mapped buffers; Array.to_numpy would also work but loads pandas
+        ranker._base = {name: np.frombuffer(arrays[name].buffers()[1], dtype=dtype)[
+                            arrays[name].offset:arrays[name].offset + len(arrays[name])]
+                        for name, dtype in _SAVED_DTYPES.items()}
+        # The vocabulary is small next to the postings; a dict of it makes term lookups O(1)
+        ranker._base["terms"] = {term: i for i, term in enumerate(arrays["terms"].to_pylist())}
+        ranker._base_rows = int(metadata[b"rows"])
+        ranker._base_length = int(metadata[b"length"])
+        if ranker._base_rows:
+            ranker._base["matrix"] = ranker._base["matrix"].reshape(ranker._base_rows, -1)
+        return ranker
+
+    def _embed(self, texts):
+        embed = self.embedder.embed if hasattr(self.embedder, "embed") else self.embedder
+        return embed(texts)
+
+    def add(self, text):
+        """Append one row; returns its id"""
+        return self.add_many([text])[0]
+
+    def add_many(self, texts):
+        start = len(self)
+        for row, text in enumerate(texts, start):
+            terms = tokenize(text)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = [[], [], None]
+                posting[0].append(row)
+                posting[1].append(count)
+                posting[2] = None
+            self._lengths.append(len(terms))
+            self._total_length += len(terms)
+        self._length_array = None
+        if texts:
+            self._vectors.append(self.cache.get_many(self.model, texts, self._embed))
+            self._matrix = None
+        return list(range(start, start + len(texts)))
+
+    def _matrix_now(self):
+        """Embeddings of the rows added in memory"""
+        if self._matrix is None:
+            self._matrix = np.concatenate(self._vectors) if len(self._vectors) > 1 else self._vectors[0]
+            self._vectors = [self._matrix]
+        return self._matrix
+
+    def _similarity(self, query, ids=None):
+        """Cosine of ``query`` with rows ``ids`` (all rows if None)"""
+        parts = []
+        if self._base_rows:
+            matrix = self._base["matrix"]
+            parts.append(matrix @ query if ids is None else matrix[ids[ids < self._base_rows]] @ query)
+        if self._lengths:
+            matrix = self._matrix_now()
+            parts.append(matrix @ query if ids is None else matrix[ids[ids >= self._base_rows] - self._base_rows] @ query)
+        similarity = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        if ids is not None and len(parts) > 1:
+            # Put the two halves back in the order of ids
+            order = np.argsort(ids >= self._base_rows, kind="stable")
+            similarity = similarity[np.argsort(order, kind="stable")]
+        return similarity
+
+    def _row_lengths(self, ids):
+        if self._length_array is None:
+            self._length_array = np.asarray(self._lengths, dtype=np.float32)
+        if not self._base_rows:
+            return self._length_array[ids]
+        lengths = np.empty(len(ids), dtype=np.float32)
+        base = ids < self._base_rows
+        lengths[base] = self._base["lengths"][ids[base]]
+        lengths[~base] = self._length_array[ids[~base] - self._base_rows]
+        return lengths
+
+    def _posting(self, term):
+        posting = self._postings.get(term)
+        index = self._base["terms"].get(term) if self._base is not None else None
+        if index is not None:
+            start, stop = self._base["indptr"][index], self._base["indptr"][index + 1]
+            base = (self._base["rows"][start:stop], self._base["tf"][start:stop])
+            if posting is None:
+                return base
+        elif posting is None:
+            return None
+        if posting[2] is None:
+            posting[2] = (np.asarray(posting[0], dtype=np.int64), np.asarray(posting[1], dtype=np.float32))
+            if index is not None:
+                posting[2] = (np.concatenate([base[0], posting[2][0]]), np.concatenate([base[1], posting[2][1]]))
+        return posting[2]
+
+    def bm25(self, terms):
+        """(row ids, scores) of rows sharing at least one of ``terms``"""
+        n = len(self)
+        if not n:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        average = (self._base_length + self._total_length) / n or 1.0
+        rows, weights = [], []
+        for term in dict.fromkeys(terms):
+            posting = self._posting(term)
+            if posting is None:
+                continue
+            ids, tf = posting
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = tf + self.k1 * (1 - self.b + self.b * self._row_lengths(ids) / average)
+            rows.append(ids)
+            weights.append(idf * tf * (self.k1 + 1) / norm)
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        # A dense accumulator is cheaper than sorting the postings to merge them
+        scores = np.bincount(np.concatenate(rows), weights=np.concatenate(weights), minlength=n)
+        ids = np.flatnonzero(scores)
+        return ids, scores[ids].astype(np.float32)
+
+    def _query_vector(self, text):
+        vector = self._queries.get(text)
+        if vector is None:
+            vector = np.asarray(self._embed([text]), dtype=np.float32)[0]
+            self._queries[text] = vector
+            if len(self._queries) > self.max_cached_queries:
+                self._queries.popitem(last=False)
+        else:
+            self._queries.move_to_end(text)
+        return vector
+
+    def _closest(self, query, count, exclude=None):
+        """(row ids, cosine) of the ``count`` rows nearest ``query``, leaving out ``exclude``"""
+        similarity = self._similarity(query)
+        if exclude is not None:
+            similarity[exclude] = -np.inf
+        count = min(count, len(similarity) - (0 if exclude is None else len(exclude)))
+        if count <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        # argpartition, not a full sort: at 100k rows the sort would dominate the query
+        ids = np.argpartition(-similarity, count - 1)[:count]
+        return ids, similarity[ids]
+
+    @staticmethod
+    def _ordered(ids, scores):
+        # Stable on row order, so equal scores keep the earlier item first
+        order = np.lexsort((ids, -scores))
+        return ids[order], scores[order]
+
+    def scores(self, skills):
+        """(row ids, fused scores) for the shortlist of ``skills``, best first"""
+        text = self._text(skills)
+        ids, lexical = self.bm25(tokenize(text))
+        if len(ids) > self.shortlist:
+            keep = np.argpartition(-lexical, self.shortlist - 1)[:self.shortlist]
+            ids, lexical = ids[keep], lexical[keep]
+        if not len(self):
+            return ids, lexical
+        query = self._query_vector(text)
+        if not len(ids):
+            return self._ordered(*self._closest(query, self.shortlist))
+        semantic = self._similarity(query, ids)
+        return self._ordered(ids, self.lexical_weight * lexical / lexical.max() + self.semantic_weight * semantic)
+
+    @staticmethod
+    def _text(skills):
+        if isinstance(skills, str):
+            skills = [skills]
+        return ", ".join(str(skill) for skill in skills)
+
+    def top_k(self, skills, k):
+        """Row ids of the ``k`` best matches"""
+        if k <= 0:
+            return []
+        ids, _ = self.scores(skills)
+        if len(ids) < min(k, len(self)):
+            # Too few lexical matches: fill up with the closest of the remaining rows
+            rest = self._ordered(*self._closest(self._query_vector(self._text(skills)), k - len(ids), ids))[0]
+            ids = np.concatenate([ids, rest])
+        return ids[:k].tolist()
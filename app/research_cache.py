@@ -0,0 +1,134 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from metrics import get_metrics
+from sqlite_util import ThreadLocalConnection, hit_stats
+
+# Second-level labels under which registrations happen one level deeper (bbc.co.uk, abc.net.au)
+_SECOND_LEVEL = {"ac", "co", "com", "edu", "gov", "net", "org", "ne", "or", "go", "gob", "nic", "mil"}
+
+
+def registrable_domain(url):
+    """``jobs.nike.com`` -> ``nike.com``, ``careers.bbc.co.uk`` -> ``bbc.co.uk``; IPs and localhost stay whole"""
+    host = (urlsplit(url if "//" in url else "//" + url).hostname or "").rstrip(".").lower()
+    labels = host.split(".")
+    if len(labels) <= 2 or host.replace(".", "").isdigit():
+        return host
+    if len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class CompanyResearchCache:
+    """Company research keyed by registrable domain.
+
+    Chain researches a company from the ``/about`` page of the job URL's site,
+    so every job URL on one domain shares one result. Lookups go to an
+    in-memory LRU first and then to SQLite (shared by every process on the
+    machine); entries older than ``ttl`` seconds are misses. Concurrent misses
+    for the same domain wait for a single computation instead of each running
+    their own.
+    """
+
+    def __init__(self, path="company_research.sqlite3", ttl=7 * 24 * 3600, max_memory=256):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # domain -> (created, research)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._conn = ThreadLocalConnection(path)
+        if path:
+            conn = self._conn()
+            conn.execute("""CREATE TABLE IF NOT EXISTS research (
+                                domain TEXT PRIMARY KEY,
+                                research TEXT NOT NULL,
+                                created REAL NOT NULL)""")
+            conn.commit()
+
+    def _remember(self, domain, created, research):
+        with self._lock:
+            self._memory[domain] = (created, research)
+            self._memory.move_to_end(domain)
+            if len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def get(self, domain):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(domain)
+            if entry and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(domain)
+                self.hits += 1
+                get_metrics().increment("research_cache", result="hit")
+                return copy.deepcopy(entry[1])
+        if self.path:
+            row = self._conn().execute("SELECT research, created FROM research WHERE domain = ?",
+                                       (domain,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                research = json.loads(row[0])
+                self._remember(domain, row[1], research)
+                self.hits += 1
+                get_metrics().increment("research_cache", result="hit")
+                return copy.deepcopy(research)
+        self.misses += 1
+        get_metrics().increment("research_cache", result="miss")
+        return None
+
+    def set(self, domain, research):
+        now = time.time()
+        self._remember(domain, now, copy.deepcopy(research))
+        if self.path:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO research (domain, research, created) VALUES (?, ?, ?)",
+                         (domain, json.dumps(research), now))
+            conn.commit()
+
+    def get_or_compute(self, domain, compute):
+        """Cached research for ``domain``, or ``compute()`` run once however many threads ask.
+
+        Exceptions from ``compute`` reach every waiting caller and nothing is cached.
+        """
+        research = self.get(domain)
+        if research is not None:
+            return research
+        with self._lock:
+            entry = self._memory.get(domain)
+            if entry and time.time() - entry[0] <= self.ttl:
+                # Another leader finished between our miss and taking the lock
+                return copy.deepcopy(entry[1])
+            future = self._inflight.get(domain)
+            leader = future is None
+            if leader:
+                future = self._inflight[domain] = Future()
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            research = compute()
+            self.set(domain, research)
+            future.set_result(research)
+            return copy.deepcopy(research)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(domain, None)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            conn = self._conn()
+            conn.execute("DELETE FROM research")
+            conn.commit()
+
+    def stats(self):
+        return hit_stats(self.hits, self.misses, in_memory=len(self._memory))
@@ -0,0 +1,129 @@
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+_SEP = "\x00"
+
+
+class SkillIndex:
+    """Precomputed matcher for SimplePortfolio's "skill is a substring of the stack" rule.
+
+    All lowercased tech stacks are concatenated into one string, so finding the
+    rows that contain a skill is a single C-level regex scan plus a
+    ``searchsorted`` from match offsets to row ids. Those posting lists are kept
+    in an LRU keyed by skill, which turns repeated skills into array lookups,
+    and scores for a whole query are one ``bincount``.
+
+    ``base`` is an Arrow string column for the first rows. An Arrow string
+    array already is one concatenated UTF-8 buffer plus row offsets, so it is
+    scanned in place, case-insensitively for ASCII, and nothing is copied out of
+    a memory-mapped file. Rows added with ``add`` follow it.
+    """
+
+    def __init__(self, techstacks=(), max_cached_skills=4096, base=None):
+        self.max_cached_skills = max_cached_skills
+        # (data buffer, offsets, first row id) per chunk of the Arrow base
+        self._base = []
+        self._base_rows = 0
+        for chunk in (base.chunks if hasattr(base, "chunks") else [base]) if base is not None else []:
+            _, offsets, data = chunk.buffers()
+            offsets = np.frombuffer(offsets, dtype=np.int32)[chunk.offset:chunk.offset + len(chunk) + 1]
+            self._base.append((data, offsets, self._base_rows))
+            self._base_rows += len(chunk)
+        self._stacks = []
+        self._chunks = []
+        self._text = ""
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._pending_starts = []
+        self._length = 0
+        self._postings = OrderedDict()
+        for techstack in techstacks:
+            self.add(techstack)
+
+    def __len__(self):
+        return self._base_rows + len(self._stacks)
+
+    def add(self, techstack):
+        """Append one row; cached posting lists are patched instead of rebuilt"""
+        stack = str(techstack).lower()
+        row = len(self)
+        self._stacks.append(stack)
+        self._pending_starts.append(self._length)
+        self._chunks.append(stack + _SEP)
+        self._length += len(stack) + 1
+        for skill, rows in self._postings.items():
+            if skill in stack:
+                self._postings[skill] = np.append(rows, row)
+        return row
+
+    def _flush(self):
+        if self._chunks:
+            self._text += "".join(self._chunks)
+            self._starts = np.concatenate([self._starts, np.asarray(self._pending_starts, dtype=np.int64)])
+            self._chunks = []
+            self._pending_starts = []
+
+    def rows_for(self, skill):
+        """Ids of rows whose stack contains ``skill`` (already lowercased)"""
+        rows = self._postings.get(skill)
+        if rows is not None:
+            self._postings.move_to_end(skill)
+            return rows
+        if not skill:
+            # The empty string is a substring of everything
+            rows = np.arange(len(self))
+        elif _SEP in skill:
+            rows = np.zeros(0, dtype=np.int64)
+        else:
+            self._flush()
+            offsets = np.fromiter((m.start() for m in re.finditer(re.escape(skill), self._text)), dtype=np.int64)
+            rows = np.unique(np.searchsorted(self._starts, offsets, side="right") - 1) + self._base_rows
+            if self._base:
+                rows = np.concatenate([self._base_rows_for(skill), rows])
+        self._postings[skill] = rows
+        if len(self._postings) > self.max_cached_skills:
+            self._postings.popitem(last=False)
+        return rows
+
+    def _base_rows_for(self, skill):
+        needle = skill.encode("utf-8")
+        pattern = re.compile(re.escape(needle), re.IGNORECASE)
+        found = []
+        for data, offsets, first_row in self._base:
+            if data is None:
+                continue
+            starts = np.fromiter((m.start() for m in pattern.finditer(data)), dtype=np.int64)
+            rows = np.searchsorted(offsets, starts, side="right") - 1
+            # Values sit back to back in the buffer, so a match can run from one row into the
+            # next; drop those, and look again inside each for an overlapping match it hid
+            inside = starts + len(needle) <= offsets[rows + 1]
+            hidden = [start for crossing in starts[~inside].tolist()
+                      for start in range(crossing + 1, crossing + len(needle)) if pattern.match(data, start)]
+            starts = np.concatenate([starts[inside], np.asarray(hidden, dtype=np.int64)])
+            rows = np.searchsorted(offsets, starts, side="right") - 1
+            rows = rows[starts + len(needle) <= offsets[rows + 1]]
+            found.append(np.unique(rows) + first_row)
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def scores(self, skills):
+        """Number of ``skills`` matching each row (duplicates count twice, as before)"""
+        hits = [self.rows_for(skill) for skill in skills]
+        if not hits:
+            return np.zeros(len(self), dtype=np.int64)
+        return np.bincount(np.concatenate(hits).astype(np.int64), minlength=len(self))
+
+    def top_k(self, skills, k):
+        """Row ids of the ``k`` best matches, ties broken by row order like a stable sort"""
+        n = len(self)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        scores = self.scores(skills)
+        if k == n:
+            return np.lexsort((np.arange(n), -scores)).tolist()
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        above = above[np.lexsort((above, -scores[above]))]
+        ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+        return np.concatenate([above, ties]).tolist()
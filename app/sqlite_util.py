@@ -0,0 +1,37 @@
+"""SQLite plumbing shared by the on-disk caches and stores.
+
+Every store keeps one connection per thread, because sqlite3 connections can't
+be shared between threads, and opens it in WAL mode so Streamlit sessions,
+batch workers and other processes can read while one of them writes;
+``synchronous=NORMAL`` only syncs the WAL at checkpoints.
+"""
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Call it for this thread's connection to ``path``, opened on first use"""
+
+    def __init__(self, path, timeout=30, row_factory=None):
+        self.path = path
+        self.timeout = timeout
+        self.row_factory = row_factory
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def hit_stats(hits, misses, **counts):
+    """A cache's ``stats()``: hits, misses, any ``counts`` such as entries, and the hit rate"""
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, **counts,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
@@ -1,16 +1,103 @@
 import re
+import string
+
+_TAG_RE = re.compile(r'<[^>]*>')
+# Same characters as the original URL pattern, written as one class so the scan stays in C
+_URL_RE = re.compile(r'https?://[!$-_a-z&+.@*(),\\]+')
+_WORD_RE = re.compile(r'[a-zA-Z0-9]+')
+# Every character a URL or word can contain; a trailing run of these may still grow
+_WORD_CHARS = ''.join(chr(c) for c in range(0x24, 0x60)) + string.ascii_letters + '@.&+!*\\(),'
+
+
+def _tokens(text):
+    return _WORD_RE.findall(_URL_RE.sub('', text))
+
 
 def clean_text(text):
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*?>', '', text)
-    # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # Trim leading and trailing whitespace
-    text = text.strip()
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
\ No newline at end of file
+    """Strip tags, URLs and punctuation, leaving alphanumeric words separated by single spaces.
+
+    Equivalent to the old five-regex pipeline (tags, URLs, special characters to
+    spaces, whitespace collapsing, strip) with three precompiled passes and no
+    intermediate whitespace rewriting.
+    """
+    return ' '.join(_tokens(_TAG_RE.sub('', text)))
+
+
+class TextCleaner:
+    """Incremental ``clean_text`` for pages that arrive in chunks.
+
+    ``feed`` returns the words that can no longer change and ``close`` flushes
+    the rest; joining everything with spaces gives exactly ``clean_text`` of the
+    concatenated input. Text after an unclosed ``<`` and a trailing run of
+    word/URL characters are held back until more input decides them.
+    """
+
+    def __init__(self):
+        self._raw = ''
+        self._tail = ''
+
+    def feed(self, chunk):
+        raw = self._raw + chunk
+        # The first "<" after the last ">" might open a tag that closes in a later chunk
+        start = raw.find('<', raw.rfind('>') + 1)
+        if start != -1:
+            raw, self._raw = raw[:start], raw[start:]
+        else:
+            self._raw = ''
+        text = self._tail + _TAG_RE.sub('', raw)
+        settled = text.rstrip(_WORD_CHARS)
+        self._tail = text[len(settled):]
+        return _tokens(settled)
+
+    def close(self):
+        text = self._tail + _TAG_RE.sub('', self._raw)
+        self._raw = self._tail = ''
+        return _tokens(text)
+
+
+def clean_text_chunks(chunks):
+    """``clean_text`` over an iterable of string chunks"""
+    cleaner = TextCleaner()
+    words = []
+    for chunk in chunks:
+        words.extend(cleaner.feed(chunk))
+    words.extend(cleaner.close())
+    return ' '.join(words)
+
+
+# Phrases that usually start a new posting on a cleaned careers page
+_JOB_BOUNDARY_RE = re.compile(
+    r' (?=(?:Apply now|Apply|Job ID|Job Description|Req ID|Requisition ID|Posted|Location|About the role|'
+    r'Senior|Junior|Lead|Principal|Staff) )')
+
+
+def split_windows(text, max_chars, overlap_chars=0):
+    """Split cleaned text into windows of at most ``max_chars`` characters.
+
+    Cuts prefer a job boundary in the second half of the window, then any space,
+    and consecutive windows overlap by about ``overlap_chars`` so a posting cut
+    at the edge still appears whole in one of them.
+    """
+    if len(text) <= max_chars:
+        return [text] if text else []
+    windows = []
+    start = 0
+    while start < len(text):
+        end = start + max_chars
+        if end >= len(text):
+            windows.append(text[start:])
+            break
+        half = start + max_chars // 2
+        cut = -1
+        for match in _JOB_BOUNDARY_RE.finditer(text, half, end):
+            cut = match.start()
+        if cut == -1:
+            cut = text.rfind(' ', half, end)
+        if cut == -1:
+            cut = end
+        windows.append(text[start:cut].strip())
+        next_start = max(cut - overlap_chars, start + 1)
+        # Start the next window on a word
+        space = text.find(' ', next_start, cut)
+        start = space + 1 if space != -1 and overlap_chars else cut
+    return [window for window in windows if window]
@@ -0,0 +1,67 @@
+"""Offline throughput benchmark for the batch pipeline.
+
+Serves synthetic careers pages from a local HTTP server, answers every LLM call
+with StubLLM and reports URLs/second for a sequential run (one worker per
+stage) against the default concurrent configuration, and that configuration
+again with parsing in ``--parse-workers`` processes.
+
+    python benchmarks/bench_batch.py --urls 200 --page-delay 0.05 --llm-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+# Every fixture page comes from one local host; don't space those requests out
+os.environ.setdefault("HTTP_HOST_DELAY", "0")
+
+from batch import BatchPipeline  # noqa: E402
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from fixture_server import serve_fixtures  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher  # noqa: E402
+from parse_pool import ParsePool  # noqa: E402
+from portfolio import SimplePortfolio  # noqa: E402
+
+
+def run(items, llm_latency, parse_workers=0, **concurrency):
+    llm = StubLLM(latency=llm_latency)
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9,
+                               max_concurrency=concurrency["extract_concurrency"] + concurrency["write_concurrency"])
+    parse_pool = ParsePool(parse_workers) if parse_workers else None
+    pipeline = BatchPipeline(Chain(llm=llm, dispatcher=dispatcher, cache=False), SimplePortfolio(),
+                             parse_pool=parse_pool, **concurrency)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            return asyncio.run(pipeline.run(items, os.path.join(tmp, "out.jsonl")))
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--page-delay", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with serve_fixtures(delay=args.page_delay) as base_url:
+        items = [{"id": str(i), "url": f"{base_url}/careers/{i}"} for i in range(args.urls)]
+        configs = {
+            "sequential": dict(fetch_concurrency=1, extract_concurrency=1, write_concurrency=1),
+            "concurrent": dict(fetch_concurrency=16, extract_concurrency=8, write_concurrency=8),
+            "processes": dict(fetch_concurrency=16, extract_concurrency=8, write_concurrency=8,
+                              parse_workers=args.parse_workers),
+        }
+        for name, concurrency in configs.items():
+            stats = run(items, args.llm_latency, **concurrency)
+            print(f"{name:>10}: {stats['ok']} ok, {stats['error']} errors in {stats['seconds']:.2f}s "
+                  f"({stats['ok'] / stats['seconds']:.1f} URLs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Golden checks and microbenchmark for utils.clean_text.
+
+First asserts that clean_text, and TextCleaner fed in small chunks, match the
+pinned golden outputs and the original five-regex implementation on random
+HTML. Then times both on large synthetic careers pages.
+
+    python benchmarks/bench_clean_text.py --sizes 1 5
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from utils import clean_text, clean_text_chunks  # noqa: E402
+
+# Input -> output pairs that pin the current behavior
+GOLDEN = [
+    ("<p>Senior   Python\nEngineer</p>", "Senior Python Engineer"),
+    ("Apply at https://jobs.example.com/apply?id=42&src=x now!", "Apply at now"),
+    ("foo<b>bar</b> baz", "foobar baz"),
+    ("seehttps://example.com/x, then", "see then"),
+    ("http<span>s</span>://hidden.example.com next", "next"),
+    ("C++/C# & .NET (3+ yrs)", "C C NET 3 yrs"),
+    ("http:// alone", "http alone"),
+    ("HTTP://UPPER.example.com", "HTTP UPPER example com"),
+    ("a < b and c > d", "a d"),
+    ("unclosed <tag at the end", "unclosed tag at the end"),
+    ("Café naïve — résumé", "Caf na ve r sum"),
+    ("", ""),
+]
+
+
+def legacy_clean_text(text):
+    """The five-pass clean_text from main.py, kept as the reference"""
+    text = re.sub(r'<[^>]*?>', '', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'[^a-zA-Z0-9 ]', ' ', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = text.strip()
+    text = ' '.join(text.split())
+    return text
+
+
+def chunked(text, size):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+def random_html(rng, n):
+    pieces = ["<div class=\"job\">", "</div>", "<a href=\"https://x.io/a?b=c\">", "</a>", "Python", "Django",
+              " ", "\n", "https://careers.example.com/job/123", "h", "http", "://", "<", ">", "&amp;", ",",
+              "Senior Engineer", "é", "C#", "(remote)", "\t", "100%", "<br/>", "s"]
+    return "".join(rng.choice(pieces) for _ in range(n))
+
+
+def make_page(megabytes, rng):
+    job = ("<div class=\"posting\"><h2>Senior {role} Engineer</h2><p>We use Python, Django &amp; AWS. "
+           "Apply: https://jobs.example.com/apply/{n}?ref=careers</p><ul><li>5+ years</li></ul></div>\n")
+    roles = ["Backend", "Frontend", "Data", "Platform", "ML"]
+    parts, size, n = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        part = job.format(role=rng.choice(roles), n=n)
+        parts.append(part)
+        size += len(part)
+        n += 1
+    return "<html><body>" + "".join(parts) + "</body></html>"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for text, expected in GOLDEN:
+        assert legacy_clean_text(text) == expected, (text, legacy_clean_text(text))
+        assert clean_text(text) == expected, (text, clean_text(text))
+        for size in (1, 2, 3, 7):
+            assert clean_text_chunks(chunked(text, size)) == expected, (text, size)
+    for _ in range(2000):
+        text = random_html(rng, rng.randint(0, 60))
+        expected = legacy_clean_text(text)
+        assert clean_text(text) == expected, text
+        assert clean_text_chunks(chunked(text, rng.randint(1, 10))) == expected, text
+    print("golden and randomized checks passed")
+
+    for megabytes in args.sizes:
+        page = make_page(megabytes, rng)
+        timings = {}
+        for name, fn in [("legacy", legacy_clean_text), ("clean_text", clean_text),
+                         ("streamed 64KB", lambda t: clean_text_chunks(chunked(t, 65536)))]:
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                out = fn(page)
+                best = min(best, time.perf_counter() - started)
+            timings[name] = best
+            assert out == legacy_clean_text(page)
+        print(f"{megabytes:4.1f} MB: " + ", ".join(f"{k} {v * 1000:7.1f} ms" for k, v in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
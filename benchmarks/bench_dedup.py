@@ -0,0 +1,209 @@
+"""LLM calls saved by near-duplicate detection on a lead list with syndicated postings.
+
+Generates ``--postings`` distinct job postings and, for ``--syndicated`` of
+them, mirror pages as an ATS or job board would serve them: different
+navigation, cookie banner and footer, a tracking reference and an occasional
+dropped sentence. Runs the batch pipeline over the shuffled list with a
+counting StubLLM, with and without a ``NearDuplicateIndex``, and reports LLM
+calls, how many mirrors were caught and how many distinct postings were
+wrongly merged. A second run over fresh mirrors shows reuse across runs, and a
+third puts short distinct postings inside one ATS's ``--template-words`` of
+shared page chrome, where nothing should be reused. The last two runs post the
+same role and description for other companies on their own sites, without and
+with company research, where nothing should be reused either.
+
+The stub extracts jobs the way an LLM would, from the posting and not the
+site chrome around it.
+
+    python benchmarks/bench_dedup.py --postings 200 --syndicated 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from batch import BatchPipeline  # noqa: E402
+from chains import Chain  # noqa: E402
+from dedup import NearDuplicateIndex  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher  # noqa: E402
+from portfolio import SimplePortfolio  # noqa: E402
+from research_cache import registrable_domain  # noqa: E402
+
+ROLES = ["Backend Engineer", "Data Scientist", "Frontend Developer", "DevOps Engineer", "ML Engineer",
+         "Product Designer", "QA Engineer", "Mobile Developer", "Data Engineer", "Security Engineer"]
+SKILLS = ["Python", "Django", "React", "AWS", "Kubernetes", "Terraform", "PyTorch", "Spark", "Kotlin",
+          "Swift", "Postgres", "Kafka", "Go", "Rust", "TypeScript", "Airflow", "Snowflake", "Figma"]
+WORDS = ("we are looking for an engineer to join our growing team and help build reliable services that "
+         "power products used by customers around the world you will design implement test and operate "
+         "systems collaborate with product managers and designers mentor colleagues review code improve "
+         "observability and tooling own features from idea to production and share what you learn with "
+         "the wider organisation benefits include flexible hours remote work learning budget health "
+         "insurance equity and generous parental leave").split()
+SITES = [("Greenhouse", "Apply for this job Back to jobs Powered by Greenhouse Privacy Policy"),
+         ("Lever", "Apply for this job Lever Jobs home Report this posting Cookie settings"),
+         ("Workday", "Sign in Search for jobs Careers home Workday Candidate Home Accept cookies"),
+         ("LinkedIn", "Easy Apply Save See who you know Similar jobs People also viewed Join now"),
+         ("Indeed", "Report job Company reviews Salary guide Find jobs Post a job Upload your resume")]
+
+
+class PostingLLM(StubLLM):
+    """StubLLM whose extracted job comes from the posting inside the page"""
+
+    def respond(self, prompt):
+        if "### SCRAPED TEXT FROM WEBSITE:" not in prompt:
+            return super().respond(prompt)
+        page = prompt.split("### SCRAPED TEXT FROM WEBSITE:", 1)[1].split("### VALID JSON", 1)[0]
+        company = re.search(r"Company\d+", page)
+        body = page[company.end():] if company else page
+        requirements = body.split("Requirements", 1)[-1]
+        return json.dumps([{
+            "role": next((role for role in ROLES if role in page), "Software Engineer"),
+            "experience": "3+ years",
+            "skills": [skill for skill in SKILLS if skill in requirements],
+            "description": " ".join(body.split()[:30]),
+            "company_name": company.group(0) if company else "Unknown",
+        }])
+
+
+def posting(i, rng):
+    role = rng.choice(ROLES)
+    skills = rng.sample(SKILLS, 4)
+    sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 18))) + "." for _ in range(20)]
+    return {"company": f"Company{i}", "role": role, "skills": skills, "sentences": sentences}
+
+
+def render(post, site, rng, ref):
+    name, chrome = site
+    sentences = list(post["sentences"])
+    if rng.random() < 0.5:
+        sentences.pop(rng.randrange(len(sentences)))
+    body = " ".join(sentences)
+    return (f"<html><body><nav>{name} {chrome}</nav><main><h1>{post['role']} at {post['company']}</h1>"
+            f"<p>{body}</p><p>Requirements: {', '.join(post['skills'])}</p>"
+            f"<p>Ref {ref}</p></main><footer>{chrome} {name} 2024</footer></body></html>")
+
+
+def lead_list(postings, syndicated, mirrors, rng, tag):
+    """(items, pages by URL, {url: posting index}) with ``mirrors`` extra copies of a share of postings"""
+    items, pages, truth = [], {}, {}
+    for i, post in enumerate(postings):
+        copies = 1 + (mirrors if rng.random() < syndicated else 0)
+        for copy, site in enumerate(rng.sample(SITES, copies)):
+            url = f"https://{site[0].lower()}.example/{tag}/{i}/{copy}"
+            pages[url] = render(post, site, rng, f"{tag}-{rng.getrandbits(32):08x}")
+            truth[url] = i
+            items.append({"id": url, "url": url})
+    rng.shuffle(items)
+    return items, pages, truth
+
+
+def template_list(postings, words, rng, tag):
+    """Every posting on one ATS whose ``words`` of page chrome dwarf a short posting body"""
+    chrome = " ".join(rng.choice(WORDS + SKILLS) for _ in range(words))
+    items, pages, truth = [], {}, {}
+    for i, post in enumerate(postings):
+        url = f"https://ats.example/{tag}/{i}"
+        body = " ".join(post["sentences"][:8])
+        pages[url] = (f"<html><body><nav>{chrome}</nav><main><h1>{post['role']} at {post['company']}</h1>"
+                      f"<p>{body}</p><p>Requirements: {', '.join(post['skills'])}</p></main></body></html>")
+        truth[url] = i
+        items.append({"id": url, "url": url})
+    return items, pages, truth
+
+
+def company_list(postings, rng, tag, first_company):
+    """The same postings advertised by other companies, each on its own site"""
+    items, pages, truth = [], {}, {}
+    for i, post in enumerate(postings):
+        post = dict(post, company=f"Company{first_company + i}")
+        url = f"https://{post['company'].lower()}.example/{tag}/{i}"
+        pages[url] = render(post, ("Careers", "Home About Careers Contact"), rng, f"{tag}-{i}")
+        truth[url] = first_company + i
+        items.append({"id": url, "url": url})
+    return items, pages, truth
+
+
+def run(items, pages, dedup, llm_latency, page_threshold=0.9, research=False):
+    llm = PostingLLM(latency=llm_latency)
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9)
+    chain = Chain(llm=llm, dispatcher=dispatcher, cache=False, research_cache=False)
+    # Research that differs per company site, without fetching About pages
+    chain.extract_company_info = lambda url, company_name=None: {"values": registrable_domain(url)}
+    pipeline = BatchPipeline(chain, SimplePortfolio(), page_loader=pages.__getitem__, dedup=dedup,
+                             page_dedup_threshold=page_threshold,
+                             personalization={"include_company_research": research})
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "out.jsonl")
+        started = time.perf_counter()
+        stats = asyncio.run(pipeline.run(items, output))
+        seconds = time.perf_counter() - started
+        with open(output) as f:
+            records = [json.loads(line) for line in f]
+    return llm.calls, stats, records, seconds
+
+
+def report(label, calls, baseline, records, truth, seconds):
+    duplicates = [r for r in records if r.get("duplicate_of")]
+    wrong = sum(1 for r in duplicates if truth.get(r["duplicate_of"], truth[r["url"]]) != truth[r["url"]])
+    saved = 1 - calls / baseline if baseline else 0.0
+    print(f"{label:24s} {calls:5d} LLM calls ({saved:6.1%} saved)  {len(duplicates):4d} reused  "
+          f"{wrong} wrong merges  {seconds:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--postings", type=int, default=200)
+    parser.add_argument("--syndicated", type=float, default=0.3, help="Share of postings with mirrors")
+    parser.add_argument("--mirrors", type=int, default=2, help="Extra copies of a syndicated posting")
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--page-threshold", type=float, default=0.9)
+    parser.add_argument("--template-words", type=int, default=800)
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    postings = [posting(i, rng) for i in range(args.postings)]
+    items, pages, truth = lead_list(postings, args.syndicated, args.mirrors, rng, "run1")
+    print(f"{args.postings} postings, {len(items)} URLs")
+
+    baseline, _, records, seconds = run(items, pages, None, args.llm_latency)
+    report("no dedup", baseline, baseline, records, truth, seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        dedup = NearDuplicateIndex(os.path.join(tmp, "index.sqlite3"), threshold=args.threshold)
+        calls, _, records, seconds = run(items, pages, dedup, args.llm_latency, args.page_threshold)
+        report("dedup", calls, baseline, records, truth, seconds)
+
+        # A later lead list with fresh mirrors of the same postings, against the persisted index
+        items, pages, later = lead_list(postings, 1.0, 0, rng, "run2")
+        truth.update(later)
+        calls, _, records, seconds = run(items, pages, dedup, args.llm_latency, args.page_threshold)
+        report("next run, all mirrors", calls, 2 * len(items), records, truth, seconds)
+
+        # New postings, so any reuse here is a wrong merge
+        fresh = [posting(args.postings + i, rng) for i in range(args.postings)]
+        items, pages, shared = template_list(fresh, args.template_words, rng, "ats")
+        truth.update({url: args.postings + i for url, i in shared.items()})
+        calls, _, records, seconds = run(items, pages, dedup, args.llm_latency, args.page_threshold)
+        report("one ATS template", calls, 2 * len(items), records, truth, seconds)
+
+        # The first postings again, word for word, from other companies
+        for label, research in (("other companies", False), ("other companies+research", True)):
+            first = max(truth.values()) + 1
+            items, pages, others = company_list(postings[:args.postings // 2], rng, label[-8:], first)
+            truth.update(others)
+            calls, _, records, seconds = run(items, pages, dedup, args.llm_latency, args.page_threshold, research)
+            report(label, calls, 2 * len(items), records, truth, seconds)
+        print(f"index: {dedup.stats()}")
+
+
+if __name__ == "__main__":
+    main()
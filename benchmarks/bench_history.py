@@ -0,0 +1,100 @@
+"""Email history benchmark: legacy JSON rewrite against the SQLite store.
+
+Builds a history of ``--entries`` saved emails in both formats, then times one
+more save, opening the History tab (loading everything for JSON, one page for
+SQLite), a filtered page and the one-time JSON migration. Also checks that
+concurrent writers from several threads don't lose entries.
+
+    python benchmarks/bench_history.py --entries 100000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from history import EmailHistory  # noqa: E402
+
+STYLES = ["formal", "conversational", "problem-solution"]
+
+
+def make_entry(i):
+    return {"date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:{i % 60:02d}",
+            "job_title": f"Engineer {i % 500}", "company": f"Company {i % 2000}",
+            "url": f"https://example.com/careers/{i}", "template_style": STYLES[i % 3],
+            "email": f"Subject: Hello {i}\n\n" + "Body text. " * 120}
+
+
+def legacy_save(path, entry):
+    try:
+        with open(path) as f:
+            history = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        history = []
+    history.append(entry)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--writers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "email_history.json")
+        entries = [make_entry(i) for i in range(args.entries)]
+        with open(json_path, "w") as f:
+            json.dump(entries, f, indent=2)
+
+        started = time.perf_counter()
+        store = EmailHistory(os.path.join(tmp, "history.sqlite3"), legacy_json=json_path)
+        print(f"migrated {store.count()} JSON entries in {time.perf_counter() - started:.2f}s")
+
+        def load_json():
+            with open(json_path) as f:
+                json.load(f)
+
+        print(f"{args.entries} entries        legacy JSON   SQLite")
+        print(f"save one email      {timed(lambda: legacy_save(json_path, make_entry(0)), 1):9.1f}ms"
+              f" {timed(lambda: store.add(make_entry(0))):7.2f}ms")
+        print(f"open History tab    {timed(load_json, 1):9.1f}ms {timed(lambda: store.page(limit=20)):7.2f}ms")
+        print(f"filtered page       {'-':>9}   "
+              f" {timed(lambda: store.page(limit=20, company='Company 17', template_style='formal')):7.2f}ms")
+        print(f"page 200 of results {'-':>9}   "
+              f" {timed(lambda: store.page(offset=4000, limit=20)):7.2f}ms")
+
+        before = store.count()
+        per_writer = 200
+
+        def writer():
+            for i in range(per_writer):
+                store.add(make_entry(i))
+
+        threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        added = store.count() - before
+        print(f"{args.writers} concurrent writers: {added}/{args.writers * per_writer} entries kept "
+              f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Import time of the core pipeline modules, gated against a budget.
+
+Imports ``chains``, ``portfolio``, ``history``, ``utils`` and ``batch`` in a
+fresh interpreter under ``python -X importtime`` and sums the cumulative time of
+everything that statement imported (interpreter startup is excluded). Also
+checks that none of the heavy UI/LLM/HTTP dependencies were loaded: they must
+wait until first use. Exits non-zero when the median over ``--runs`` exceeds
+``--max-ms`` or a heavy module was imported.
+
+    python benchmarks/bench_import.py --runs 5 --max-ms 200
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+CORE = ["chains", "portfolio", "history", "utils", "batch"]
+HEAVY = ["streamlit", "pandas", "numpy", "langchain_groq", "langchain_core", "langchain_community",
+         "requests", "bs4", "chromadb"]
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure():
+    """(milliseconds, {top-level module: ms}, heavy modules loaded) for one fresh interpreter"""
+    code = (f"import sys, json; sys.path.insert(0, {os.path.abspath(APP_DIR)!r}); import {', '.join(CORE)}; "
+            f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          check=True)
+    entries = [LINE_RE.match(line) for line in proc.stderr.splitlines()]
+    top = [(m.group(4), int(m.group(2))) for m in entries if m and not m.group(3)]
+    # Everything up to the last "site" entry is interpreter startup
+    last_site = max((i for i, (name, _) in enumerate(top) if name == "site"), default=-1)
+    ours = top[last_site + 1:]
+    return sum(us for _, us in ours) / 1000, {name: us / 1000 for name, us in ours}, json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    totals = [total for total, _, _ in runs]
+    median = statistics.median(totals)
+    _, breakdown, heavy = runs[totals.index(median)] if median in totals else runs[0]
+    print(f"import {', '.join(CORE)}: median {median:.1f}ms over {args.runs} runs "
+          f"(min {min(totals):.1f}ms, max {max(totals):.1f}ms, budget {args.max_ms:.0f}ms)")
+    for name, ms in sorted(breakdown.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {name:28s} {ms:7.1f}ms")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}", file=sys.stderr)
+        failed = True
+    if median > args.max_ms:
+        print(f"FAIL: {median:.1f}ms is over the {args.max_ms:.0f}ms budget", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
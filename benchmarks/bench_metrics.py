@@ -0,0 +1,64 @@
+"""Overhead of metrics instrumentation, enabled and disabled.
+
+Times a bare function call against the same call inside ``Metrics.span`` plus
+one ``increment``, with collection on and off, then the whole instrumented
+``Chain.write_mail`` path with a zero-latency StubLLM so the instrumentation is
+a large share of each call.
+
+    python benchmarks/bench_metrics.py --calls 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher  # noqa: E402
+from metrics import Metrics, get_metrics  # noqa: E402
+
+JOB = {"role": "Senior Python Engineer", "skills": ["Python", "Django", "AWS"], "experience": "5+ years"}
+LINKS = [{"links": "https://example.com/python-portfolio"}]
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--emails", type=int, default=2000)
+    args = parser.parse_args()
+
+    def work():
+        return sum((1, 2, 3))
+
+    bare = per_call(work, args.calls)
+    print(f"bare call:           {bare:8.0f} ns")
+    for enabled in (False, True):
+        metrics = Metrics(enabled=enabled)
+
+        def instrumented():
+            with metrics.span("stage", kind="x"):
+                metrics.increment("calls", kind="x")
+                return work()
+        label = "enabled" if enabled else "disabled"
+        print(f"span + counter {label:8s} {per_call(instrumented, args.calls) - bare:8.0f} ns overhead")
+
+    llm = StubLLM()
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9)
+    chain = Chain(llm=llm, dispatcher=dispatcher, cache=False, research_cache=False)
+    for enabled in (False, True):
+        get_metrics().enabled = enabled
+        us = per_call(lambda: chain.write_mail(JOB, LINKS), args.emails) / 1000
+        print(f"write_mail, metrics {'on ' if enabled else 'off'}: {us:8.1f} us per email")
+
+
+if __name__ == "__main__":
+    main()
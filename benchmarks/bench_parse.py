@@ -0,0 +1,77 @@
+"""Parsing and cleaning throughput: threads vs ParsePool worker processes.
+
+Builds a corpus of large careers pages from the saved fixtures (each page's job
+listings repeated up to ``--kb`` kilobytes) and runs ``parse_page`` over it
+with a thread pool (GIL-bound) and with ``ParsePool`` at 1, 2, 4, ... worker
+processes up to ``--max-workers``, with large bodies handed off through spool
+files and, for comparison, pickled inline. Checks every run returns the same
+text as a plain loop.
+
+    python benchmarks/bench_parse.py --pages 200 --kb 400 --max-workers 16
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from parse_pool import ParsePool, parse_page  # noqa: E402
+
+
+def corpus(pages, kb):
+    folder = os.path.join(HERE, "fixtures", "careers")
+    sources = []
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), encoding="utf-8") as f:
+            sources.append(f.read())
+    result = []
+    for i in range(pages):
+        html = sources[i % len(sources)]
+        head, main, tail = re.split(r"</?main>", html)
+        repeats = max(1, kb * 1024 // len(main))
+        result.append(f"{head}<main>{main * repeats}<p>Page {i}</p></main>{tail}")
+    return result
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--kb", type=int, default=400)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=4)
+    args = parser.parse_args()
+
+    pages = corpus(args.pages, args.kb)
+    mb = sum(len(p) for p in pages) / 1e6
+    print(f"{len(pages)} pages, {mb:.0f} MB of HTML, {os.cpu_count()} CPUs")
+
+    expected, seconds = timed(lambda: [parse_page(p) for p in pages])
+    print(f"{'single thread':28s} {len(pages) / seconds:7.1f} pages/s")
+    with ThreadPoolExecutor(args.max_workers) as pool:
+        texts, seconds = timed(lambda: list(pool.map(parse_page, pages)))
+    print(f"{f'{args.max_workers} threads':28s} {len(pages) / seconds:7.1f} pages/s  same={texts == expected}")
+
+    workers = 1
+    while workers <= args.max_workers:
+        for label, spill_bytes in (("spool files", 256 * 1024), ("pickled", 1 << 62)):
+            with ParsePool(workers, chunk_size=args.chunk_size, spill_bytes=spill_bytes) as pool:
+                # Start the worker processes outside the timing
+                pool.parse_many(pages[:workers])
+                texts, seconds = timed(lambda: pool.parse_many(pages))
+            print(f"{f'{workers} processes, {label}':28s} {len(pages) / seconds:7.1f} pages/s  "
+                  f"same={texts == expected}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""End-to-end latency and throughput of fetch -> clean -> extract -> match -> write.
+
+Serves the saved careers pages in ``benchmarks/fixtures/careers`` from a local
+fixture server and runs every page through the same steps as the Generate tab:
+``Fetcher.fetch``, ``parse_page`` (HTML to text, then ``clean_text``, as in the
+batch pipeline), ``Chain.extract_jobs``, ``SimplePortfolio.query_links_batch``
+and ``Chain.write_mail`` for each job.
+The LLM is fake_llm.ReplayLLM replaying ``fixtures/recordings.jsonl`` with
+seeded latency distributions, so no network or API key is needed and runs are
+repeatable. Reports p50/p95/p99 per stage and pages/second overall.
+
+    python benchmarks/bench_pipeline.py --pages 120 --concurrency 8 \\
+        --prefill lognormal:0.3,0.4 --per-token uniform:0.001,0.004
+
+``--json`` prints the results as JSON; save that output and pass it back with
+``--baseline`` to exit non-zero when a stage's p95 or the throughput regresses
+by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from chains import Chain  # noqa: E402
+from fake_llm import ReplayLLM  # noqa: E402
+from fetcher import Fetcher  # noqa: E402
+from fixture_server import serve_fixtures  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher  # noqa: E402
+from parse_pool import parse_page  # noqa: E402
+from portfolio import SimplePortfolio  # noqa: E402
+
+FIXTURES = os.path.join(HERE, "fixtures")
+STAGES = ["fetch", "clean", "extract", "match", "write", "total"]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def process(url, fetcher, chain, portfolio):
+    """Run one page through the pipeline; returns seconds per stage"""
+    timings = {}
+    started = last = time.perf_counter()
+
+    def lap(stage):
+        nonlocal last
+        now = time.perf_counter()
+        timings[stage] = now - last
+        last = now
+
+    result = fetcher.fetch(url)
+    result.raise_for_status()
+    page = result.text
+    lap("fetch")
+    text = parse_page(page)
+    lap("clean")
+    jobs = chain.extract_jobs(text)
+    lap("extract")
+    links = portfolio.query_links_batch([job.get("skills", []) for job in jobs])
+    lap("match")
+    for job, job_links in zip(jobs, links):
+        chain.write_mail(job, job_links)
+    lap("write")
+    timings["total"] = time.perf_counter() - started
+    timings["jobs"] = len(jobs)
+    return timings
+
+
+def run(args):
+    llm = ReplayLLM(recordings=os.path.join(FIXTURES, "recordings.jsonl"), prefill=args.prefill,
+                    per_token=args.per_token, seed=args.seed)
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9,
+                               max_concurrency=args.concurrency * 2)
+    chain = Chain(llm=llm, dispatcher=dispatcher, cache=False, research_cache=False)
+    pages = sorted(os.listdir(os.path.join(FIXTURES, "careers")))
+
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            serve_fixtures(delay=args.page_delay, pages_dir=os.path.join(FIXTURES, "careers")) as base_url:
+        fetcher = Fetcher(cache_dir=cache_dir, host_delay=0)
+        portfolio = SimplePortfolio(os.path.join(cache_dir, "portfolio.arrow"),
+                                    seed=os.path.join(HERE, "..", "my_portfolio.csv"))
+        # A distinct query string per request so every fetch goes over the wire
+        urls = [f"{base_url}/pages/{pages[i % len(pages)]}?n={i}" for i in range(args.pages)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda url: process(url, fetcher, chain, portfolio), urls))
+        seconds = time.perf_counter() - started
+
+    report = {"pages": len(results), "jobs": sum(r["jobs"] for r in results), "seconds": round(seconds, 3),
+              "pages_per_second": round(len(results) / seconds, 2), "llm_calls": llm.calls, "stages": {}}
+    for stage in STAGES:
+        values = [r[stage] for r in results]
+        report["stages"][stage] = {f"p{q}": round(percentile(values, q) * 1000, 2) for q in (50, 95, 99)}
+    return report
+
+
+def regressions(report, baseline, tolerance):
+    """Human-readable regressions of ``report`` against a saved ``--json`` run"""
+    found = []
+    for stage, old in baseline.get("stages", {}).items():
+        new = report["stages"].get(stage)
+        # A floor of 1ms keeps sub-millisecond stages from failing on noise
+        if new and new["p95"] > max(old["p95"], 1.0) * (1 + tolerance):
+            found.append(f"{stage} p95 {old['p95']}ms -> {new['p95']}ms")
+    old_rate = baseline.get("pages_per_second")
+    if old_rate and report["pages_per_second"] < old_rate * (1 - tolerance):
+        found.append(f"throughput {old_rate} -> {report['pages_per_second']} pages/s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-delay", type=float, default=0.02)
+    parser.add_argument("--prefill", default="lognormal:0.3,0.4",
+                        help="seconds before the first token: a number or uniform:/normal:/lognormal:a,b")
+    parser.add_argument("--per-token", default="uniform:0.001,0.004")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --json run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['pages']} pages, {report['jobs']} jobs, {report['llm_calls']} LLM calls "
+              f"in {report['seconds']:.2f}s ({report['pages_per_second']:.1f} pages/s)")
+        print(f"{'stage':8s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+        for stage, p in report["stages"].items():
+            print(f"{stage:8s} {p['p50']:7.1f}ms {p['p95']:7.1f}ms {p['p99']:7.1f}ms")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Portfolio storage at scale: CSV + pandas rewrites vs the Arrow/WAL PortfolioStore.
+
+Builds a synthetic portfolio of ``--items`` rows, then times for each layout:
+opening it, adding ``--appends`` items one at a time (the CSV rewrite that
+``add_portfolio_item`` used to do vs one WAL line), compaction, and the
+Portfolio Manager's page and search reads. Also reports how long building
+SimplePortfolio's and HybridPortfolio's indexes takes, and how much memory
+each allocates outside the memory maps in fresh worker processes.
+
+    python benchmarks/bench_portfolio_store.py --items 100000 --appends 50
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from portfolio import HybridPortfolio, SimplePortfolio  # noqa: E402
+from portfolio_store import PortfolioStore  # noqa: E402
+
+VOCAB = ["Python", "Django", "Flask", "React", "Node.js", "MongoDB", "Java", "Spring Boot", "Kotlin",
+         "Swift", "iOS", "Android", "AWS", "Docker", "Kubernetes", "PostgreSQL", "MySQL", "TypeScript",
+         "Angular", "Vue.js", "Go", "Rust", "TensorFlow", "PyTorch", "Spark", "Kafka", "Redis", "GraphQL"]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def open_in_worker(job):
+    """(ms to open, bytes allocated by Python/numpy, bytes allocated by Arrow, rows) in a fresh process"""
+    path, kind = job
+    import tracemalloc
+    import pyarrow as pa
+    sys.path.insert(0, os.path.join(HERE, "..", "app"))
+    import portfolio
+    from portfolio_store import PortfolioStore
+    open_store = {"store": lambda: PortfolioStore(path),
+                  "simple": lambda: portfolio.SimplePortfolio(path),
+                  "hybrid": lambda: portfolio.HybridPortfolio(path, embedding_cache=None)}[kind]
+    tracemalloc.start()
+    opened, ms = timed(open_store)
+    allocated = tracemalloc.get_traced_memory()[0]
+    return kind, ms, allocated, pa.total_allocated_bytes(), len(opened.store if kind != "store" else opened)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--appends", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    import pandas as pd
+    import pyarrow as pa
+
+    rng = random.Random(0)
+    rows = [(", ".join(rng.sample(VOCAB, rng.randint(2, 5))), f"https://example.com/case-{i}")
+            for i in range(args.items)]
+    new_rows = [(", ".join(rng.sample(VOCAB, 3)), f"https://example.com/new-{i}") for i in range(args.appends)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "portfolio.csv")
+        pd.DataFrame(rows, columns=["Techstack", "Links"]).to_csv(csv_path, index=False)
+        print(f"{args.items} items, CSV {os.path.getsize(csv_path) / 1e6:.1f} MB")
+
+        data, ms = timed(lambda: pd.read_csv(csv_path))
+        print(f"{'open':10s} csv+pandas {ms:9.1f}ms  ({data.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory)")
+        times = []
+        for techstack, link in new_rows:
+            def add():
+                frame = pd.concat([data, pd.DataFrame({"Techstack": [techstack], "Links": [link]})],
+                                  ignore_index=True)
+                frame.to_csv(csv_path, index=False)
+                return frame
+            data, ms = timed(add)
+            times.append(ms)
+        print(f"{'append':10s} csv+pandas {statistics.median(times):9.2f}ms per item (median)")
+
+        path = os.path.join(tmp, "portfolio.arrow")
+        _, ms = timed(lambda: PortfolioStore(path, seed=csv_path))
+        print(f"{'seed':10s} arrow      {ms:9.1f}ms  (one-off, from the CSV)")
+        before = pa.total_allocated_bytes()
+        store, ms = timed(lambda: PortfolioStore(path, compact_every=10**9))
+        print(f"{'open':10s} arrow      {ms:9.1f}ms  ({(pa.total_allocated_bytes() - before) / 1e6:.1f} MB "
+              f"allocated; {os.path.getsize(store.base_path(store.generation)) / 1e6:.1f} MB mapped)")
+        for fsync in (True, False):
+            store.fsync = fsync
+            times = [timed(lambda: store.append(techstack, link))[1] for techstack, link in new_rows]
+            print(f"{'append':10s} wal{' fsync' if fsync else '      '}  {statistics.median(times):9.2f}ms per item (median)")
+        _, ms = timed(store.compact)
+        print(f"{'compact':10s} arrow      {ms:9.1f}ms  ({len(store)} rows)")
+
+        for label, query in (("page", ""), ("search", "kafka"), ("search", "case-4242")):
+            _, ms = timed(lambda: store.page(5000, 50, query=query))
+            print(f"{label:10s} {query or 'all':10s} {ms:9.2f}ms  (50 rows at offset 5000)")
+        _, ms = timed(lambda: SimplePortfolio(path))
+        print(f"{'portfolio':10s} skill idx  {ms:9.1f}ms  (SimplePortfolio over the store)")
+        _, ms = timed(lambda: HybridPortfolio(path, embedding_cache=None))
+        print(f"{'portfolio':10s} hybrid     {ms:9.1f}ms  (first HybridPortfolio: embeds and saves the ranker file)")
+
+        ctx = multiprocessing.get_context("spawn")
+        jobs = [(path, kind) for kind in ("store", "simple", "hybrid") for _ in range(args.workers)]
+        with ctx.Pool(args.workers) as pool:
+            for kind, ms, allocated, arrow, count in pool.map(open_in_worker, jobs, chunksize=1):
+                print(f"{'worker':10s} {kind:10s} {ms:9.1f}ms  ({allocated / 1e6:.1f} MB Python/numpy, "
+                      f"{arrow / 1e6:.1f} MB Arrow allocated, {count} rows)")
+
+
+if __name__ == "__main__":
+    main()
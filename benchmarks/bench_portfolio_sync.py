@@ -0,0 +1,80 @@
+"""Time Chroma portfolio ingestion: per-row adds vs batched sync, plus a restart.
+
+Uses Chroma's default embedding model; pass ``--embedding hash`` to run offline
+with a cheap hashing embedder (measures ingestion overhead only).
+
+    python benchmarks/bench_portfolio_sync.py --rows 2000 --embedding hash
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from portfolio import Portfolio  # noqa: E402
+
+VOCAB = ["Python", "Django", "React", "Node.js", "Java", "Spring Boot", "Kotlin", "Swift", "AWS", "Docker",
+         "Kubernetes", "PostgreSQL", "MySQL", "TypeScript", "Angular", "Go", "TensorFlow", "Kafka", "Redis"]
+
+
+class HashingEmbedding:
+    """Bag-of-tokens hashed into a fixed-size vector; no model download needed"""
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vec = [0.0] * 64
+            for token in text.lower().replace(",", " ").split():
+                vec[int(hashlib.md5(token.encode()).hexdigest(), 16) % 64] += 1.0
+            vectors.append(vec)
+        return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--embedding", choices=["default", "hash"], default="default")
+    args = parser.parse_args()
+    embedding = HashingEmbedding() if args.embedding == "hash" else None
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "portfolio.csv")
+        pd.DataFrame({
+            "Techstack": [", ".join(rng.sample(VOCAB, 3)) for _ in range(args.rows)],
+            "Links": [f"https://example.com/case-{i}" for i in range(args.rows)],
+        }).to_csv(csv_path, index=False)
+
+        legacy = Portfolio(csv_path, persist_dir=os.path.join(tmp, "legacy"), embedding_function=embedding)
+        started = time.perf_counter()
+        for _, row in legacy.data.iterrows():
+            legacy.collection.add(documents=row["Techstack"], metadatas={"links": row["Links"]},
+                                  ids=[str(uuid.uuid4())])
+        print(f"per-row add:      {time.perf_counter() - started:7.2f}s")
+
+        store = os.path.join(tmp, "synced")
+        portfolio = Portfolio(csv_path, persist_dir=store, batch_size=args.batch_size, embedding_function=embedding)
+        started = time.perf_counter()
+        stats = portfolio.sync()
+        print(f"batched sync:     {time.perf_counter() - started:7.2f}s  {stats}")
+
+        # Edit a few rows and drop one, as a CSV edit would
+        data = portfolio.data.copy()
+        data.loc[:9, "Techstack"] = data.loc[:9, "Techstack"] + ", Rust"
+        data.drop(index=len(data) - 1).to_csv(csv_path, index=False)
+        portfolio = Portfolio(csv_path, persist_dir=store, batch_size=args.batch_size, embedding_function=embedding)
+        started = time.perf_counter()
+        stats = portfolio.sync()
+        print(f"restart + edits:  {time.perf_counter() - started:7.2f}s  {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Input tokens and prefill latency per email, old prompt layout vs prompts.py.
+
+Builds a fixture corpus of jobs with portfolio links and company research,
+then writes one email per job twice: once with the old ``write_mail`` prompt
+(an indented f-string with Python dict reprs and per-job data ahead of the
+static instructions) and once with ``prompts.mail_prompt``. The LLM is a
+StubLLM that models provider-side prefix caching: prefill time grows with the
+input tokens that don't share a prefix with the previous prompt.
+
+    python benchmarks/bench_prompts.py --jobs 50 --ms-per-1k-tokens 150
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import prompts  # noqa: E402
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher, estimate_tokens  # noqa: E402
+
+ROLES = ["Senior Python Engineer", "Frontend Developer", "Data Scientist", "DevOps Engineer", "iOS Developer",
+         "Machine Learning Engineer", "Backend Engineer", "Full Stack Developer"]
+SKILLS = ["Python", "Django", "React", "TypeScript", "AWS", "Docker", "Kubernetes", "PostgreSQL", "Swift",
+          "TensorFlow", "PyTorch", "Go", "Terraform", "GraphQL", "Node.js", "Redis"]
+WORDS = ("build maintain scale services teams customers platform data reliable secure modern cloud "
+         "products features pipelines collaborate design ship own improve").split()
+
+
+def corpus(n, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        job = {"role": rng.choice(ROLES), "experience": f"{rng.randint(2, 8)}+ years",
+               "skills": rng.sample(SKILLS, rng.randint(3, 7)),
+               "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))),
+               "company_name": f"Company {i}"}
+        links = [{"links": f"https://example.com/{s.lower()}-portfolio"} for s in job["skills"][:2]]
+        research = {"values": ["craftsmanship", "customer focus"], "initiatives": [f"project {i}"],
+                    "pain_points": ["hiring", "legacy systems"], "size": "Mid-size"}
+        items.append((job, links, research))
+    return items
+
+
+def legacy_prompt(job, portfolio_links, research, template_style="formal", recipient="", add_cta=True,
+                  mention_competitors=False):
+    """The write_mail prompt as it was built before prompts.py"""
+    job_str = str(job)
+    portfolio_str = str(portfolio_links)
+    company_values = ", ".join([str(v) for v in research.get('values', [])])
+    company_initiatives = ", ".join([str(i) for i in research.get('initiatives', [])])
+    company_pain_points = ", ".join([str(p) for p in research.get('pain_points', [])])
+    company_size = str(research.get('size', 'Unknown'))
+    company_research_text = f"""
+                    Company Values: {company_values}
+                    Recent Initiatives: {company_initiatives}
+                    Potential Pain Points: {company_pain_points}
+                    Company Size: {company_size}
+                    """
+    style_info = prompts.STYLE_INSTRUCTIONS[template_style]
+    return f"""
+            You are Mohan, a business development executive at AtliQ.
+
+            Job details: {job_str}
+
+            Portfolio links: {portfolio_str}
+
+            {company_research_text}
+
+            {style_info}
+
+            Write a cold email to the client regarding this job. Describe AtliQ's capability in fulfilling their needs.
+
+            AtliQ is an AI & Software Consulting company dedicated to facilitating the seamless integration of business processes through automated tools.
+
+            {"Address the email to " + recipient if recipient else ""}
+
+            {"Include a call to action at the end." if add_cta else ""}
+
+            {"Mention how AtliQ compares favorably to competitors." if mention_competitors else ""}
+
+            Format with subject line, greeting, body, and signature.
+            """
+
+
+class PrefixCachingLLM(StubLLM):
+    """Prefill costs ``ms_per_1k`` per thousand input tokens not shared with the previous prompt"""
+
+    def __init__(self, ms_per_1k):
+        super().__init__()
+        self.ms_per_1k = ms_per_1k
+        self.previous = ""
+        self.cached_tokens = 0
+
+    async def ainvoke(self, prompt):
+        prompt = str(prompt)
+        shared = len(os.path.commonprefix([prompt, self.previous]))
+        self.previous = prompt
+        self.cached_tokens += shared // 4
+        self.latency = estimate_tokens(prompt[shared:]) * self.ms_per_1k / 1e6
+        return await super().ainvoke(prompt)
+
+
+def run(items, build, ms_per_1k):
+    llm = PrefixCachingLLM(ms_per_1k)
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9)
+    chain = Chain(llm=llm, dispatcher=dispatcher, cache=False)
+    started = time.perf_counter()
+    tokens = 0
+    for job, links, research in items:
+        prompt = build(job, links, research)
+        tokens += estimate_tokens(prompt)
+        chain._complete(prompt, kind="write_mail")
+    seconds = time.perf_counter() - started
+    return tokens / len(items), llm.cached_tokens / len(items), seconds / len(items) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=150)
+    args = parser.parse_args()
+
+    items = corpus(args.jobs)
+
+    def current(job, links, research):
+        return prompts.mail_prompt(job, links, "formal", company_research=research, add_cta=True)
+
+    print(f"{args.jobs} emails        input tokens  prefix-cached  prefill per email")
+    for label, build in (("old f-string", legacy_prompt), ("prompts.py", current)):
+        tokens, cached, ms = run(items, build, args.ms_per_1k_tokens)
+        print(f"{label:15s} {tokens:12.0f}  {cached:13.0f}  {ms:14.1f}ms")
+    print(f"static prefix of a mail prompt: {estimate_tokens(prompts.MAIL.split('{')[0])} tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Portfolio matching quality and latency: SimplePortfolio, Chroma Portfolio, HybridPortfolio.
+
+Scores each engine on the labeled job -> portfolio fixture set
+(``fixtures/portfolio_eval.json``: 60 items, 50 jobs with their relevant
+links) by recall@2 (the app's default link count), recall@5 and MRR@5, with
+per-query latency. Then sweeps HybridPortfolio's fusion weights, and times
+every engine again with ``--sizes`` synthetic items added to the catalog.
+
+Chroma and the hybrid ranker both use the offline hashing embedder unless
+``--embedding default`` picks Chroma's default model (downloaded on first use).
+
+    python benchmarks/bench_ranking.py --sizes 10000 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from portfolio import HybridPortfolio, Portfolio, SimplePortfolio  # noqa: E402
+from ranking import HashingEmbedder  # noqa: E402
+
+VOCAB = ["Python", "Django", "Flask", "React", "Node.js", "MongoDB", "Java", "Spring Boot", "Kotlin",
+         "Swift", "iOS", "Android", "AWS", "Docker", "Kubernetes", "PostgreSQL", "MySQL", "TypeScript",
+         "Angular", "Vue.js", "Go", "Rust", "TensorFlow", "PyTorch", "Spark", "Kafka", "Redis", "GraphQL"]
+
+
+class ChromaEngine:
+    """Portfolio behind the same ``query_links`` call as the other two"""
+
+    def __init__(self, csv_path, persist_dir, embedding_function):
+        self.portfolio = Portfolio(csv_path, persist_dir=persist_dir, embedding_function=embedding_function)
+        self.portfolio.sync()
+
+    def query_links(self, skills, n_results=2):
+        return self.portfolio.query_links_batch([skills], n_results=n_results)[0]
+
+
+def write_csv(path, items):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Techstack", "Links"])
+        writer.writerows((item["Techstack"], item["Links"]) for item in items)
+
+
+def distractors(n, rng):
+    return [{"Techstack": ", ".join(rng.sample(VOCAB, rng.randint(2, 5))), "Links": f"https://example.com/case-{i}"}
+            for i in range(n)]
+
+
+def build(name, folder, items, embedding):
+    csv_path = os.path.join(folder, f"{name}.csv")
+    write_csv(csv_path, items)
+    if name == "simple":
+        return SimplePortfolio(os.path.join(folder, "simple.arrow"), seed=csv_path)
+    if name == "hybrid":
+        return HybridPortfolio(os.path.join(folder, "hybrid.arrow"), seed=csv_path, embedding_function=embedding,
+                               embedding_cache=os.path.join(folder, "embeddings.sqlite3"))
+    return ChromaEngine(csv_path, os.path.join(folder, "chroma"), embedding)
+
+
+def evaluate(engine, queries):
+    """(recall@2, recall@5, MRR@5, per-query milliseconds)"""
+    recall2, recall5, rr, times = [], [], [], []
+    for query in queries:
+        started = time.perf_counter()
+        links = [item["links"] for item in engine.query_links(query["skills"], n_results=5)]
+        times.append((time.perf_counter() - started) * 1000)
+        relevant = set(query["relevant"])
+        recall2.append(len(relevant & set(links[:2])) / len(relevant))
+        recall5.append(len(relevant & set(links[:5])) / len(relevant))
+        rr.append(next((1 / (rank + 1) for rank, link in enumerate(links) if link in relevant), 0.0))
+    return statistics.mean(recall2), statistics.mean(recall5), statistics.mean(rr), times
+
+
+def latency(times):
+    times = sorted(times)
+    return f"p50 {statistics.median(times):7.2f}ms  p95 {times[int(0.95 * (len(times) - 1))]:7.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000])
+    parser.add_argument("--chroma-max", type=int, default=10000, help="Largest catalog to embed into Chroma")
+    parser.add_argument("--embedding", choices=["hash", "default"], default="hash")
+    args = parser.parse_args()
+
+    with open(os.path.join(HERE, "fixtures", "portfolio_eval.json")) as f:
+        fixture = json.load(f)
+    items, queries = fixture["items"], fixture["queries"]
+    embedding = HashingEmbedder() if args.embedding == "hash" else None
+    engines = ["simple", "chroma", "hybrid"]
+
+    print(f"{len(items)} items, {len(queries)} labeled jobs")
+    print(f"{'engine':8s} {'recall@2':>9s} {'recall@5':>9s} {'MRR@5':>7s}   latency per query")
+    hybrid = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in engines:
+            folder = os.path.join(tmp, name)
+            os.makedirs(folder)
+            engine = build(name, folder, items, embedding)
+            r2, r5, mrr, times = evaluate(engine, queries)
+            print(f"{name:8s} {r2:9.3f} {r5:9.3f} {mrr:7.3f}   {latency(times)}")
+            if name == "hybrid":
+                hybrid = engine
+
+        print("\nhybrid fusion weights (lexical / semantic)")
+        for lexical in (1.0, 0.7, 0.4, 0.2, 0.0):
+            hybrid.index.lexical_weight, hybrid.index.semantic_weight = lexical, 1.0 - lexical
+            r2, r5, mrr, _ = evaluate(hybrid, queries)
+            print(f"  {lexical:.1f} / {1 - lexical:.1f}   recall@2 {r2:.3f}  recall@5 {r5:.3f}  MRR@5 {mrr:.3f}")
+
+    rng = random.Random(0)
+    for size in args.sizes:
+        catalog = items + distractors(size, rng)
+        print(f"\n{len(catalog)} items")
+        for name in engines:
+            if name == "chroma" and size > args.chroma_max:
+                continue
+            with tempfile.TemporaryDirectory() as tmp:
+                started = time.perf_counter()
+                engine = build(name, tmp, catalog, embedding)
+                built = time.perf_counter() - started
+                _, _, _, times = evaluate(engine, queries)
+                print(f"  {name:8s} build {built:7.2f}s   {latency(times)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Streamlit rerun latency with and without the shared resource cache.
+
+Drives app/main.py through streamlit's AppTest harness from a scratch working
+directory. The "rebuilt" rows clear ``st.cache_resource`` before every rerun,
+which reproduces the old behaviour of constructing the Chain (LLM client,
+dispatcher, response cache) and the portfolio on each widget interaction;
+the "cached" rows reuse them.
+
+    python benchmarks/bench_rerun.py --reruns 20
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+
+def measure(reruns, clear):
+    app = AppTest.from_file(os.path.join(APP_DIR, "main.py"), default_timeout=60)
+    app.run()
+    times = []
+    for _ in range(reruns):
+        if clear:
+            st.cache_resource.clear()
+        started = time.perf_counter()
+        app.run()
+        times.append((time.perf_counter() - started) * 1000)
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    # ChatGroq refuses to construct without a key; nothing is sent
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    workdir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(APP_DIR, "..", "my_portfolio.csv"), workdir)
+    os.chdir(workdir)
+    try:
+        for label, clear in (("rebuilt every rerun", True), ("cached resources", False)):
+            times = measure(args.reruns, clear)
+            print(f"{label:20s} median {statistics.median(times):7.1f}ms  max {max(times):7.1f}ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
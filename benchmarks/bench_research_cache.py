@@ -0,0 +1,55 @@
+"""Company research calls for a batch of job URLs on one host.
+
+Before, research was cached per full job URL, so N different job URLs on one
+ATS host meant N About-page fetches and N LLM calls. This runs the research
+for ``--urls`` job URLs served by the local fixture server from
+``--concurrency`` threads, first with a fresh cache (single-flight collapses
+the concurrent misses), then again with a new Chain on the same SQLite store,
+as a second process would.
+
+    python benchmarks/bench_research_cache.py --urls 200 --llm-latency 0.3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from fixture_server import serve_fixtures  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher  # noqa: E402
+from research_cache import CompanyResearchCache  # noqa: E402
+
+
+def run(urls, store_path, llm_latency, concurrency):
+    llm = StubLLM(latency=llm_latency)
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9)
+    chain = Chain(llm=llm, dispatcher=dispatcher, cache=False, research_cache=CompanyResearchCache(store_path))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda url: chain.extract_company_info(url, "Fixture Company"), urls))
+    return time.perf_counter() - started, llm.calls, chain.research_cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    with serve_fixtures() as base_url, tempfile.TemporaryDirectory() as tmp:
+        urls = [f"{base_url}/careers/{n}" for n in range(args.urls)]
+        store = os.path.join(tmp, "research.sqlite3")
+        print(f"{args.urls} job URLs on one host; per-URL caching needed {args.urls} research LLM calls")
+        for label in ("cold cache", "second process"):
+            seconds, calls, stats = run(urls, store, args.llm_latency, args.concurrency)
+            print(f"{label:15s} {seconds:6.2f}s  research LLM calls={calls}  {stats}")
+
+
+if __name__ == "__main__":
+    main()
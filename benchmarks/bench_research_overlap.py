@@ -0,0 +1,98 @@
+"""Generate-flow latency with company research serial vs overlapped.
+
+Serial is the old order: load the page, extract jobs, then research the
+company inside ``write_mail``. Overlapped starts research from the URL before
+the page loads and hands the future to ``write_mail``. A last run makes
+research slower than ``research_timeout`` to show the research-less fallback.
+Pages come from the local fixture server and the LLM is a StubLLM.
+
+    python benchmarks/bench_research_overlap.py --runs 5 --llm-latency 0.5 --page-delay 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from langchain_core.messages import AIMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from fetcher import Fetcher, load_page_text  # noqa: E402
+from fixture_server import serve_fixtures  # noqa: E402
+from llm_client import LangChainProvider, LLMDispatcher  # noqa: E402
+from utils import clean_text  # noqa: E402
+
+LINKS = [{"links": "https://example.com/python-portfolio"}]
+PERSONALIZATION = {"include_company_research": True}
+
+
+class SlowResearchLLM(StubLLM):
+    """Company research prompts take ``research_latency`` instead of ``latency``"""
+
+    def __init__(self, latency, research_latency):
+        super().__init__(latency=latency)
+        self.research_latency = research_latency
+
+    async def ainvoke(self, prompt):
+        if "### COMPANY INFO:" not in str(prompt):
+            return await super().ainvoke(prompt)
+        self.calls += 1
+        await asyncio.sleep(self.research_latency)
+        return AIMessage(content=self.respond(str(prompt)))
+
+
+def make_chain(llm_latency, research_latency):
+    llm = SlowResearchLLM(llm_latency, research_latency)
+    dispatcher = LLMDispatcher(LangChainProvider(llm), requests_per_minute=10**6, tokens_per_minute=10**9)
+    # Fresh in-memory research cache per run so every run really researches
+    return Chain(llm=llm, dispatcher=dispatcher, cache=False, research_cache=False)
+
+
+def serial(chain, url, fetcher):
+    jobs = chain.extract_jobs(clean_text(load_page_text(url, fetcher)))
+    return chain.write_mail(jobs[0], LINKS, personalization=dict(PERSONALIZATION, company_url=url))
+
+
+def overlapped(chain, url, fetcher):
+    research = chain.start_company_research(url)
+    jobs = chain.extract_jobs(clean_text(load_page_text(url, fetcher)))
+    return chain.write_mail(jobs[0], LINKS, personalization=dict(PERSONALIZATION, company_url=url),
+                            company_research=research)
+
+
+def timed(flow, runs, llm_latency, research_latency, url, fetcher, timeout=None):
+    times = []
+    for _ in range(runs):
+        chain = make_chain(llm_latency, research_latency)
+        if timeout is not None:
+            chain.research_timeout = timeout
+        started = time.perf_counter()
+        flow(chain, url, fetcher)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--page-delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with serve_fixtures(delay=args.page_delay) as base_url:
+        url = f"{base_url}/careers/1"
+        # No disk cache, so every run pays the page fetch
+        fetcher = Fetcher(cache_dir=None, host_delay=0)
+        lat = args.llm_latency
+        print(f"serial research:      {timed(serial, args.runs, lat, lat, url, fetcher):.2f}s")
+        print(f"overlapped research:  {timed(overlapped, args.runs, lat, lat, url, fetcher):.2f}s")
+        slow = timed(overlapped, args.runs, lat, 10 * lat, url, fetcher, timeout=lat)
+        print(f"research 10x slower, {lat:g}s deadline: {slow:.2f}s (email written without research)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compare SimplePortfolio's original iterrows matcher with SkillIndex.
+
+Checks that both return identical links on the seed portfolio and on synthetic
+catalogs, then times single and batched queries at 1k/10k/100k rows.
+
+    python benchmarks/bench_skill_index.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from portfolio import SimplePortfolio  # noqa: E402
+from portfolio_store import PortfolioStore  # noqa: E402
+
+VOCAB = ["Python", "Django", "Flask", "React", "Node.js", "MongoDB", "Java", "Spring Boot", "Kotlin",
+         "Swift", "iOS", "Android", "AWS", "Docker", "Kubernetes", "PostgreSQL", "MySQL", "TypeScript",
+         "Angular", "Vue.js", "Go", "Rust", "TensorFlow", "PyTorch", "Spark", "Kafka", "Redis", "GraphQL",
+         "Ruby on Rails", "PHP", "Laravel", ".NET", "C#", "Azure", "GCP", "Terraform", "Jenkins", "Scala"]
+
+
+def legacy_query_links(data, skills, n_results=2):
+    """The matcher SimplePortfolio used before SkillIndex, kept as the reference"""
+    skills_lower = [s.lower() for s in skills] if isinstance(skills, list) else [skills.lower()]
+    scores = []
+    for idx, row in data.iterrows():
+        tech_stack = row["Techstack"].lower()
+        scores.append((idx, sum(1 for skill in skills_lower if skill in tech_stack)))
+    top = [idx for idx, _ in sorted(scores, key=lambda x: x[1], reverse=True)[:n_results]]
+    links = [{"links": data.iloc[idx]["Links"]} for idx in top]
+    if not links:
+        links = [{"links": data.iloc[idx]["Links"]} for idx in range(min(n_results, len(data)))]
+    return links
+
+
+def make_catalog(n, rng):
+    stacks = [", ".join(rng.sample(VOCAB, rng.randint(2, 5))) for _ in range(n)]
+    return pd.DataFrame({"Techstack": stacks, "Links": [f"https://example.com/case-{i}" for i in range(n)]})
+
+
+def make_queries(n, rng):
+    return [rng.sample(VOCAB, rng.randint(1, 6)) + (["java"] if rng.random() < 0.3 else []) for _ in range(n)]
+
+
+def make_store(data, folder):
+    """An Arrow store holding ``data``, like the one SimplePortfolio maps in the app"""
+    csv_path = os.path.join(folder, "catalog.csv")
+    data.to_csv(csv_path, index=False)
+    path = os.path.join(folder, "portfolio.arrow")
+    PortfolioStore(path, seed=csv_path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    seed = SimplePortfolio()
+    for skills in make_queries(100, rng) + [["java"], [""], "Python", ["React Native", "react"]]:
+        for n in (1, 2, 5, 25):
+            assert seed.query_links(skills, n) == legacy_query_links(seed.data, skills, n), (skills, n)
+    print("seed portfolio: results identical to the iterrows matcher")
+
+    for size in args.sizes:
+        data = make_catalog(size, rng)
+        queries = make_queries(args.queries, rng)
+        folder = tempfile.TemporaryDirectory()
+        path = make_store(data, folder.name)
+        started = time.perf_counter()
+        portfolio = SimplePortfolio(path)
+        build = time.perf_counter() - started
+
+        # The reference is O(rows) Python per query, so only time a few queries
+        legacy_n = max(1, min(len(queries), 200000 // size))
+        started = time.perf_counter()
+        expected = [legacy_query_links(data, q, 3) for q in queries[:legacy_n]]
+        legacy = (time.perf_counter() - started) / legacy_n
+
+        started = time.perf_counter()
+        got = [portfolio.query_links(q, 3) for q in queries]
+        single = (time.perf_counter() - started) / len(queries)
+        assert got[:legacy_n] == expected
+
+        portfolio._build_index()
+        started = time.perf_counter()
+        batched_got = portfolio.query_links_batch(queries, 3)
+        batched = (time.perf_counter() - started) / len(queries)
+        assert batched_got == got
+        print(f"{size:>7} rows: build {build * 1000:7.1f} ms | per query: iterrows {legacy * 1000:8.2f} ms, "
+              f"index {single * 1000:6.3f} ms, batched (cold) {batched * 1000:6.3f} ms")
+        del portfolio
+        folder.cleanup()
+
+
+if __name__ == "__main__":
+    main()
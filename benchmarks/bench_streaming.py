@@ -0,0 +1,66 @@
+"""Perceived latency of blocking vs streamed email generation.
+
+Answers every prompt with a StubLLM that waits ``--prefill`` seconds before the
+first token and ``--token-latency`` seconds per word after it, then compares
+``Chain.write_mail`` (nothing to show until the whole email is back) against
+``Chain.stream_mail`` (first words on screen after the prefill). Also checks
+that both produce the same text.
+
+    python benchmarks/bench_streaming.py --calls 10 --prefill 0.4 --token-latency 0.02
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+
+JOB = {"role": "Senior Python Engineer", "skills": ["Python", "Django", "AWS"], "experience": "5+ years"}
+LINKS = [{"links": "https://example.com/python-portfolio"}]
+
+
+class LongEmailLLM(StubLLM):
+    """A realistic-length email of about 250 words"""
+
+    def respond(self, prompt):
+        body = " ".join(f"AtliQ has delivered project {i} for clients like you." for i in range(30))
+        return f"Subject: Partnering with AtliQ\n\nHello,\n\n{body}\n\nBest regards,\nMohan"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--prefill", type=float, default=0.4)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    llm = LongEmailLLM(latency=args.prefill, token_latency=args.token_latency)
+    chain = Chain(llm=llm, cache=False)
+
+    blocking, outputs = [], set()
+    for _ in range(args.calls):
+        started = time.perf_counter()
+        outputs.add(chain.write_mail(JOB, LINKS))
+        blocking.append(time.perf_counter() - started)
+
+    ttft, total = [], []
+    for _ in range(args.calls):
+        timing = {}
+        outputs.add("".join(chain.stream_mail(JOB, LINKS, timing=timing)))
+        ttft.append(timing["ttft"])
+        total.append(timing["total"])
+
+    print(f"blocking write_mail: first words after {statistics.median(blocking):.2f}s (whole email)")
+    print(f"streamed stream_mail: first words after {statistics.median(ttft):.2f}s, "
+          f"complete after {statistics.median(total):.2f}s")
+    print(f"identical output: {len(outputs) == 1}")
+    metrics = chain.dispatcher.metrics()
+    print({k: metrics[k] for k in ("requests", "streams", "ttft_p50", "ttft_p95", "latency_p50", "latency_p95")})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Wall-clock cost of comparing every email style for one job.
+
+"Three pipelines" repeats what a rep did before: for each style, extract the
+job from the page again and write the email. "Variants" extracts once and
+streams all styles in parallel through ``Chain.stream_mail_variants``. The LLM
+is a StubLLM with ``--prefill`` seconds before the first token and
+``--token-latency`` per word; the response cache is off so every call counts.
+
+    python benchmarks/bench_variants.py --prefill 0.5 --token-latency 0.02
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from chains import Chain  # noqa: E402
+from fake_llm import StubLLM  # noqa: E402
+from fixture_server import CAREERS_PAGE  # noqa: E402
+from utils import clean_text  # noqa: E402
+
+LINKS = [{"links": "https://example.com/python-portfolio"}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prefill", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    page = clean_text(CAREERS_PAGE.format(n=1))
+    llm = StubLLM(latency=args.prefill, token_latency=args.token_latency)
+    chain = Chain(llm=llm, cache=False)
+    styles = list(chain.email_templates)
+
+    started = time.perf_counter()
+    sequential = {}
+    for style in styles:
+        job = chain.extract_jobs(page)[0]
+        sequential[style] = chain.write_mail(job, LINKS, template_style=style)
+    sequential_seconds = time.perf_counter() - started
+    sequential_calls = llm.calls
+
+    started = time.perf_counter()
+    job = chain.extract_jobs(page)[0]
+    timings = {}
+    parallel = {style: "" for style in styles}
+    for style, chunk in chain.stream_mail_variants(job, LINKS, timings=timings):
+        parallel[style] += chunk
+    parallel_seconds = time.perf_counter() - started
+
+    print(f"{len(styles)} pipelines, one style each: {sequential_seconds:5.2f}s  ({sequential_calls} LLM calls)")
+    print(f"one extraction + parallel variants: {parallel_seconds:5.2f}s  ({llm.calls - sequential_calls} LLM calls)")
+    print("first words per style:", {style: round(t["ttft"], 2) for style, t in timings.items()})
+    print(f"same emails: {parallel == sequential}")
+
+
+if __name__ == "__main__":
+    main()